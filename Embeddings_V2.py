@@ -2,28 +2,43 @@ import os
 import sys
 from openai import OpenAI
 import numpy as np
-import pandas as pd
-from tqdm import tqdm
-import tiktoken
+from embedding_pipeline import EmbeddingPipeline
+from tokenization import get_encoder, tokenize_corpus
+from incremental_embeddings import IncrementalEmbeddings
+from parse_raw_data import load_papers
+from passage_index import PassageIndex
+from dedup import default_papers, load_aliases, check_aliases
 
-# Path to the CSV generated by your parsing script
+# Path to the CSV generated by your parsing script. If dedup.py has written its
+# kept papers and alias map next to it, those are embedded instead.
 INPUT_CSV = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/papers.csv"
 
+# Token counts cached next to the paper metadata by the tokenization stage
+TOKEN_CACHE = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/papers.tokens.npz"
+
 # Local output file where embeddings will be saved
 EMBEDDINGS_OUT = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/paper_embeddings.npy"
 
+# Per-chunk vectors of long papers, for passage-level retrieval (None to skip)
+PASSAGES_OUT = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/paper_passages.npz"
+
 # OpenAI embedding model
 EMBEDDING_MODEL = "text-embedding-ada-002"
 MAX_TOKENS = 8191  # Maximum tokens for text-embedding-ada-002
+EMBEDDING_DIM = 1536
+MAX_IN_FLIGHT = 8  # Concurrent embedding requests
+REQUESTS_PER_MINUTE = 3000
+TOKENS_PER_MINUTE = 1000000
+TARGET_TOKENS_PER_REQUEST = 100000  # Token budget each batched request is packed to
 
 def num_tokens(text: str, model: str = EMBEDDING_MODEL) -> int:
     """Return the number of tokens in a string."""
-    encoding = tiktoken.encoding_for_model(model)
+    encoding = get_encoder(model)
     return len(encoding.encode(text))
 
 def truncate_text(text: str, model: str = EMBEDDING_MODEL) -> str:
     """Truncate text to fit within token limit."""
-    encoding = tiktoken.encoding_for_model(model)
+    encoding = get_encoder(model)
     encoded = encoding.encode(text)
     if len(encoded) > MAX_TOKENS:
         truncated = encoded[:MAX_TOKENS]
@@ -40,33 +55,27 @@ def create_embeddings(client, texts, batch_size=100):
         batch_size: Number of texts to process in each batch
         
     Returns:
-        List of embeddings
+        (embeddings, failed) where embeddings is a (len(texts), EMBEDDING_DIM)
+        array and failed lists the indices whose requests failed (left as zeros)
     """
-    all_embeddings = []
-    
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        # Truncate each text in the batch
-        truncated_batch = [truncate_text(text) for text in batch]
-        
-        try:
-            response = client.embeddings.create(
-                model=EMBEDDING_MODEL,
-                input=truncated_batch
-            )
-            # Extract embeddings from response
-            batch_embeddings = [item.embedding for item in response.data]
-            all_embeddings.extend(batch_embeddings)
-            
-        except Exception as e:
-            print(f"[ERROR] Batch embedding failed: {str(e)}")
-            # Fill failed embeddings with zeros
-            batch_embeddings = [np.zeros(1536) for _ in batch]
-            all_embeddings.extend(batch_embeddings)
-            
-    return all_embeddings
-
-def process_long_text(client, text: str, model: str = EMBEDDING_MODEL) -> np.ndarray:
+    # One tokenization pass gives both the truncated texts and their token counts
+    corpus = tokenize_corpus(texts, EMBEDDING_MODEL, MAX_TOKENS)
+    pairs = [corpus.truncated(i, text) for i, text in enumerate(texts)]
+    truncated = [text for text, _ in pairs]
+    token_counts = [count for _, count in pairs]
+
+    embeddings = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    pipeline = EmbeddingPipeline(client, EMBEDDING_MODEL, max_in_flight=MAX_IN_FLIGHT,
+                                 requests_per_minute=REQUESTS_PER_MINUTE,
+                                 tokens_per_minute=TOKENS_PER_MINUTE, max_inputs=batch_size,
+                                 max_tokens=TARGET_TOKENS_PER_REQUEST)
+    failed = pipeline.embed_into(truncated, token_counts, embeddings)
+    if failed:
+        print(f"[WARNING] {len(failed)} texts could not be embedded: {failed[:20]}")
+    return embeddings, failed
+
+def process_long_text(client, text: str, model: str = EMBEDDING_MODEL, chunks=None,
+                      pipeline: EmbeddingPipeline = None) -> np.ndarray:
     """
     Process long text by splitting into chunks and averaging embeddings.
     
@@ -74,81 +83,154 @@ def process_long_text(client, text: str, model: str = EMBEDDING_MODEL) -> np.nda
         client: OpenAI client instance
         text: The text to process
         model: The embedding model to use
+        chunks: Optional (chunk_text, token_count) pairs precomputed by the
+            tokenization stage (TokenizedCorpus.chunks); avoids encoding the text again
+        pipeline: Optional EmbeddingPipeline to send the chunks through
         
     Returns:
-        numpy array of averaged embeddings
+        numpy array of embeddings averaged by chunk token count; zeros if
+        any chunk failed
     """
-    encoding = tiktoken.encoding_for_model(model)
-    tokens = encoding.encode(text)
-    
-    # Split into chunks of MAX_TOKENS
-    chunks = []
-    for i in range(0, len(tokens), MAX_TOKENS):
-        chunk = tokens[i:i + MAX_TOKENS]
-        chunks.append(encoding.decode(chunk))
-    
-    # Get embeddings for each chunk
-    chunk_embeddings = []
-    for chunk in chunks:
-        try:
-            response = client.embeddings.create(
-                model=EMBEDDING_MODEL,
-                input=chunk
-            )
-            embedding = response.data[0].embedding
-            chunk_embeddings.append(embedding)
-        except Exception as e:
-            print(f"[ERROR] Chunk embedding failed: {str(e)}")
-            continue
-    
-    if not chunk_embeddings:
-        return np.zeros(1536)
-    
-    # Average the embeddings
-    return np.mean(chunk_embeddings, axis=0)
+    if chunks is None:
+        encoding = get_encoder(model)
+        tokens = encoding.encode(text)
+
+        # Split into chunks of MAX_TOKENS
+        chunks = []
+        for i in range(0, len(tokens), MAX_TOKENS):
+            chunk = tokens[i:i + MAX_TOKENS]
+            chunks.append((encoding.decode(chunk), len(chunk)))
+
+    # All chunks go out together, packed into concurrent batched requests
+    if pipeline is None:
+        pipeline = EmbeddingPipeline(client, model, max_in_flight=MAX_IN_FLIGHT,
+                                     requests_per_minute=REQUESTS_PER_MINUTE,
+                                     tokens_per_minute=TOKENS_PER_MINUTE, max_tokens=TARGET_TOKENS_PER_REQUEST)
+    chunk_embeddings = np.zeros((len(chunks), EMBEDDING_DIM), dtype=np.float32)
+    failed = pipeline.embed_into([c for c, _ in chunks], [n for _, n in chunks], chunk_embeddings,
+                                 show_progress=False)
+    if failed:
+        print(f"[ERROR] {len(failed)} of {len(chunks)} chunk embeddings failed")
+        return np.zeros(EMBEDDING_DIM, dtype=np.float32)
+
+    return weighted_mean(chunk_embeddings, [n for _, n in chunks])
+
+def weighted_mean(chunk_embeddings: np.ndarray, token_counts) -> np.ndarray:
+    """Average chunk vectors weighted by their token counts, so a short final chunk counts less."""
+    weights = np.asarray(token_counts, dtype=np.float32)
+    return weights @ chunk_embeddings / weights.sum()
+
+def embed_corpus_rows(pipeline: EmbeddingPipeline, texts, corpus, rows, out, passages: PassageIndex = None,
+                      paper_ids=None):
+    """
+    Embed rows of the corpus into out[rows] through one shared set of batched requests.
+
+    Long texts are split at token boundaries, and the chunks of every long
+    paper are packed into the same concurrent requests as the short texts.
+    A long paper gets the token-weighted mean of its chunk vectors. If any of
+    its chunks fails, the whole paper is reported failed so it is retried
+    rather than averaged over the chunks that survived.
+
+    Args:
+        pipeline: EmbeddingPipeline to send requests through
+        texts: All texts of the corpus
+        corpus: TokenizedCorpus of texts
+        rows: Rows to embed
+        out: (num_texts, emb_dim) array or memmap
+        passages: Optional PassageIndex that receives the chunk vectors of long papers
+        paper_ids: Paper id of every row (required with passages)
+
+    Returns:
+        Rows that could not be embedded
+    """
+    inputs, counts, spans = [], [], []  # spans: (row, first input, end input)
+    for i in np.asarray(rows).tolist():
+        pieces = corpus.chunks(i) if corpus.is_long(i) else [(texts[i], int(corpus.counts[i]))]
+        spans.append((i, len(inputs), len(inputs) + len(pieces)))
+        inputs.extend(text for text, _ in pieces)
+        counts.extend(n for _, n in pieces)
+
+    num_long = sum(corpus.is_long(i) for i, _, _ in spans)
+    if num_long:
+        print(f"[INFO] Embedding {len(spans) - num_long} texts and {num_long} long texts "
+              f"({len(inputs) - len(spans) + num_long} chunks) together")
+    vectors = np.zeros((len(inputs), out.shape[1]), dtype=np.float32)
+    failed_inputs = set(pipeline.embed_into(inputs, counts, vectors, show_progress=False))
+
+    failed, short_rows, short_inputs = [], [], []
+    for i, start, stop in spans:
+        if any(p in failed_inputs for p in range(start, stop)):
+            failed.append(i)
+        elif corpus.is_long(i):
+            out[i] = weighted_mean(vectors[start:stop], counts[start:stop])
+            if passages is not None:
+                passages.update(paper_ids[i], vectors[start:stop], counts[start:stop])
+        else:
+            short_rows.append(i)
+            short_inputs.append(start)
+    out[short_rows] = vectors[short_inputs]
+    return failed
 
 def main():
     try:
         # Initialize OpenAI client
-        client = OpenAI(api_key= '')
+        # Retries are paced by EmbeddingPipeline, not the client
+        client = OpenAI(api_key= '', max_retries=0)
         
-        # Load the CSV with paper IDs and text
-        if not os.path.exists(INPUT_CSV):
-            print(f"Error: CSV file not found at {INPUT_CSV}")
+        # Load the CSV with paper IDs and text (deduplicated, so each near-duplicate is paid for once)
+        papers_path, aliases_path = default_papers(INPUT_CSV)
+        if not os.path.exists(papers_path):
+            print(f"Error: CSV file not found at {papers_path}")
             sys.exit(1)
 
-        df = pd.read_csv(INPUT_CSV)
-        print(f"[INFO] Loaded {len(df)} papers from {INPUT_CSV}")
+        df = load_papers(papers_path, columns=['paper_id', 'text'])
+        print(f"[INFO] Loaded {len(df)} papers from {papers_path}")
+        if aliases_path:
+            aliases = load_aliases(aliases_path)
+            check_aliases(df['paper_id'], aliases)
+            print(f"[INFO] Skipping {len(aliases)} near-duplicates (see {aliases_path}); build the metadata "
+                  f"store from the same file with metadata_store.py --aliases so search still returns them")
+
+        texts = df['text'].astype(str).tolist()
+        paper_ids = df['paper_id'].tolist()
+
+        # Embeddings are written straight into EMBEDDINGS_OUT and checkpointed;
+        # only papers that are new or whose text changed get embedded
+        output = IncrementalEmbeddings(EMBEDDINGS_OUT, EMBEDDING_DIM, EMBEDDING_MODEL)
+        pending = output.prepare(paper_ids, texts)
+
+        # Tokenize the pending rows once (counts cached across runs), reusing the
+        # content hashes from prepare; truncation, chunking and request packing
+        # below all come from these counts
+        corpus = tokenize_corpus(texts, EMBEDDING_MODEL, MAX_TOKENS, cache_path=TOKEN_CACHE,
+                                 rows=pending, hashes=output.hashes)
 
-        # Initialize array for embeddings
-        all_embeddings = np.zeros((len(df), 1536), dtype=np.float32)
-        
-        # Process each text with progress bar
         print(f"[INFO] Generating embeddings using OpenAI model: {EMBEDDING_MODEL}")
-        for i, row in tqdm(df.iterrows(), total=len(df), desc="Processing papers"):
-            text = str(row['text'])
-            tokens = num_tokens(text)
-            
-            if tokens <= MAX_TOKENS:
-                # For texts within token limit, process in batch
-                try:
-                    response = client.embeddings.create(
-                        model=EMBEDDING_MODEL,
-                        input=truncate_text(text)
-                    )
-                    all_embeddings[i] = response.data[0].embedding
-                except Exception as e:
-                    print(f"[WARNING] Failed to embed paper_id={row.get('paper_id', i)}: {e}")
-                    continue
-            else:
-                # For texts exceeding token limit, process in chunks
-                print(f"[INFO] Processing long text ({tokens} tokens) for paper_id={row.get('paper_id', i)}")
-                all_embeddings[i] = process_long_text(client, text)  # Added client parameter here
-
-        # Save the embeddings to a .npy file
-        print(f"[INFO] Saving embeddings to {EMBEDDINGS_OUT}")
-        np.save(EMBEDDINGS_OUT, all_embeddings)
+        pipeline = EmbeddingPipeline(client, EMBEDDING_MODEL, max_in_flight=MAX_IN_FLIGHT,
+                                     requests_per_minute=REQUESTS_PER_MINUTE,
+                                     tokens_per_minute=TOKENS_PER_MINUTE,
+                                     max_tokens=TARGET_TOKENS_PER_REQUEST)
+
+        # Chunk vectors of long papers, merged into the passages from earlier runs
+        passages = PassageIndex.load(PASSAGES_OUT, EMBEDDING_DIM) if PASSAGES_OUT else None
+
+        def embed_rows(rows, vectors):
+            # Short texts and the chunks of long texts share batched requests, several in flight at once
+            return embed_corpus_rows(pipeline, texts, corpus, rows, vectors, passages, paper_ids)
+
+        # Passages are saved with every checkpoint, before its rows are committed, so
+        # a crash can never leave committed long papers without their passages
+        save_passages = (lambda: passages.save(PASSAGES_OUT)) if passages is not None else None
+        failed = output.run(pending, embed_rows, on_checkpoint=save_passages)
+        output.close()
+        if passages is not None:
+            print(f"[INFO] {len(passages)} passages of long papers saved to {PASSAGES_OUT}")
+
+        if failed:
+            print(f"[WARNING] {len(failed)} papers could not be embedded and will be retried on the next run: "
+                  f"paper_ids={[paper_ids[i] for i in failed[:20]]}")
 
+        print(f"[INFO] Embeddings saved to {EMBEDDINGS_OUT}")
         print("[INFO] Embedding creation complete!")
         
     except Exception as e:
@@ -0,0 +1,97 @@
+import time
+from metrics import REGISTRY
+
+ANALYSIS_MODEL = "gpt-4o"
+SYSTEM_PROMPT = """You are an academic research assistant. Your role is to help users find relevant academic papers
+        and research materials."""
+# Characters of each abstract included in the prompt
+PROMPT_ABSTRACT_CHARS = 300
+
+
+def analysis_messages(system_prompt: str, user_query: str, results: str) -> list:
+    """Chat messages asking the model to relate the search results to the query."""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"""Based on the following query and search results, provide a scholarly analysis
+                    of how these papers relate to the query. Be specific about why each paper is relevant.
+
+                    Query: {user_query}
+
+                    Search Results: {results}"""}
+    ]
+
+
+def format_records(records: list) -> str:
+    """Format SearchService result dicts the way AcademicSearchEngine.format_results does."""
+    results = []
+    for record in records:
+        result = f"\nSimilarity Score: {record['relevance']:.3f}\n"
+        result += f"Title: {record.get('title') or 'N/A'}\n"
+        result += f"Abstract: {(record.get('abstract') or 'N/A')[:PROMPT_ABSTRACT_CHARS]}...\n"
+        result += "-" * 80
+        results.append(result)
+    return "\n".join(results)
+
+
+class AnalysisStreamer:
+    def __init__(self, client, model: str = ANALYSIS_MODEL, cache=None, system_prompt: str = SYSTEM_PROMPT):
+        """
+        Streams the LLM analysis of a set of search results.
+
+        Args:
+            client: OpenAI client (or anything with chat.completions.create)
+            model: Chat model
+            cache: Optional query_cache.AnalysisCache; completed analyses are
+                stored there and replayed on identical requests
+            system_prompt: System message sent with every request
+        """
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.system_prompt = system_prompt
+
+    def stream(self, user_query: str, paper_ids, results: str, trace: dict = None):
+        """
+        Yield the analysis text as it arrives.
+
+        A cached analysis is yielded as a single chunk. The analysis is only
+        cached once the stream has completed, so an abandoned stream is
+        regenerated next time.
+
+        Args:
+            user_query: The user's query
+            paper_ids: Ids of the retrieved papers, in rank order (cache key)
+            results: Formatted search results included in the prompt
+            trace: Optional dict that receives llm_ms, llm_first_token_ms and
+                analysis_cached
+        """
+        cached = self.cache.get(user_query, paper_ids, self.model) if self.cache else None
+        if trace is not None:
+            trace["analysis_cached"] = cached is not None
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        with REGISTRY.stage("llm", trace):
+            start = time.perf_counter()
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=analysis_messages(self.system_prompt, user_query, results),
+                stream=True,
+            )
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if not parts and trace is not None:
+                    trace["llm_first_token_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                parts.append(delta)
+                yield delta
+
+        if self.cache is not None:
+            self.cache.put(user_query, paper_ids, self.model, "".join(parts))
+
+    def complete(self, user_query: str, paper_ids, results: str, trace: dict = None) -> str:
+        """The whole analysis as one string."""
+        return "".join(self.stream(user_query, paper_ids, results, trace))
@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from embedding_store import EmbeddingStore, normalize_rows
+from search_core import select_top_k, search_top_k
+
+# Defaults used when the module is run as a script
+STORE_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.pemb"
+INDEX_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_index_ivf"
+
+DEFAULT_NPROBE = 8
+# Documents gathered into list order at a time while building
+BUILD_BLOCK_ROWS = 65536
+
+
+class IVFIndex:
+    def __init__(self, n_lists: int = 1024, n_iter: int = 20, train_size: int = 100000, seed: int = 42):
+        """
+        Inverted-file (IVF-flat) approximate nearest-neighbour index.
+        Documents are clustered with spherical k-means; a query only scans the
+        documents in its `nprobe` closest clusters.
+
+        Args:
+            n_lists: Number of k-means clusters (inverted lists)
+            n_iter: k-means iterations
+            train_size: Max number of vectors sampled to train the centroids
+            seed: Random seed for sampling and initialization
+        """
+        self.n_lists = n_lists
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+        self.centroids = None      # (n_lists, dim)
+        self.list_offsets = None   # (n_lists + 1,), list i is [offsets[i], offsets[i+1])
+        self.list_ids = None       # (num_docs,), document row ids grouped by list
+        self.list_vectors = None   # (num_docs, dim), normalized vectors in list order
+
+    def __len__(self) -> int:
+        return 0 if self.list_ids is None else len(self.list_ids)
+
+    def _assign(self, vectors: np.ndarray, block_size: int = 65536) -> np.ndarray:
+        """Nearest centroid (by inner product) for each row, computed in blocks."""
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), block_size):
+            block = normalize_rows(vectors[start:start + block_size])
+            assignments[start:start + block_size] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def _train(self, embeddings: np.ndarray) -> None:
+        rng = np.random.default_rng(self.seed)
+        n = len(embeddings)
+        sample_ids = np.sort(rng.choice(n, min(n, self.train_size), replace=False))
+        sample = normalize_rows(embeddings[sample_ids])
+        n_lists = min(self.n_lists, len(sample))
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=n_lists)
+            # Re-seed empty clusters from random sample points
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+            centroids = normalize_rows(sums)
+
+        self.centroids = centroids
+        self.n_lists = n_lists
+
+    def build(self, embeddings: np.ndarray, path: str = None) -> "IVFIndex":
+        """
+        Train centroids and assign every document to an inverted list.
+
+        The vectors are copied into list order a block at a time, so only one
+        corpus-sized array exists at once: in memory, or with path given, a
+        memory-mapped list_vectors.npy in the index directory (save() to the
+        same path then only flushes it).
+
+        Args:
+            embeddings: (num_docs, emb_dim) matrix; normalized here if needed
+            path: Index directory to write the list vectors straight into
+
+        Returns:
+            self, to allow IVFIndex(...).build(embs)
+        """
+        print(f"[INFO] Training {self.n_lists} IVF centroids on {min(len(embeddings), self.train_size)} vectors")
+        self._train(embeddings)
+
+        print(f"[INFO] Assigning {len(embeddings)} documents to inverted lists")
+        assignments = self._assign(embeddings)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.n_lists)
+
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.list_ids = order.astype(np.int64)
+        shape = (len(embeddings), embeddings.shape[1])
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self.list_vectors = np.lib.format.open_memmap(os.path.join(path, "list_vectors.npy"), mode="w+",
+                                                          dtype=np.float32, shape=shape)
+        else:
+            self.list_vectors = np.empty(shape, dtype=np.float32)
+        for start in range(0, len(order), BUILD_BLOCK_ROWS):
+            block = order[start:start + BUILD_BLOCK_ROWS]
+            self.list_vectors[start:start + len(block)] = normalize_rows(embeddings[block])
+        return self
+
+    def search(self, query_embs: np.ndarray, k: int = 5, nprobe: int = DEFAULT_NPROBE):
+        """
+        Approximate top-k search.
+
+        Args:
+            query_embs: (num_queries, emb_dim) or (emb_dim,) query vector(s)
+            k: Number of results per query
+            nprobe: Number of inverted lists scanned per query (clamped to 1..n_lists)
+
+        Returns:
+            (indices, scores), each (num_queries, k). Rows with fewer than k
+            candidates are padded with index -1 and score -inf.
+        """
+        queries = normalize_rows(query_embs)
+        nprobe = max(1, min(nprobe, self.n_lists))
+        probe_lists, _ = select_top_k(queries @ self.centroids.T, nprobe)
+
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for qi, lists in enumerate(probe_lists):
+            ranges = [np.arange(self.list_offsets[l], self.list_offsets[l + 1]) for l in lists]
+            positions = np.concatenate(ranges)
+            if len(positions) == 0:
+                continue
+            scores = self.list_vectors[positions] @ queries[qi]
+            top_pos, top_scores = select_top_k(scores.reshape(1, -1), k)
+            n = top_pos.shape[1]
+            out_ids[qi, :n] = self.list_ids[positions[top_pos[0]]]
+            out_scores[qi, :n] = top_scores[0]
+        return out_ids, out_scores
+
+    def save(self, path: str) -> None:
+        """Save the index as a directory of .npy files plus a small JSON header."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        np.save(os.path.join(path, "list_offsets.npy"), self.list_offsets)
+        np.save(os.path.join(path, "list_ids.npy"), self.list_ids)
+        vectors_path = os.path.join(path, "list_vectors.npy")
+        if isinstance(self.list_vectors, np.memmap) and os.path.exists(vectors_path) \
+                and os.path.samefile(self.list_vectors.filename, vectors_path):
+            self.list_vectors.flush()
+        else:
+            np.save(vectors_path, self.list_vectors)
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({"type": "ivf_flat", "n_lists": self.n_lists, "n_iter": self.n_iter,
+                       "train_size": self.train_size, "seed": self.seed,
+                       "count": len(self), "dim": int(self.centroids.shape[1])}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """Load an index saved with save(); the large arrays are memory-mapped."""
+        with open(os.path.join(path, "index.json")) as f:
+            info = json.load(f)
+        index = cls(n_lists=info["n_lists"], n_iter=info["n_iter"],
+                    train_size=info["train_size"], seed=info["seed"])
+        index.centroids = np.load(os.path.join(path, "centroids.npy"))
+        index.list_offsets = np.load(os.path.join(path, "list_offsets.npy"))
+        index.list_ids = np.load(os.path.join(path, "list_ids.npy"), mmap_mode="r")
+        index.list_vectors = np.load(os.path.join(path, "list_vectors.npy"), mmap_mode="r")
+        return index
+
+
+def load_index(path: str, embeddings: np.ndarray = None):
+    """
+    Load a saved search index of any kind by reading its index.json.
+
+    Args:
+        path: Index directory (IVF from this module, or int8/PQ from quantization.py)
+        embeddings: Full-precision embeddings, used by quantized indexes to rerank
+    """
+    with open(os.path.join(path, "index.json")) as f:
+        kind = json.load(f)["type"]
+    if kind == "ivf_flat":
+        return IVFIndex.load(path)
+    from quantization import QuantizedIndex
+    return QuantizedIndex.load(path, embeddings)
+
+
+def search_index(index, query_embs: np.ndarray, k: int = 5, nprobe: int = None):
+    """Query any index returned by load_index; nprobe only applies to IVF."""
+    if isinstance(index, IVFIndex):
+        return index.search(query_embs, k=k, nprobe=nprobe or DEFAULT_NPROBE)
+    return index.search(query_embs, k=k)
+
+
+def exact_search(query_embs: np.ndarray, embeddings: np.ndarray, k: int = 5):
+    """Brute-force top-k over normalized embeddings, used as ground truth."""
+    return search_top_k(query_embs, embeddings, k=k, normalized=True)
+
+
+def recall_at_k(index: IVFIndex, embeddings: np.ndarray, query_embs: np.ndarray,
+                k: int = 10, nprobe_values=(1, 2, 4, 8, 16, 32)):
+    """
+    Measure recall@k of the index against an exact scan for several nprobe values.
+
+    Args:
+        index: A built IVFIndex
+        embeddings: The normalized embeddings the index was built from
+        query_embs: (num_queries, emb_dim) evaluation queries
+        k: Cut-off for recall
+        nprobe_values: nprobe settings to try
+
+    Returns:
+        List of dicts with nprobe, recall and mean per-query latency (ms) for
+        the approximate and exact searches
+    """
+    start = time.perf_counter()
+    exact_ids, _ = exact_search(query_embs, embeddings, k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(query_embs)
+
+    report = []
+    for nprobe in nprobe_values:
+        start = time.perf_counter()
+        approx_ids, _ = index.search(query_embs, k, nprobe=nprobe)
+        approx_ms = (time.perf_counter() - start) * 1000 / len(query_embs)
+        hits = sum(len(np.intersect1d(a, e)) for a, e in zip(approx_ids, exact_ids))
+        report.append({
+            "nprobe": nprobe,
+            "recall": hits / exact_ids.size,
+            "approx_ms_per_query": approx_ms,
+            "exact_ms_per_query": exact_ms,
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an IVF approximate nearest-neighbour index.")
+    parser.add_argument("--store", type=str, default=STORE_PATH, help="Embedding store built with embedding_store.py.")
+    parser.add_argument("--output", type=str, default=INDEX_PATH, help="Directory to save the index to.")
+    parser.add_argument("--n_lists", type=int, default=None,
+                        help="Number of clusters (default: ~4*sqrt(num_docs)).")
+    parser.add_argument("--n_iter", type=int, default=20, help="k-means iterations.")
+    parser.add_argument("--k", type=int, default=10, help="Cut-off used for the recall report.")
+    parser.add_argument("--n_eval", type=int, default=200,
+                        help="Number of documents reused as evaluation queries.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.store):
+        print(f"Error: embedding store not found at {args.store}")
+        sys.exit(1)
+
+    store = EmbeddingStore(args.store)
+    n_lists = args.n_lists or max(1, int(4 * np.sqrt(len(store))))
+    index = IVFIndex(n_lists=n_lists, n_iter=args.n_iter).build(store.embeddings, path=args.output)
+    index.save(args.output)
+    print(f"[INFO] IVF index saved to {args.output}")
+
+    rng = np.random.default_rng(0)
+    eval_ids = rng.choice(len(store), min(args.n_eval, len(store)), replace=False)
+    query_embs = np.asarray(store.embeddings[np.sort(eval_ids)])
+    print(f"\n[INFO] Recall@{args.k} against exact scan ({len(eval_ids)} queries):")
+    for row in recall_at_k(index, store.embeddings, query_embs, k=args.k):
+        print(f"nprobe={row['nprobe']:<4d} recall={row['recall']:.3f}  "
+              f"approx={row['approx_ms_per_query']:.2f} ms  exact={row['exact_ms_per_query']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,235 @@
-from flask import Flask, request, jsonify
-import time
+from flask import Flask, Response, request, jsonify, stream_with_context
+import os
+import json
+
+from search_service import SearchService
+from metrics import REGISTRY
+from analysis import AnalysisStreamer, format_records, ANALYSIS_MODEL
+from query_cache import AnalysisCache, CACHE_PATH
+from batch_search import query_items
 
 app = Flask(__name__)
 
+MAX_RESULTS = 50
+MAX_BATCH_QUERIES = 10000
+
+# Loaded once at import. Under gunicorn with preload_app (see gunicorn.conf.py)
+# this runs in the master before fork, so workers share the memory copy-on-write.
+# With SEARCH_SNAPSHOT_ROOT set, the current snapshot (see snapshot.py) is
+# served and newer ones are swapped in while running (see hot_reload.py).
+service_kwargs = dict(encoder_backend=os.environ.get("SEARCH_ENCODER_BACKEND", "torch"),
+                      num_threads=int(os.environ.get("SEARCH_ENCODER_THREADS", "1")),
+                      hybrid_mode=os.environ.get("SEARCH_HYBRID_MODE", "rrf"))
+reloader = None
+try:
+    if os.environ.get("SEARCH_SNAPSHOT_ROOT"):
+        from hot_reload import ReloadingSearchService, POLL_SECONDS
+        reloader = ReloadingSearchService(os.environ["SEARCH_SNAPSHOT_ROOT"],
+                                          float(os.environ.get("SEARCH_SNAPSHOT_POLL", POLL_SECONDS)),
+                                          **service_kwargs)
+        service = None
+    else:
+        service = SearchService(index_path=os.environ.get("SEARCH_INDEX_PATH"),
+                                bm25_path=os.environ.get("SEARCH_BM25_PATH"), **service_kwargs)
+except FileNotFoundError as e:
+    print(f"[ERROR] Search service unavailable: {e}")
+    service = None
+
+
+# With SEARCH_BATCH_WINDOW_MS set, concurrent /search and /search/stream
+# queries are coalesced into micro-batches (see micro_batch.py). Batching needs
+# several requests in flight per process: run gunicorn with threads > 1.
+batcher = None
+if os.environ.get("SEARCH_BATCH_WINDOW_MS"):
+    from micro_batch import QueryBatcher, DEFAULT_MAX_BATCH
+    batcher = QueryBatcher(window_ms=float(os.environ["SEARCH_BATCH_WINDOW_MS"]),
+                           max_batch=int(os.environ.get("SEARCH_BATCH_MAX", DEFAULT_MAX_BATCH)))
+
+
+def get_service():
+    """
+    The search service for one request, or None. Take it once per request:
+    a hot reload may install a new version at any time, and a request must
+    finish on the version it started on.
+    """
+    return reloader.current() if reloader is not None else service
+
+_analyzer = None
+
+
+def get_analyzer():
+    """
+    This worker's LLM analysis streamer, or None when no OpenAI key is set.
+    Created on first use so every gunicorn worker opens its own HTTP client.
+    """
+    global _analyzer
+    if _analyzer is None and os.environ.get("OPENAI_API_KEY"):
+        from openai import OpenAI
+        _analyzer = AnalysisStreamer(OpenAI(), model=os.environ.get("SEARCH_ANALYSIS_MODEL", ANALYSIS_MODEL),
+                                     cache=AnalysisCache(os.environ.get("SEARCH_CACHE_PATH", CACHE_PATH)))
+    return _analyzer
+
+
+def run_search(service, query, k, trace=None):
+    """One query's results, through the micro-batcher when it is enabled."""
+    if batcher is not None:
+        return batcher.search(service, query, k=k, trace=trace)
+    return service.search(query, k=k, trace=trace)
+
+
+def parse_k(value):
+    """The requested number of results clamped to 1..MAX_RESULTS, or None if it is not an integer."""
+    try:
+        k = int(value)
+    except (TypeError, ValueError):
+        return None
+    return max(1, min(k, MAX_RESULTS))
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def versioned(response, service):
+    """Tag a response with the index version that served it."""
+    if service is not None and service.version:
+        response.headers['X-Index-Version'] = service.version
+    return response
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    service = get_service()
+    if service is None or not service.ready:
+        return jsonify({'ready': False}), 503
+    return jsonify({'ready': True, 'index_version': service.version})
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 
 @app.route('/search', methods=['POST'])
 def search():
-    query = request.json.get('query')
+    REGISTRY.inc('requests')
+    params = request.get_json(silent=True)
+    if not isinstance(params, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    query = params.get('query')
+    if query is not None and not isinstance(query, str):
+        return jsonify({'error': 'query must be a string'}), 400
+    if not query or query.strip() == '':
+        return jsonify({'error': 'You have not entered any keywords'}), 400
+    k = parse_k(params.get('k', 5))
+    if k is None:
+        return jsonify({'error': 'k must be an integer'}), 400
+    service = get_service()
+    if service is None:
+        return jsonify({'error': 'Search index is not loaded'}), 503
+    # "trace": true returns this request's per-stage timings alongside the results
+    trace = {} if params.get('trace') else None
+    results = run_search(service, query.strip(), k, trace)
+    body = {'results': results, 'index_version': service.version}
+    if trace is not None:
+        body['trace'] = trace
+    return versioned(jsonify(body), service)
+
+
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Many queries in one request: JSON {"queries": [...], "k": 5}, a JSON
+    array of queries, or a JSONL body of {"id", "query"} lines (k as a query
+    parameter for the last two). Queries may be strings or {"id", "query"}
+    objects. Results stream back as JSONL, one
+    {"id", "query", "results"} line per query, in input order.
+    """
+    REGISTRY.inc('batch_requests')
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        raw, k = body.get('queries') or [], body.get('k', 5)
+    elif isinstance(body, list):
+        raw, k = body, request.args.get('k', 5)
+    else:
+        try:
+            raw = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            return jsonify({'error': 'Body must be JSON or JSON lines'}), 400
+        k = request.args.get('k', 5)
+    if not isinstance(raw, list):
+        return jsonify({'error': 'queries must be a list'}), 400
+    try:
+        items = query_items(raw)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not items:
+        return jsonify({'error': 'No queries given'}), 400
+    if len(items) > MAX_BATCH_QUERIES:
+        return jsonify({'error': f'At most {MAX_BATCH_QUERIES} queries per batch'}), 413
+    k = parse_k(k)
+    if k is None:
+        return jsonify({'error': 'k must be an integer'}), 400
+    service = get_service()
+    if service is None:
+        return jsonify({'error': 'Search index is not loaded'}), 503
+
+    def generate():
+        results = service.search_batch([item['query'] for item in items], k=k)
+        for item, hits in zip(items, results):
+            yield json.dumps({'id': item['id'], 'query': item['query'], 'results': hits}) + '\n'
+
+    return versioned(Response(stream_with_context(generate()), mimetype='application/x-ndjson'), service)
+
+
+@app.route('/search/stream', methods=['GET', 'POST'])
+def search_stream():
+    """
+    Server-sent events: a "results" event as soon as retrieval is done, then
+    "analysis" events carrying the LLM analysis as it is generated, then "done".
+    Takes the same fields as /search, as JSON or query parameters.
+    """
+    REGISTRY.inc('requests')
+    params = request.get_json(silent=True) or request.args
+    if not isinstance(params, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    query = params.get('query')
+    if query is not None and not isinstance(query, str):
+        return jsonify({'error': 'query must be a string'}), 400
     if not query or query.strip() == '':
         return jsonify({'error': 'You have not entered any keywords'}), 400
-    # 模拟异步操作
-    time.sleep(2)
-    sample_results = [
-        {
-            "title": f"Paper: {query} - Result 1",
-            "author": "Author A",
-            "year": 2023,
-            "abstract": f"This is a sample abstract containing \"{query}\".",
-            "relevance": 0.95
-        },
-        {
-            "title": f"Paper: {query} - Result 2",
-            "author": "Author B",
-            "year": 2022,
-            "abstract": f"Another example abstract with \"{query}\".",
-            "relevance": 0.88
-        }
-    ]
-    return jsonify({'results': sample_results})
+    k = parse_k(params.get('k', 5))
+    if k is None:
+        return jsonify({'error': 'k must be an integer'}), 400
+    service = get_service()
+    if service is None:
+        return jsonify({'error': 'Search index is not loaded'}), 503
+    query = query.strip()
+    trace = {} if params.get('trace') else None
+    results = run_search(service, query, k, trace)
+
+    def generate():
+        yield sse('results', results)
+        analyzer = get_analyzer()
+        if analyzer is not None:
+            try:
+                paper_ids = [r['paper_id'] for r in results]
+                for text in analyzer.stream(query, paper_ids, format_records(results), trace):
+                    yield sse('analysis', text)
+            except Exception as e:
+                yield sse('error', {'error': f'Analysis failed: {e}'})
+        done = {'index_version': service.version}
+        if trace is not None:
+            done['trace'] = trace
+        yield sse('done', done)
+
+    return versioned(Response(stream_with_context(generate()), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}), service)
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    if get_service() is not None:
+        get_service().warmup()
+    if reloader is not None:
+        reloader.start()
+    app.run(debug=True, use_reloader=False)
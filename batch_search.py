@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# Corpus rows whose neighbours are computed per block in the all-pairs job
+NEIGHBOUR_BLOCK_ROWS = 1024
+
+
+def query_items(items) -> list:
+    """
+    Normalize batch input to [{"id", "query"}]. Each item may be a query
+    string or a dict with "query" and an optional "id" (defaults to its
+    position). Blank queries are dropped.
+
+    Raises:
+        ValueError: An item is neither a string nor a dict with a string "query"
+    """
+    out = []
+    for pos, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict) or not isinstance(item.get("query"), str):
+            raise ValueError(f"Item {pos} must be a query string or an object with a \"query\" string")
+        query = item["query"].strip()
+        if query:
+            out.append({"id": item.get("id", pos), "query": query})
+    return out
+
+
+def read_queries(path: str) -> list:
+    """
+    Read a batch of queries from a JSONL file (one {"id", "query"} object or
+    JSON string per line) or a Queries.txt-format file (the id is the paper
+    the query was written for).
+
+    Raises:
+        ValueError: A line is not a query string or {"id", "query"} object
+    """
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            return query_items(json.loads(line) for line in f if line.strip())
+    from bench_retrieval import parse_queries_file
+    return query_items({"id": pid, "query": query} for pid, query in parse_queries_file(path))
+
+
+def open_output(path: str):
+    return sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+
+def run_queries(args) -> None:
+    from search_service import SearchService
+
+    items = read_queries(args.input)
+    print(f"[INFO] {len(items)} queries from {args.input}", file=sys.stderr)
+    service = SearchService(index_path=args.index_path, encoder_backend=args.encoder_backend,
+                            num_threads=args.threads, cache_path=None)
+    start = time.perf_counter()
+    out = open_output(args.output)
+    try:
+        results = service.search_batch([item["query"] for item in items], k=args.k, batch_size=args.batch_size)
+        for item, hits in zip(items, results):
+            if args.no_text:
+                hits = [{"paper_id": h["paper_id"], "relevance": h["relevance"]} for h in hits]
+            out.write(json.dumps({"id": item["id"], "query": item["query"], "results": hits}) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] {len(items)} queries in {elapsed:.1f}s "
+          f"({len(items) / max(elapsed, 1e-9):.0f} queries/s)", file=sys.stderr)
+
+
+def all_pairs_neighbours(doc_embs, k: int = 10, block_rows: int = NEIGHBOUR_BLOCK_ROWS):
+    """
+    Exact k nearest neighbours of every document, excluding itself.
+
+    Args:
+        doc_embs: (num_docs, emb_dim) matrix, memmap, or EmbeddingStore
+        k: Neighbours per document
+        block_rows: Documents used as one query block
+
+    Yields:
+        (first row, ids, scores) per block, ids and scores (block, k)
+    """
+    from embedding_store import EmbeddingStore
+    from search_core import search_top_k
+
+    normalized = isinstance(doc_embs, EmbeddingStore)
+    matrix = doc_embs.embeddings if normalized else doc_embs
+    for start in range(0, len(matrix), block_rows):
+        block = np.asarray(matrix[start:start + block_rows], dtype=np.float32)
+        # One extra so each row's own (top) hit can be dropped
+        ids, scores = search_top_k(block, matrix, k=k + 1, normalized=normalized)
+        rows = np.arange(start, start + len(block)).reshape(-1, 1)
+        keep = ids != rows
+        # Rows whose own hit was not in the top k + 1 (exact duplicates) just drop the last
+        keep[keep.all(axis=1), -1] = False
+        yield start, ids[keep].reshape(len(block), -1)[:, :k], scores[keep].reshape(len(block), -1)[:, :k]
+
+
+def run_neighbours(args) -> None:
+    from semantic_search import load_embeddings_and_metadata
+
+    doc_embs, metadata = load_embeddings_and_metadata()
+    paper_ids = metadata.all_paper_ids()
+    print(f"[INFO] Computing {args.k} neighbours for each of {len(paper_ids)} papers", file=sys.stderr)
+    start = time.perf_counter()
+    out = open_output(args.output)
+    try:
+        for first, ids, scores in all_pairs_neighbours(doc_embs, k=args.k, block_rows=args.batch_size):
+            for offset, (row_ids, row_scores) in enumerate(zip(ids, scores)):
+                neighbours = [{"paper_id": paper_ids[i], "relevance": round(float(s), 4)}
+                              for i, s in zip(row_ids, row_scores)]
+                out.write(json.dumps({"paper_id": paper_ids[first + offset], "neighbours": neighbours}) + "\n")
+            print(f"[INFO] {min(first + len(ids), len(paper_ids))}/{len(paper_ids)} papers", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"[INFO] Done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    from query_encoder import BACKENDS, DEFAULT_BACKEND, DEFAULT_THREADS
+    from search_service import BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="Batch search: many queries, or every paper's neighbours, "
+                                                 "written as JSONL.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    queries = commands.add_parser("queries", help="Search every query in a JSONL or Queries.txt file.")
+    queries.add_argument("--input", type=str, required=True, help="Queries (.jsonl, or Queries.txt format).")
+    queries.add_argument("--output", type=str, default="-", help="JSONL results file ('-' for stdout).")
+    queries.add_argument("--k", type=int, default=10)
+    queries.add_argument("--batch_size", type=int, default=BATCH_SIZE, help="Queries embedded and scored together.")
+    queries.add_argument("--index_path", type=str, default=None,
+                         help="Optional IVF or quantized index directory to search.")
+    queries.add_argument("--encoder_backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    queries.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    queries.add_argument("--no_text", action="store_true", help="Only write paper ids and scores.")
+    queries.set_defaults(run=run_queries)
+
+    neighbours = commands.add_parser("neighbours", help="Exact top-k related papers for every paper.")
+    neighbours.add_argument("--output", type=str, default="-", help="JSONL results file ('-' for stdout).")
+    neighbours.add_argument("--k", type=int, default=10)
+    neighbours.add_argument("--batch_size", type=int, default=NEIGHBOUR_BLOCK_ROWS,
+                            help="Papers scored together per block.")
+    neighbours.set_defaults(run=run_neighbours)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "input", None) and not os.path.exists(args.input):
+        print(f"Error: queries file not found at {args.input}")
+        sys.exit(1)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
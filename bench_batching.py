@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import urllib.request
+import numpy as np
+from bench_retrieval import parse_queries_file, HashingEmbedder, QUERIES_FILE
+from micro_batch import QueryBatcher, DEFAULT_MAX_BATCH
+
+
+def load_test(search_fn, queries, concurrency: int, duration: float) -> dict:
+    """
+    Closed-loop load: concurrency client threads each send a query, wait for
+    the answer and send the next, for duration seconds. Every query is made
+    unique so the query-embedding cache never answers it.
+
+    Returns:
+        Throughput and latency percentiles (ms)
+    """
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    stop_at = time.perf_counter() + duration
+
+    def client(slot):
+        i = slot
+        while time.perf_counter() < stop_at:
+            query = f"{queries[i % len(queries)]} #{i}"
+            start = time.perf_counter()
+            try:
+                search_fn(query)
+                latencies[slot].append(time.perf_counter() - start)
+            except Exception:
+                errors[slot] += 1
+            i += concurrency
+
+    threads = [threading.Thread(target=client, args=(slot,)) for slot in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    ms = np.concatenate([np.asarray(slot) for slot in latencies]) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": int(len(ms)),
+        "errors": sum(errors),
+        "qps": round(len(ms) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2) if len(ms) else None,
+        "p95_ms": round(float(np.percentile(ms, 95)), 2) if len(ms) else None,
+        "p99_ms": round(float(np.percentile(ms, 99)), 2) if len(ms) else None,
+    }
+
+
+def http_search_fn(url: str, k: int):
+    def search(query):
+        request = urllib.request.Request(url, data=json.dumps({"query": query, "k": k}).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.loads(response.read())
+    return search
+
+
+def synthetic_service(num_docs: int, dim: int, work_dir: str):
+    """A SearchService over random embeddings with the offline hashing encoder, via a temporary snapshot."""
+    import pandas as pd
+    from embedding_store import build_embedding_store
+    from metadata_store import build_metadata_store
+    from search_service import SearchService
+    from snapshot import publish_snapshot
+
+    rng = np.random.default_rng(0)
+    build_embedding_store(rng.standard_normal((num_docs, dim), dtype=np.float32),
+                          os.path.join(work_dir, "embeddings.pemb"), f"hashing-{dim}")
+    build_metadata_store(pd.DataFrame({"paper_id": np.arange(num_docs), "text": ["synthetic paper"] * num_docs}),
+                         os.path.join(work_dir, "metadata.sqlite"))
+    version = publish_snapshot(os.path.join(work_dir, "snapshots"), os.path.join(work_dir, "embeddings.pemb"),
+                               os.path.join(work_dir, "metadata.sqlite"), version="synthetic")
+    encoder = HashingEmbedder(dim)
+    encoder.cache_key = encoder.name
+    return SearchService(snapshot=os.path.join(work_dir, "snapshots", version), encoder=encoder, cache_path=None)
+
+
+def main():
+    from query_encoder import BACKENDS, DEFAULT_BACKEND
+
+    parser = argparse.ArgumentParser(description="Throughput and latency of /search with and without "
+                                                 "request micro-batching, across client concurrency.")
+    parser.add_argument("--queries", type=str, default=QUERIES_FILE, help="Queries.txt-format file.")
+    parser.add_argument("--concurrency", type=str, default="1,4,16,64", help="Comma-separated client counts.")
+    parser.add_argument("--windows", type=str, default="off,0,2,5",
+                        help="Comma-separated batching windows in ms; 'off' searches without the batcher.")
+    parser.add_argument("--max_batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per measurement.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--url", type=str, default=None,
+                        help="Load-test a running server's /search instead (its own batching settings apply).")
+    parser.add_argument("--synthetic", type=int, default=None,
+                        help="Search N random embeddings with the offline hashing encoder instead of the real data.")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension for --synthetic.")
+    parser.add_argument("--index_path", type=str, default=None)
+    parser.add_argument("--encoder_backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--output", type=str, default="bench_batching.json")
+    args = parser.parse_args()
+
+    queries = [query for _, query in parse_queries_file(args.queries)]
+    if not queries:
+        raise SystemExit(f"Error: no queries in {args.queries}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+    report = []
+
+    if args.url:
+        search_fn = http_search_fn(args.url, args.k)
+        for concurrency in levels:
+            row = {"window_ms": "server", **load_test(search_fn, queries, concurrency, args.duration)}
+            report.append(row)
+            print(f"[INFO] server, {concurrency} clients: {row['qps']} q/s, p50 {row['p50_ms']} ms, "
+                  f"p99 {row['p99_ms']} ms")
+    else:
+        work_dir = tempfile.mkdtemp(prefix="bench_batching_") if args.synthetic else None
+        try:
+            if args.synthetic:
+                service = synthetic_service(args.synthetic, args.dim, work_dir)
+            else:
+                from search_service import SearchService
+                service = SearchService(index_path=args.index_path, encoder_backend=args.encoder_backend,
+                                        cache_path=None)
+            service.warmup()
+            for window in args.windows.split(","):
+                if window == "off":
+                    search_fn = lambda query: service.search(query, k=args.k)
+                else:
+                    batcher = QueryBatcher(window_ms=float(window), max_batch=args.max_batch)
+                    search_fn = lambda query, batcher=batcher: batcher.search(service, query, k=args.k)
+                for concurrency in levels:
+                    row = {"window_ms": window, **load_test(search_fn, queries, concurrency, args.duration)}
+                    report.append(row)
+                    print(f"[INFO] window {window}, {concurrency} clients: {row['qps']} q/s, "
+                          f"p50 {row['p50_ms']} ms, p99 {row['p99_ms']} ms")
+        finally:
+            if work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump({"k": args.k, "duration": args.duration, "max_batch": args.max_batch, "url": args.url,
+                   "synthetic": args.synthetic, "cpu_count": os.cpu_count(), "results": report}, f, indent=2)
+
+    print(f"\n{'window':>8}{'clients':>9}{'q/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for row in report:
+        print(f"{row['window_ms']:>8}{row['concurrency']:>9}{row['qps']:>9}{str(row['p50_ms']):>9}"
+              f"{str(row['p95_ms']):>9}{str(row['p99_ms']):>9}")
+    print(f"\n[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+from bench_parse import measure
+from parse_raw_data import load_papers
+from metadata_store import build_metadata_store, MetadataStore, METADATA_PATH, PAPERS_PATH
+
+SNIPPET_CHARS = 500
+
+
+def _lookup_ms(fetch, num_rows: int, k: int, n_lookups: int) -> float:
+    """Mean milliseconds to fetch the records of k random rows."""
+    rng = np.random.default_rng(0)
+    lookups = [rng.choice(num_rows, k, replace=False) for _ in range(n_lookups)]
+    start = time.perf_counter()
+    for rows in lookups:
+        fetch(rows)
+    return (time.perf_counter() - start) * 1000 / n_lookups
+
+
+def prepare(papers, pickle_file, store_file):
+    # In a child too, so the measured processes do not inherit the loaded papers
+    df = load_papers(papers, columns=["paper_id", "text"])
+    with open(pickle_file, "wb") as f:
+        pickle.dump({"paper_ids": df["paper_id"].tolist(), "texts": df["text"].tolist()}, f)
+    build_metadata_store(df, store_file)
+    return {"num_papers": len(df)}
+
+
+def baseline():
+    # Interpreter and imports only, for reference
+    return {"startup_s": 0.0}
+
+
+def pickle_path(path, k, n_lookups):
+    # The old semantic_search.py path: unpickle everything, index lists
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        meta = pickle.load(f)
+    startup = time.perf_counter() - start
+    fetch_ms = _lookup_ms(lambda rows: [(meta["paper_ids"][r], meta["texts"][r][:SNIPPET_CHARS]) for r in rows],
+                          len(meta["paper_ids"]), k, n_lookups)
+    return {"startup_s": startup, "fetch_ms": fetch_ms}
+
+
+def dataframe_path(path, k, n_lookups):
+    # The old semantic_searchV2.py path: the whole papers file in a DataFrame, iloc per result
+    start = time.perf_counter()
+    df = load_papers(path)
+    startup = time.perf_counter() - start
+    fetch_ms = _lookup_ms(lambda rows: [df.iloc[r]["text"][:SNIPPET_CHARS] for r in rows], len(df), k, n_lookups)
+    return {"startup_s": startup, "fetch_ms": fetch_ms}
+
+
+def sqlite_path(path, k, n_lookups):
+    start = time.perf_counter()
+    store = MetadataStore(path)
+    startup = time.perf_counter() - start
+    fetch_ms = _lookup_ms(lambda rows: store.records(rows, snippet_chars=SNIPPET_CHARS), len(store), k, n_lookups)
+    return {"startup_s": startup, "fetch_ms": fetch_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and memory of the paper metadata paths.")
+    parser.add_argument("--papers", type=str, default=PAPERS_PATH, help="papers.csv or papers.parquet.")
+    parser.add_argument("--workdir", type=str, default=".", help="Where the pickle and store are written.")
+    parser.add_argument("--k", type=int, default=5, help="Records fetched per lookup.")
+    parser.add_argument("--n_lookups", type=int, default=200)
+    parser.add_argument("--output", type=str, default="bench_metadata.json")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.papers):
+        print(f"Error: papers file not found at {args.papers}")
+        sys.exit(1)
+
+    pickle_file = os.path.join(args.workdir, "bench_metadata.pkl")
+    store_file = os.path.join(args.workdir, os.path.basename(METADATA_PATH))
+    print("[INFO] Writing the pickle and the metadata store...")
+    num_papers = measure(prepare, args.papers, pickle_file, store_file, trace=False)["num_papers"]
+
+    results = {"papers": args.papers, "num_papers": num_papers, "k": args.k,
+               "pickle_mb": os.path.getsize(pickle_file) / 2**20, "sqlite_mb": os.path.getsize(store_file) / 2**20}
+    for name, target, target_args in (("baseline", baseline, ()),
+                                      ("pickle", pickle_path, (pickle_file, args.k, args.n_lookups)),
+                                      ("dataframe", dataframe_path, (args.papers, args.k, args.n_lookups)),
+                                      ("sqlite", sqlite_path, (store_file, args.k, args.n_lookups))):
+        print(f"[INFO] Measuring {name}...")
+        results[name] = measure(target, *target_args)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'path':<12}{'startup s':>11}{'peak RSS MB':>14}{f'top-{args.k} fetch ms':>18}")
+    for name in ("baseline", "pickle", "dataframe", "sqlite"):
+        row = results[name]
+        rss = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "n/a"
+        fetch = f"{row['fetch_ms']:.3f}" if "fetch_ms" in row else "-"
+        print(f"{name:<12}{row['startup_s']:>11.3f}{rss:>14}{fetch:>18}")
+    print(f"\n[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
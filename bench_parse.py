@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+import tracemalloc
+import pandas as pd
+from parse_raw_data import RAW_DATA_FILE, parse_raw_text, write_parquet, iter_raw_records, load_papers
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where unavailable."""
+    if resource is None:
+        return None
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def _run_in_child(target, args, queue, traced):
+    if traced:
+        tracemalloc.start()
+        target(*args)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        queue.put({"peak_python_alloc_mb": traced_peak / (1024 * 1024)})
+        return
+    start = time.perf_counter()
+    extra = target(*args)
+    elapsed = time.perf_counter() - start
+    result = {"seconds": elapsed, "peak_rss_mb": _peak_rss_mb()}
+    result.update(extra or {})
+    queue.put(result)
+
+
+def _run(target, args, traced):
+    queue = mp.Queue()
+    proc = mp.Process(target=_run_in_child, args=(target, args, queue, traced))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def measure(target, *args, trace: bool = True):
+    """
+    Run target(*args) in a fresh process so its peak memory is its own.
+    A dict returned by target is merged into the result.
+
+    The timed run is untraced (tracemalloc slows allocation-heavy code
+    several times over); with trace, a second run in another process
+    measures the peak Python allocation.
+    """
+    result = _run(target, args, traced=False)
+    if trace:
+        result.update(_run(target, args, traced=True))
+    return result
+
+
+def csv_path(raw_file, out_path):
+    # The current path: list of dicts -> DataFrame -> CSV
+    df = pd.DataFrame(parse_raw_text(raw_file), columns=["paper_id", "text"])
+    df["paper_id"] = df["paper_id"].astype(int)
+    df.to_csv(out_path, index=False)
+
+
+def parquet_path(raw_file, out_path):
+    write_parquet(iter_raw_records(raw_file), out_path)
+
+
+def load_all(path):
+    load_papers(path)
+
+
+def load_ids(path):
+    load_papers(path, columns=["paper_id"])
+
+
+def load_slice(path):
+    # Rows for the first 1000 papers only
+    if path.endswith(".parquet"):
+        load_papers(path, filters=[("paper_id", "<", 1000)])
+    else:
+        df = load_papers(path)
+        df[df["paper_id"] < 1000]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CSV and streaming Parquet parse paths.")
+    parser.add_argument("--input", type=str, default=RAW_DATA_FILE, help="rawtext.dat to parse.")
+    parser.add_argument("--workdir", type=str, default=".", help="Where the outputs are written.")
+    parser.add_argument("--output", type=str, default="bench_parse.json", help="JSON results file.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: raw data file not found at {args.input}")
+        sys.exit(1)
+
+    out_csv = os.path.join(args.workdir, "bench_papers.csv")
+    out_parquet = os.path.join(args.workdir, "bench_papers.parquet")
+    results = {"input": args.input, "input_mb": os.path.getsize(args.input) / (1024 * 1024)}
+
+    print("[INFO] Parsing to CSV (list of dicts + DataFrame)...")
+    results["parse_csv"] = measure(csv_path, args.input, out_csv)
+    print("[INFO] Parsing to Parquet (streaming row groups)...")
+    results["parse_parquet"] = measure(parquet_path, args.input, out_parquet)
+    results["csv_mb"] = os.path.getsize(out_csv) / (1024 * 1024)
+    results["parquet_mb"] = os.path.getsize(out_parquet) / (1024 * 1024)
+
+    for name, loader in (("load_all", load_all), ("load_ids", load_ids), ("load_slice", load_slice)):
+        for fmt, path in (("csv", out_csv), ("parquet", out_parquet)):
+            print(f"[INFO] {name} from {fmt}...")
+            results[f"{name}_{fmt}"] = measure(loader, path)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'step':<22}{'seconds':>10}{'peak RSS MB':>14}")
+    for key, value in results.items():
+        if isinstance(value, dict):
+            rss = value["peak_rss_mb"]
+            print(f"{key:<22}{value['seconds']:>10.2f}{(f'{rss:.0f}' if rss is not None else 'n/a'):>14}")
+    print(f"\n[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
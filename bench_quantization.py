@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import numpy as np
+from embedding_store import EmbeddingStore, normalize_rows
+from search_core import search_top_k
+from quantization import QuantizedIndex, ScalarQuantizer, ProductQuantizer, STORE_PATH, DEFAULT_SHORTLIST
+
+
+def recall(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(a, e)) for a, e in zip(approx_ids, exact_ids))
+    return hits / exact_ids.size
+
+
+def timed_search(search_fn, queries: np.ndarray):
+    """Run queries one at a time (as the server does); returns (ids, ms per query)."""
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(search_fn(query.reshape(1, -1))[0][0])
+    return np.array(results), (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def peak_search_mb(search_fn, queries: np.ndarray) -> float:
+    """Largest transient allocation (MB) made by one query, measured separately from the timing."""
+    peak = 0
+    for query in queries:
+        tracemalloc.start()
+        search_fn(query.reshape(1, -1))
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare float32, int8 and PQ search: memory, latency, recall@k.")
+    parser.add_argument("--store", type=str, default=STORE_PATH, help="Embedding store to benchmark.")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Benchmark N random clustered vectors instead of a store.")
+    parser.add_argument("--dim", type=int, default=1536, help="Dimension of synthetic vectors.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n_queries", type=int, default=100)
+    parser.add_argument("--shortlist", type=int, default=DEFAULT_SHORTLIST)
+    parser.add_argument("--pq_m", type=int, default=96)
+    parser.add_argument("--output", type=str, default="bench_quantization.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        centers = rng.standard_normal((256, args.dim))
+        labels = rng.integers(0, 256, args.synthetic)
+        embeddings = normalize_rows(centers[labels] + rng.standard_normal((args.synthetic, args.dim)))
+    elif os.path.exists(args.store):
+        embeddings = EmbeddingStore(args.store).embeddings
+    else:
+        print(f"Error: embedding store not found at {args.store} (or use --synthetic N)")
+        sys.exit(1)
+
+    # Queries: perturbed copies of random documents
+    picks = rng.choice(len(embeddings), args.n_queries, replace=False)
+    queries = np.asarray(embeddings[np.sort(picks)]) + 0.05 * rng.standard_normal((args.n_queries, embeddings.shape[1]))
+    queries = normalize_rows(queries)
+
+    exact_fn = lambda q: search_top_k(q, embeddings, k=args.k, normalized=True)
+    exact_ids, exact_ms = timed_search(exact_fn, queries)
+    report = [{"mode": "float32", "index_mb": embeddings.nbytes / 2**20, "ms_per_query": exact_ms,
+               "peak_mb": peak_search_mb(exact_fn, queries[:3]), "recall": 1.0}]
+
+    for quantizer in (ScalarQuantizer(), ProductQuantizer(m=args.pq_m)):
+        start = time.perf_counter()
+        index = QuantizedIndex(quantizer, embeddings, shortlist=args.shortlist).build(embeddings)
+        build_s = time.perf_counter() - start
+        for rerank in (False, True):
+            search_fn = lambda q: index.search(q, k=args.k, rerank=rerank)
+            ids, ms = timed_search(search_fn, queries)
+            report.append({
+                "mode": quantizer.kind + ("+rerank" if rerank else ""),
+                "index_mb": index.nbytes / 2**20,
+                "ms_per_query": ms,
+                "peak_mb": peak_search_mb(search_fn, queries[:3]),
+                "recall": recall(ids, exact_ids),
+                "build_s": build_s,
+            })
+
+    with open(args.output, "w") as f:
+        json.dump({"num_docs": len(embeddings), "dim": int(embeddings.shape[1]), "k": args.k,
+                   "shortlist": args.shortlist, "results": report}, f, indent=2)
+
+    print(f"\n{'mode':<14}{'index MB':>10}{'peak MB':>10}{'ms/query':>10}{f'recall@{args.k}':>12}")
+    for row in report:
+        print(f"{row['mode']:<14}{row['index_mb']:>10.1f}{row['peak_mb']:>10.1f}{row['ms_per_query']:>10.2f}"
+              f"{row['recall']:>12.3f}")
+    print(f"\n[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
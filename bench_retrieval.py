@@ -0,0 +1,226 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+import tempfile
+import numpy as np
+from embedding_store import normalize_rows
+from parse_raw_data import load_papers
+
+QUERIES_FILE = "Queries.txt"
+PAPERS_PATH = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/papers.csv"
+LOCAL_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+RECALL_CUTOFFS = (1, 5, 10)
+
+QUERY_PATTERN = re.compile(r'Abstract\s+(\d+)\s*:\s*"([^"]+)"')
+
+
+def parse_queries_file(path: str):
+    """
+    Parse a Queries.txt-style file into (paper_id, query) pairs. Each entry is
+    an 'Abstract <paper_id>:' line followed by the query in double quotes.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [(int(pid), " ".join(query.split())) for pid, query in QUERY_PATTERN.findall(f.read())]
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 512):
+        """
+        Deterministic, offline stand-in for a sentence encoder: signed feature
+        hashing of lower-cased words. Shares encode() with SentenceTransformer
+        so every search path can use it unchanged.
+        """
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            h = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:8], "little")
+            vector[h % self.dim] += 1.0 if (h >> 63) else -1.0
+        return vector
+
+    def encode(self, texts, batch_size: int = 64, show_progress_bar: bool = False):
+        if isinstance(texts, str):
+            return self._embed_one(texts)
+        return np.stack([self._embed_one(t) for t in texts]) if len(texts) else np.zeros((0, self.dim), np.float32)
+
+
+class TimedEmbedder:
+    """Wraps an embedder and records how long each encode() call took."""
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.last_ms = 0.0
+
+    def encode(self, texts, **kwargs):
+        start = time.perf_counter()
+        result = self.embedder.encode(texts, **kwargs)
+        self.last_ms = (time.perf_counter() - start) * 1000
+        return result
+
+
+def _percentiles(values):
+    values = np.asarray(values)
+    return {f"p{p}": float(np.percentile(values, p)) for p in (50, 95, 99)}
+
+
+def evaluate(name: str, search_fn, queries, row_of_paper):
+    """
+    Run every query through search_fn(query) -> (ranked paper rows, embed_ms, score_ms)
+    and compute recall@k, MRR and latency percentiles.
+    """
+    ranks, embed_ms, score_ms = [], [], []
+    for paper_id, query in queries:
+        rows, e_ms, s_ms = search_fn(query)
+        embed_ms.append(e_ms)
+        score_ms.append(s_ms)
+        hits = np.flatnonzero(np.asarray(rows) == row_of_paper[paper_id])
+        ranks.append(int(hits[0]) + 1 if len(hits) else None)
+
+    found = [r for r in ranks if r is not None]
+    result = {"path": name, "num_queries": len(queries)}
+    for cutoff in RECALL_CUTOFFS:
+        result[f"recall@{cutoff}"] = sum(r <= cutoff for r in found) / len(queries)
+    result["mrr"] = sum(1.0 / r for r in found) / len(queries)
+    result["embed_ms"] = _percentiles(embed_ms)
+    result["score_ms"] = _percentiles(score_ms)
+    result["total_ms"] = _percentiles(np.add(embed_ms, score_ms))
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency benchmark for every search path.")
+    parser.add_argument("--queries", type=str, default=QUERIES_FILE, help="Queries.txt-format file.")
+    parser.add_argument("--papers", type=str, default=PAPERS_PATH, help="papers.csv or papers.parquet.")
+    parser.add_argument("--embedder", choices=["stub", "local"], default="stub",
+                        help="stub: offline hashing embedder; local: sentence-transformers model.")
+    parser.add_argument("--embeddings", type=str, default=None,
+                        help="Precomputed document embeddings (.npy) matching the embedder; "
+                             "otherwise the corpus is embedded with it.")
+    parser.add_argument("--max_docs", type=int, default=None, help="Only use the first N papers.")
+    parser.add_argument("--paths", type=str,
+                        default="get_top_k,find_similar_papers,testv4,bm25,hybrid_rrf,hybrid_prefilter",
+                        help="Comma-separated search paths to run.")
+    parser.add_argument("--output", type=str, default="bench_retrieval.json")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.papers):
+        print(f"Error: papers file not found at {args.papers}")
+        sys.exit(1)
+
+    queries = parse_queries_file(args.queries)
+    df = load_papers(args.papers, columns=["paper_id", "text"])
+    if args.max_docs:
+        df = df.iloc[:args.max_docs]
+    row_of_paper = {pid: row for row, pid in enumerate(df["paper_id"].tolist())}
+    queries = [(pid, q) for pid, q in queries if pid in row_of_paper]
+    print(f"[INFO] {len(queries)} queries against {len(df)} papers")
+
+    if args.embedder == "local":
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer(LOCAL_MODEL_NAME, device="cpu")
+    else:
+        embedder = HashingEmbedder()
+    timed = TimedEmbedder(embedder)
+    max_k = max(RECALL_CUTOFFS)
+
+    if args.embeddings:
+        doc_embs = np.load(args.embeddings, mmap_mode="r")[:len(df)]
+    else:
+        print("[INFO] Embedding corpus...")
+        doc_embs = np.asarray(embedder.encode(df["text"].astype(str).tolist(), batch_size=64), dtype=np.float32)
+
+    results = []
+    paths = args.paths.split(",")
+
+    if "get_top_k" in paths:
+        from semantic_search import get_top_k
+
+        def run_get_top_k(query):
+            query_emb = np.asarray(timed.encode([query]))
+            start = time.perf_counter()
+            rows, _ = get_top_k(query_emb, doc_embs, k=max_k)
+            return rows, timed.last_ms, (time.perf_counter() - start) * 1000
+
+        results.append(evaluate("semantic_search.get_top_k", run_get_top_k, queries, row_of_paper))
+
+    if "find_similar_papers" in paths:
+        from semantic_searchV2 import AcademicSearchEngine
+        with tempfile.TemporaryDirectory() as tmp:
+            emb_path = os.path.join(tmp, "embeddings.npy")
+            np.save(emb_path, np.asarray(doc_embs))
+            engine = AcademicSearchEngine(emb_path, args.papers)
+
+            def run_find_similar(query):
+                query_emb = np.asarray(timed.encode(query))
+                start = time.perf_counter()
+                rows = [idx for idx, _ in engine.find_similar_papers(query_emb, top_k=max_k)]
+                return rows, timed.last_ms, (time.perf_counter() - start) * 1000
+
+            results.append(evaluate("AcademicSearchEngine.find_similar_papers", run_find_similar,
+                                    queries, row_of_paper))
+
+    if "testv4" in paths:
+        from testv4 import semantic_search
+        normalized = normalize_rows(doc_embs)
+        id_df = df.rename(columns={"paper_id": "id", "text": "abstract"}).reset_index(drop=True)
+        id_df["row"] = np.arange(len(id_df))
+
+        def run_testv4(query):
+            start = time.perf_counter()
+            hits = semantic_search(query, timed, normalized, id_df, top_k=max_k)
+            total_ms = (time.perf_counter() - start) * 1000
+            return hits["row"].tolist(), timed.last_ms, total_ms - timed.last_ms
+
+        results.append(evaluate("testv4.semantic_search", run_testv4, queries, row_of_paper))
+
+    lexical_paths = [p for p in paths if p in ("bm25", "hybrid_rrf", "hybrid_prefilter")]
+    if lexical_paths:
+        from lexical_index import BM25Index, hybrid_search
+        bm25 = BM25Index().build(df["text"].fillna("").astype(str))
+
+        def run_bm25(query):
+            start = time.perf_counter()
+            rows, _ = bm25.search(query, k=max_k)
+            return rows[0], 0.0, (time.perf_counter() - start) * 1000
+
+        def make_hybrid(mode):
+            def run_hybrid(query):
+                query_emb = np.asarray(timed.encode([query]))
+                start = time.perf_counter()
+                rows, _ = hybrid_search(bm25, query, query_emb, doc_embs, k=max_k, mode=mode)
+                return rows, timed.last_ms, (time.perf_counter() - start) * 1000
+            return run_hybrid
+
+        for path in lexical_paths:
+            search_fn = run_bm25 if path == "bm25" else make_hybrid(path.split("_", 1)[1])
+            results.append(evaluate(f"lexical_index.{path}", search_fn, queries, row_of_paper))
+
+    report = {"commit": _git_commit(), "embedder": getattr(embedder, "name", LOCAL_MODEL_NAME),
+              "queries_file": args.queries, "num_docs": len(df), "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'path':<42}{'R@1':>6}{'R@5':>6}{'R@10':>6}{'MRR':>7}{'embed p50':>11}{'score p50':>11}{'p99':>9}")
+    for r in results:
+        print(f"{r['path']:<42}{r['recall@1']:>6.2f}{r['recall@5']:>6.2f}{r['recall@10']:>6.2f}{r['mrr']:>7.3f}"
+              f"{r['embed_ms']['p50']:>9.2f}ms{r['score_ms']['p50']:>9.2f}ms{r['total_ms']['p99']:>7.2f}ms")
+    print(f"\n[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from embedding_store import normalize_rows
+from search_core import search_top_k
+from sharded_search import ShardedSearcher, DEFAULT_WORKERS
+
+
+def time_queries(search_fn, queries: np.ndarray, batch_size: int, repeats: int) -> float:
+    """Milliseconds per query, sending queries in batches of batch_size."""
+    search_fn(queries[:batch_size])  # warm up (page faults, worker start)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for q_start in range(0, len(queries), batch_size):
+            search_fn(queries[q_start:q_start + batch_size])
+    return (time.perf_counter() - start) * 1000 / (repeats * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling of sharded exact search across workers and corpus sizes.")
+    parser.add_argument("--sizes", type=str, default="100000,500000", help="Comma-separated corpus sizes.")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--max_workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n_queries", type=int, default=64)
+    parser.add_argument("--batch_size", type=int, default=32, help="Queries per batched call.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=str, default="bench_sharded.json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    worker_counts = sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i < args.max_workers], args.max_workers})
+    report = []
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        embeddings = normalize_rows(rng.standard_normal((size, args.dim), dtype=np.float32))
+        queries = normalize_rows(rng.standard_normal((args.n_queries, args.dim), dtype=np.float32))
+        exact_ids, _ = search_top_k(queries, embeddings, k=args.k, normalized=True)
+
+        baseline = {mode: time_queries(lambda q: search_top_k(q, embeddings, k=args.k, normalized=True),
+                                       queries, batch, args.repeats)
+                    for mode, batch in (("single", 1), ("batch", args.batch_size))}
+        report.append({"num_docs": size, "workers": 0, "ms_single": baseline["single"],
+                       "ms_batch": baseline["batch"], "exact": True})
+        print(f"[INFO] {size} docs, in-process: {baseline['single']:.2f} ms/query single, "
+              f"{baseline['batch']:.2f} ms/query batched")
+
+        for workers in worker_counts:
+            with ShardedSearcher(embeddings, num_workers=workers, normalized=True) as searcher:
+                ids, _ = searcher.search(queries, k=args.k)
+                row = {
+                    "num_docs": size,
+                    "workers": workers,
+                    "ms_single": time_queries(lambda q: searcher.search(q, k=args.k), queries, 1, args.repeats),
+                    "ms_batch": time_queries(lambda q: searcher.search(q, k=args.k), queries,
+                                             args.batch_size, args.repeats),
+                    "exact": bool((ids == exact_ids).all()),
+                }
+            report.append(row)
+            print(f"[INFO] {size} docs, {workers} workers: {row['ms_single']:.2f} ms/query single, "
+                  f"{row['ms_batch']:.2f} ms/query batched")
+
+    with open(args.output, "w") as f:
+        json.dump({"dim": args.dim, "k": args.k, "batch_size": args.batch_size,
+                   "cpu_count": os.cpu_count(), "results": report}, f, indent=2)
+
+    print(f"\n{'docs':>9}{'workers':>9}{'single ms':>11}{'speedup':>9}{'batch ms':>10}{'speedup':>9}  exact")
+    for row in report:
+        base = next(r for r in report if r["num_docs"] == row["num_docs"] and r["workers"] == 0)
+        label = "numpy" if row["workers"] == 0 else row["workers"]
+        print(f"{row['num_docs']:>9}{label:>9}{row['ms_single']:>11.2f}{base['ms_single'] / row['ms_single']:>8.2f}x"
+              f"{row['ms_batch']:>10.2f}{base['ms_batch'] / row['ms_batch']:>8.2f}x  {row['exact']}")
+    print(f"\n[INFO] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,75 @@
 import os
+import argparse
 import numpy as np
-import pandas as pd
-import pickle
 from sentence_transformers import SentenceTransformer
+from incremental_embeddings import IncrementalEmbeddings
+from sharded_search import WORKER_ENV
+from embedding_store import build_embedding_store
+from parse_raw_data import load_papers
+from metadata_store import build_metadata_store
+from dedup import load_aliases, default_papers, check_aliases
 
 DATA_CSV = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/papers.csv"
 SAVE_EMB_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.npy"
-SAVE_META_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_metadata.pkl"
+SAVE_META_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_metadata.sqlite"
+SAVE_STORE_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.pemb"
+
+# One encoding process per core on CPU-only nodes
+DEFAULT_WORKERS = os.cpu_count() or 1
+BATCH_SIZE = 32
+
+
+def length_sorted(rows: np.ndarray, texts) -> np.ndarray:
+    """
+    Rows ordered longest text first, so every batch holds texts of similar
+    length and little of it is padding. Character length is the same proxy
+    SentenceTransformer.encode sorts by within a call.
+    """
+    lengths = np.fromiter((len(texts[i]) for i in rows), dtype=np.int64, count=len(rows))
+    return rows[np.argsort(-lengths, kind="stable")]
+
+
+def start_pool(embedder, num_workers: int):
+    """
+    Start sentence-transformers' multi-process pool with one CPU worker per
+    core, each limited to a single BLAS/OpenMP thread.
+    """
+    saved_env = {name: os.environ.get(name) for name in WORKER_ENV}
+    os.environ.update(WORKER_ENV)
+    try:
+        return embedder.start_multi_process_pool(target_devices=["cpu"] * num_workers)
+    finally:
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
 
 def main():
-    # 1. Load the CSV that parse_raw_data.py created
-    if not os.path.exists(DATA_CSV):
-        raise FileNotFoundError(f"CSV file not found: {DATA_CSV}. Run parse_raw_data.py first.")
+    parser = argparse.ArgumentParser(description="Embed papers.csv locally with sentence-transformers.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Encoding processes; 1 encodes in this process.")
+    parser.add_argument("--batch_size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--papers", type=str, default=None,
+                        help="Papers to embed (default: dedup.py's output next to DATA_CSV if present, "
+                             "else DATA_CSV).")
+    parser.add_argument("--aliases", type=str, default=None,
+                        help="Alias map from dedup.py for --papers.")
+    args = parser.parse_args()
+
+    # 1. Load the papers parse_raw_data.py (or dedup.py, one paper per near-duplicate cluster) created
+    papers_path, aliases_path = (args.papers, args.aliases) if args.papers else default_papers(DATA_CSV)
+    if not os.path.exists(papers_path):
+        raise FileNotFoundError(f"Paper file not found: {papers_path}. Run parse_raw_data.py first.")
 
-    df = pd.read_csv(DATA_CSV)  # columns: paper_id, text
-    print(f"[INFO] Loaded {len(df)} papers from {DATA_CSV}")
+    df = load_papers(papers_path, columns=["paper_id", "text"])  # papers.csv or papers.parquet
+    print(f"[INFO] Loaded {len(df)} papers from {papers_path}")
+    aliases = None
+    if aliases_path:
+        aliases = load_aliases(aliases_path)
+        check_aliases(df["paper_id"], aliases)
+        print(f"[INFO] {len(aliases)} near-duplicates dropped by dedup.py will be listed as aliases")
 
     # 2. Initialize the embedding model
     model_name = "sentence-transformers/all-mpnet-base-v2"
@@ -22,25 +77,43 @@ def main():
 
     # 3. Convert the 'text' column into embeddings
     # Depending on your preference, you could also store partial text or parse out a title line, etc.
-    texts_to_embed = df["text"].tolist()
+    texts_to_embed = df["text"].astype(str).tolist()
+
+    # 4. Embed only new or changed papers, checkpointing into SAVE_EMB_PATH as we go.
+    # Vectors go straight into the memmapped output at their original rows, one
+    # checkpoint chunk at a time, so memory does not grow with the corpus.
+    os.makedirs(os.path.dirname(SAVE_EMB_PATH), exist_ok=True)
+    output = IncrementalEmbeddings(SAVE_EMB_PATH, embedder.get_sentence_embedding_dimension(), model_name)
+    pending = output.prepare(df["paper_id"].tolist(), texts_to_embed)
+    # Bucket by length across the whole run, not just within each chunk
+    pending = length_sorted(pending, texts_to_embed)
+
+    pool = start_pool(embedder, args.workers) if args.workers > 1 and len(pending) else None
+
+    def embed_rows(rows, vectors):
+        texts = [texts_to_embed[i] for i in rows]
+        if pool is None:
+            vectors[rows] = embedder.encode(texts, batch_size=args.batch_size, show_progress_bar=True)
+        else:
+            vectors[rows] = embedder.encode_multi_process(texts, pool, batch_size=args.batch_size)
+        return []
 
-    print("[INFO] Generating embeddings...")
-    embeddings = embedder.encode(texts_to_embed, batch_size=32, show_progress_bar=True)
-    embeddings = np.array(embeddings)
+    print(f"[INFO] Generating embeddings with {args.workers if pool else 1} process(es)...")
+    try:
+        output.run(pending, embed_rows)
+    finally:
+        if pool is not None:
+            embedder.stop_multi_process_pool(pool)
+        output.close()
 
-    # 4. Save embeddings
-    os.makedirs("embeddings", exist_ok=True)
-    np.save(SAVE_EMB_PATH, embeddings)
+    # Refresh the normalized search store from the updated embeddings
+    build_embedding_store(np.load(SAVE_EMB_PATH, mmap_mode="r"), SAVE_STORE_PATH, model_name)
 
-    # 5. Save metadata
-    paper_metadata = {
-        "paper_ids": df["paper_id"].tolist(),
-        "texts": df["text"].tolist(),
-    }
-    with open(SAVE_META_PATH, "wb") as f:
-        pickle.dump(paper_metadata, f)
+    # 5. Save metadata, indexed by embedding row and paper_id so searches read only their results
+    build_metadata_store(df, SAVE_META_PATH, aliases)
 
     print(f"[INFO] Embeddings saved to {SAVE_EMB_PATH}")
+    print(f"[INFO] Embedding store saved to {SAVE_STORE_PATH}")
     print(f"[INFO] Metadata saved to {SAVE_META_PATH}")
 
 if __name__ == "__main__":
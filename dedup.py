@@ -0,0 +1,345 @@
+import os
+import re
+import csv
+import sys
+import zlib
+import argparse
+import tempfile
+import numpy as np
+from parse_raw_data import iter_raw_records, write_parquet
+
+# Outputs, written next to the full papers file so the embedding scripts can find them
+DEDUP_PAPERS_NAME = "papers_dedup.parquet"
+ALIASES_NAME = "paper_aliases.csv"
+
+# Defaults used when the module is run as a script
+RAW_DATA_FILE = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/rawtext.dat"
+OUTPUT_PARQUET = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/" + DEDUP_PAPERS_NAME
+ALIASES_PATH = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/" + ALIASES_NAME
+
+# Words per shingle
+SHINGLE_WORDS = 3
+# MinHash signature length; split into LSH_BANDS bands of NUM_PERM // LSH_BANDS rows
+NUM_PERM = 128
+LSH_BANDS = 32
+# Estimated Jaccard similarity at which two papers count as duplicates
+DEFAULT_THRESHOLD = 0.8
+# Papers signed per batch, and shingles hashed per NumPy block (block memory is
+# SHINGLE_BLOCK * NUM_PERM * 8 bytes)
+SIGN_BATCH = 1024
+SHINGLE_BLOCK = 32768
+# Buckets larger than this (boilerplate texts) are compared against their first member only
+MAX_BUCKET_PAIRS = 64
+# Candidate pairs whose signatures are compared at a time
+PAIR_BLOCK = 65536
+SEED = 1
+
+WORD_PATTERN = re.compile(r"\w+")
+_EMPTY = np.zeros(0, dtype=np.uint64)
+
+
+def shingle_hashes(text: str, shingle_words: int = SHINGLE_WORDS) -> np.ndarray:
+    """
+    64-bit hashes of the distinct word shingles of a text (lower-cased).
+    A text shorter than one shingle is a single shingle; an empty text has none.
+    """
+    words = WORD_PATTERN.findall(str(text).lower())
+    if not words:
+        return _EMPTY
+    tokens = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    n = max(len(tokens) - shingle_words + 1, 1)
+    shingles = tokens[:n].copy()
+    for offset in range(1, min(shingle_words, len(tokens))):
+        # Polynomial combination of the word hashes, wrapping at 2**64
+        shingles = shingles * np.uint64(0x100000001B3) + tokens[offset:offset + n]
+    return np.unique(shingles)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        """
+        MinHash signatures under num_perm multiply-shift hash functions
+        h(x) = (a * x + b) mod 2**64 >> 32, computed for many papers at once.
+        """
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets, block: int = SHINGLE_BLOCK) -> np.ndarray:
+        """
+        Args:
+            shingle_sets: List of shingle hash arrays, one per paper
+            block: Shingles hashed together
+
+        Returns:
+            (len(shingle_sets), num_perm) uint32; papers without shingles get
+            all-ones signatures and should not be compared
+        """
+        out = np.full((len(shingle_sets), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        start = 0
+        while start < len(shingle_sets):
+            # Take papers until the block is full (always at least one)
+            stop, total = start, 0
+            while stop < len(shingle_sets) and (stop == start or total + len(shingle_sets[stop]) <= block):
+                total += len(shingle_sets[stop])
+                stop += 1
+            sizes = np.array([len(s) for s in shingle_sets[start:stop]])
+            nonempty = np.flatnonzero(sizes)
+            if len(nonempty):
+                shingles = np.concatenate([shingle_sets[start + i] for i in nonempty])
+                # (num_perm, shingles): reducing along contiguous rows is much faster than down columns
+                hashed = ((self.a[:, None] * shingles + self.b[:, None]) >> np.uint64(32)).astype(np.uint32)
+                offsets = np.concatenate([[0], np.cumsum(sizes[nonempty])[:-1]])
+                out[start + nonempty] = np.minimum.reduceat(hashed, offsets, axis=1).T
+            start = stop
+        return out
+
+
+def band_keys(signatures: np.ndarray, band: int, rows: int) -> np.ndarray:
+    """One uint64 bucket key per signature for the given LSH band."""
+    part = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+    keys = np.zeros(len(part), dtype=np.uint64)
+    for r in range(rows):
+        keys = keys * np.uint64(0x9E3779B97F4A7C15) + part[:, r]
+    return keys
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+
+def cluster_duplicates(signatures, signed: np.ndarray, threshold: float = DEFAULT_THRESHOLD,
+                       bands: int = LSH_BANDS, chunk_rows: int = 1 << 20) -> np.ndarray:
+    """
+    Group near-duplicate papers by LSH over their MinHash signatures.
+
+    Papers sharing any band bucket are candidates; a candidate pair is kept
+    when the fraction of equal signature entries (the Jaccard estimate)
+    reaches threshold, and kept pairs are merged transitively.
+
+    Args:
+        signatures: (num_papers, num_perm) uint32 array or memmap
+        signed: (num_papers,) bool, False for papers without shingles
+        threshold: Estimated Jaccard similarity for a duplicate
+        bands: LSH bands; num_perm must be divisible by it
+        chunk_rows: Signature rows read at a time while computing bucket keys
+
+    Returns:
+        (num_papers,) int64 representative row of each paper: the first
+        paper of its cluster, or the paper itself
+    """
+    num_papers, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError(f"{num_perm} permutations cannot be split into {bands} bands")
+    rows = num_perm // bands
+    parent = np.arange(num_papers, dtype=np.int64)
+    candidates = np.flatnonzero(signed)
+    for band in range(bands):
+        keys = np.concatenate([_EMPTY] + [band_keys(np.asarray(signatures[start:start + chunk_rows]), band, rows)
+                                          for start in range(0, num_papers, chunk_rows)])[candidates]
+        order = candidates[np.argsort(keys, kind="stable")]
+        keys = np.sort(keys, kind="stable")
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(keys)])
+        left, right = [], []
+        for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+            members = order[start:start + size]
+            if size <= MAX_BUCKET_PAIRS:
+                i, j = np.triu_indices(size, 1)
+                left.append(members[i])
+                right.append(members[j])
+            else:
+                left.append(np.repeat(members[0], size - 1))
+                right.append(members[1:])
+        if not left:
+            continue
+        left, right = np.concatenate(left), np.concatenate(right)
+        # Skip pairs an earlier band already merged
+        same = np.array([_find(parent, a) == _find(parent, b) for a, b in zip(left, right)])
+        left, right = left[~same], right[~same]
+        for start in range(0, len(left), PAIR_BLOCK):
+            a, b = left[start:start + PAIR_BLOCK], right[start:start + PAIR_BLOCK]
+            similar = (np.asarray(signatures[a]) == np.asarray(signatures[b])).mean(axis=1) >= threshold
+            for x, y in zip(a[similar], b[similar]):
+                rx, ry = _find(parent, x), _find(parent, y)
+                # The earlier paper stays the representative
+                parent[max(rx, ry)] = min(rx, ry)
+    return np.array([_find(parent, i) for i in range(num_papers)], dtype=np.int64)
+
+
+def sign_records(records, path: str, hasher: MinHasher, shingle_words: int = SHINGLE_WORDS,
+                 batch_size: int = SIGN_BATCH):
+    """
+    Stream records once, appending each paper's signature to a raw uint32 file.
+
+    Returns:
+        (paper_ids, signed): int64 ids and a bool array marking papers with shingles
+    """
+    paper_ids, signed = [], []
+    with open(path, "wb") as out:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                signed.extend(_sign_batch(batch, out, hasher, shingle_words))
+                paper_ids.extend(int(pid) for pid, _ in batch)
+                batch = []
+                if len(paper_ids) % (batch_size * 100) == 0:
+                    print(f"[INFO] Signed {len(paper_ids)} papers")
+        if batch:
+            signed.extend(_sign_batch(batch, out, hasher, shingle_words))
+            paper_ids.extend(int(pid) for pid, _ in batch)
+    return np.array(paper_ids, dtype=np.int64), np.array(signed, dtype=bool)
+
+
+def _sign_batch(batch, out, hasher: MinHasher, shingle_words: int):
+    shingles = [shingle_hashes(text, shingle_words) for _, text in batch]
+    out.write(hasher.signatures(shingles).tobytes())
+    return [len(s) > 0 for s in shingles]
+
+
+def find_duplicates(input_path: str, threshold: float = DEFAULT_THRESHOLD, bands: int = LSH_BANDS,
+                    num_perm: int = NUM_PERM, shingle_words: int = SHINGLE_WORDS, work_dir: str = None):
+    """
+    Cluster the near-duplicate papers of a rawtext.dat file.
+
+    Only the signatures (num_perm * 4 bytes per paper) are kept, in a
+    temporary file under work_dir, so memory does not grow with the text.
+
+    Returns:
+        (paper_ids, representatives): int64 arrays in file order, where
+        representatives[i] is the row of paper i's cluster representative
+    """
+    fd, sig_path = tempfile.mkstemp(suffix=".minhash", dir=work_dir)
+    os.close(fd)
+    try:
+        paper_ids, signed = sign_records(iter_raw_records(input_path), sig_path, MinHasher(num_perm), shingle_words)
+        if not len(paper_ids):
+            return paper_ids, np.zeros(0, dtype=np.int64)
+        signatures = np.memmap(sig_path, dtype=np.uint32, mode="r", shape=(len(paper_ids), num_perm))
+        representatives = cluster_duplicates(signatures, signed, threshold, bands)
+        del signatures
+    finally:
+        os.remove(sig_path)
+    return paper_ids, representatives
+
+
+def write_aliases(paper_ids: np.ndarray, representatives: np.ndarray, path: str) -> int:
+    """
+    Write the alias map: one (paper_id, representative_id) row per paper that
+    was dropped as a duplicate.
+
+    Returns:
+        Number of aliases written
+    """
+    dropped = np.flatnonzero(representatives != np.arange(len(representatives)))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["paper_id", "representative_id"])
+        writer.writerows(zip(paper_ids[dropped].tolist(), paper_ids[representatives[dropped]].tolist()))
+    return len(dropped)
+
+
+def load_aliases(path: str) -> dict:
+    """Alias map written by write_aliases, as {paper_id: representative_id}."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return {int(row["paper_id"]): int(row["representative_id"]) for row in csv.DictReader(f)}
+
+
+def default_papers(papers_path: str):
+    """
+    The papers file an embedding script should read by default, and its alias map.
+
+    If dedup.py has written its kept papers and alias map next to papers_path,
+    those are used; otherwise papers_path itself, with no aliases.
+
+    Returns:
+        (papers path, alias map path or None)
+    """
+    folder = os.path.dirname(papers_path)
+    dedup_papers, aliases = os.path.join(folder, DEDUP_PAPERS_NAME), os.path.join(folder, ALIASES_NAME)
+    if os.path.exists(dedup_papers) and os.path.exists(aliases):
+        return dedup_papers, aliases
+    return papers_path, None
+
+
+def check_aliases(paper_ids, aliases: dict) -> None:
+    """
+    Make sure an alias map belongs to a papers file: no dropped paper may be
+    in it, and every representative must be.
+
+    Raises:
+        ValueError: The alias map was written for a different papers file
+    """
+    paper_ids = set(int(pid) for pid in paper_ids)
+    present = [pid for pid in aliases if pid in paper_ids]
+    if present:
+        raise ValueError(f"{len(present)} papers in the alias map as dropped duplicates are still in the "
+                         f"papers file (e.g. {present[:5]}); it was not written for this file")
+    missing = sorted({rep for rep in aliases.values() if rep not in paper_ids})
+    if missing:
+        raise ValueError(f"{len(missing)} alias representatives are not in the papers file (e.g. {missing[:5]})")
+
+
+def iter_representatives(input_path: str, representatives: np.ndarray):
+    """Stream the (paper_id, text) records of the papers that are kept."""
+    for row, record in enumerate(iter_raw_records(input_path)):
+        if representatives[row] == row:
+            yield record
+
+
+def write_csv(records, out_path: str) -> int:
+    """Stream (paper_id, text) records to the papers.csv layout parse_raw_data.py writes."""
+    count = 0
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["paper_id", "text"])
+        for paper_id, text in records:
+            writer.writerow([paper_id, text])
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop near-duplicate papers (MinHash + LSH) from rawtext.dat "
+                                                 "before embedding, writing the kept papers and an alias map.")
+    parser.add_argument("--input", type=str, default=RAW_DATA_FILE)
+    parser.add_argument("--output", type=str, default=OUTPUT_PARQUET,
+                        help="Kept papers; .parquet is streamed in row groups, anything else is written as CSV.")
+    parser.add_argument("--aliases", type=str, default=ALIASES_PATH,
+                        help="CSV mapping each dropped paper_id to the paper_id that was kept.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated Jaccard similarity at which papers are duplicates.")
+    parser.add_argument("--bands", type=int, default=LSH_BANDS)
+    parser.add_argument("--num_perm", type=int, default=NUM_PERM)
+    parser.add_argument("--shingle_words", type=int, default=SHINGLE_WORDS)
+    parser.add_argument("--work_dir", type=str, default=None, help="Where the temporary signature file goes.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: raw data file not found at {args.input}")
+        sys.exit(1)
+
+    print(f"[INFO] Signing papers from {args.input}")
+    paper_ids, representatives = find_duplicates(args.input, args.threshold, args.bands, args.num_perm,
+                                                 args.shingle_words, args.work_dir)
+    num_aliases = write_aliases(paper_ids, representatives, args.aliases)
+    print(f"[INFO] {num_aliases} of {len(paper_ids)} papers are near-duplicates; alias map saved to {args.aliases}")
+
+    # Second pass over the raw file writes only the representatives
+    kept = iter_representatives(args.input, representatives)
+    if args.output.endswith(".parquet"):
+        count = write_parquet(kept, args.output)
+    else:
+        count = write_csv(kept, args.output)
+    print(f"[INFO] Saved {count} papers to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Sequence
+import numpy as np
+import openai
+from tqdm import tqdm
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Per-request limits of the OpenAI embeddings endpoint
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300000
+
+# Errors worth retrying; anything else fails the batch immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        """
+        Thread-safe token bucket refilled continuously at rate_per_minute.
+
+        Args:
+            rate_per_minute: Sustained rate (requests or tokens per minute)
+            capacity: Burst size; defaults to one second's worth of the rate
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """
+        Block until `amount` tokens are available, then take them.
+
+        A request larger than the bucket waits for a full bucket and takes its
+        whole amount, leaving the balance negative; later callers wait for it
+        to be paid back, so the sustained rate holds for any request size.
+        """
+        need = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= need:
+                    self.tokens -= amount
+                    return
+                wait = (need - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def pack_requests(token_counts: Sequence[int], max_inputs: int = MAX_INPUTS_PER_REQUEST,
+                  max_tokens: int = MAX_TOKENS_PER_REQUEST) -> List[List[int]]:
+    """
+    Greedily pack text positions into requests that respect the per-request
+    input-count and token limits, preserving order.
+
+    Args:
+        token_counts: Token count of each text (each must fit in one request)
+        max_inputs: Maximum number of texts per request
+        max_tokens: Maximum total tokens per request
+
+    Returns:
+        List of batches, each a list of positions into token_counts
+    """
+    batches, batch, batch_tokens = [], [], 0
+    for pos, count in enumerate(token_counts):
+        if batch and (len(batch) >= max_inputs or batch_tokens + count > max_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(pos)
+        batch_tokens += count
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _retry_after(error) -> float:
+    """Seconds the server asked us to wait, if it said."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingPipeline:
+    def __init__(self, client, model: str = EMBEDDING_MODEL, max_in_flight: int = 8,
+                 requests_per_minute: float = 3000, tokens_per_minute: float = 1000000,
+                 max_retries: int = 6, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 max_inputs: int = MAX_INPUTS_PER_REQUEST, max_tokens: int = MAX_TOKENS_PER_REQUEST):
+        """
+        Concurrent, rate-limited bulk embedding.
+
+        Args:
+            client: OpenAI client. Create it with max_retries=0 so retries are
+                paced by this pipeline rather than the client.
+            model: Embedding model name
+            max_in_flight: Number of requests kept in flight at once
+            requests_per_minute: Request rate limit
+            tokens_per_minute: Token rate limit
+            max_retries: Retries per request on 429 / transient errors
+            backoff_base: First backoff delay in seconds (doubles per retry)
+            backoff_max: Cap on a single backoff delay
+            max_inputs: Max texts per request
+            max_tokens: Max tokens per request
+        """
+        self.client = client
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.retries = 0
+
+    def request(self, texts: List[str], num_tokens: int) -> List[List[float]]:
+        """Send one embeddings request, retrying with exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(num_tokens)
+            try:
+                response = self.client.embeddings.create(model=self.model, input=texts)
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                    delay *= 0.5 + random.random() / 2  # jitter so workers don't retry in lockstep
+                time.sleep(delay)
+
+    def embed_into(self, texts: Sequence[str], token_counts: Sequence[int], out: np.ndarray,
+                   rows: Sequence[int] = None, show_progress: bool = True) -> List[int]:
+        """
+        Embed texts and write each vector into its row of `out` as soon as its
+        request completes.
+
+        Args:
+            texts: Texts to embed, each within the model's token limit
+            token_counts: Token count of each text
+            out: Preallocated (num_rows, emb_dim) array or memmap
+            rows: Output row of each text (defaults to 0..len(texts)-1)
+            show_progress: Show a tqdm progress bar
+
+        Returns:
+            Output rows whose request failed after all retries (left untouched)
+        """
+        rows = np.arange(len(texts)) if rows is None else np.asarray(rows)
+        batches = pack_requests(token_counts, self.max_inputs, self.max_tokens)
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = {
+                pool.submit(self.request, [texts[p] for p in batch], sum(token_counts[p] for p in batch)): batch
+                for batch in batches
+            }
+            with tqdm(total=len(texts), desc="Embedding", disable=not show_progress) as bar:
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        out[rows[batch]] = np.asarray(future.result(), dtype=out.dtype)
+                    except Exception as e:
+                        print(f"[ERROR] Embedding request for {len(batch)} texts failed: {e}")
+                        failed.extend(rows[batch].tolist())
+                    bar.update(len(batch))
+        return sorted(failed)
@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+# On-disk layout:
+#   8 bytes   magic (b"PEMBSTR1")
+#   4 bytes   little-endian uint32 length of the JSON header
+#   N bytes   JSON header {"dim", "count", "model_name", "dtype", "normalized"}
+#   padding   so the matrix starts on a DATA_ALIGNMENT boundary
+#   rest      C-contiguous (count, dim) float32 matrix, rows L2-normalized
+MAGIC = b"PEMBSTR1"
+DATA_ALIGNMENT = 64
+STORE_DTYPE = "float32"
+
+# Defaults used when the module is run as a script
+EMB_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.npy"
+STORE_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.pemb"
+DEFAULT_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize each row of a 2-D array as float32.
+    Zero rows are left as zeros instead of producing NaNs.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _header_bytes(dim: int, count: int, model_name: str) -> bytes:
+    header = json.dumps({
+        "dim": int(dim),
+        "count": int(count),
+        "model_name": model_name,
+        "dtype": STORE_DTYPE,
+        "normalized": True,
+    }).encode("utf-8")
+    prefix = MAGIC + len(header).to_bytes(4, "little") + header
+    padding = (-len(prefix)) % DATA_ALIGNMENT
+    return prefix + b" " * padding
+
+
+def _read_header(path: str):
+    """Return (header dict, byte offset of the matrix)."""
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an embedding store (bad magic {magic!r})")
+        header_len = int.from_bytes(f.read(4), "little")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    prefix_len = len(MAGIC) + 4 + header_len
+    offset = prefix_len + (-prefix_len) % DATA_ALIGNMENT
+    return header, offset
+
+
+def build_embedding_store(embeddings: np.ndarray, out_path: str, model_name: str,
+                          block_size: int = 65536) -> str:
+    """
+    Write embeddings to an on-disk store, L2-normalizing them once.
+
+    Args:
+        embeddings: (num_docs, emb_dim) array, or a memmap of one
+        out_path: Destination file
+        model_name: Name of the model that produced the embeddings
+        block_size: Number of rows normalized and written at a time
+
+    Returns:
+        The path that was written
+    """
+    if embeddings.ndim != 2:
+        raise ValueError(f"Expected a 2-D embedding matrix, got shape {embeddings.shape}")
+    count, dim = embeddings.shape
+    header = _header_bytes(dim, count, model_name)
+
+    # Write to a temp file and rename so readers never see a half-written store
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for start in range(0, count, block_size):
+            block = normalize_rows(embeddings[start:start + block_size])
+            f.write(np.ascontiguousarray(block, dtype=np.float32).tobytes())
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class EmbeddingStore:
+    def __init__(self, path: str):
+        """
+        Open an embedding store written by build_embedding_store.
+        The matrix is memory-mapped read-only, so processes that open the same
+        file share one copy through the OS page cache.
+
+        Args:
+            path: Path to the store file
+        """
+        header, offset = _read_header(path)
+        self.path = path
+        self.dim = header["dim"]
+        self.count = header["count"]
+        self.model_name = header["model_name"]
+        self.dtype = header["dtype"]
+        self.embeddings = np.memmap(path, dtype=self.dtype, mode="r",
+                                    offset=offset, shape=(self.count, self.dim))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def shape(self):
+        return self.embeddings.shape
+
+    def score(self, query_emb: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity between query vector(s) and every document.
+        Documents are already normalized, so this is a single dot product.
+
+        Returns:
+            (num_queries, num_docs) array of similarities
+        """
+        return normalize_rows(query_emb) @ self.embeddings.T
+
+    def warmup(self, block_size: int = 65536) -> None:
+        """Touch every page of the matrix so the first query does not page-fault."""
+        for start in range(0, self.count, block_size):
+            self.embeddings[start:start + block_size].sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a .npy embedding file into a normalized embedding store.")
+    parser.add_argument("--input", type=str, default=EMB_PATH, help="Source .npy embeddings.")
+    parser.add_argument("--output", type=str, default=STORE_PATH, help="Destination store file.")
+    parser.add_argument("--model_name", type=str, default=DEFAULT_MODEL_NAME,
+                        help="Model that produced the embeddings (recorded in the header).")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: embeddings file not found at {args.input}")
+        sys.exit(1)
+
+    # mmap_mode avoids loading the source matrix into RAM while converting
+    embeddings = np.load(args.input, mmap_mode="r")
+    print(f"[INFO] Building store for {embeddings.shape[0]} embeddings of dim {embeddings.shape[1]}")
+    build_embedding_store(embeddings, args.output, args.model_name)
+    print(f"[INFO] Embedding store saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,24 @@
+import os
+import sys
+import json
+import argparse
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.manifold import TSNE
-import matplotlib.pyplot as plt
 import pandas as pd
-from scipy.spatial.distance import pdist, squareform
+from embedding_store import EmbeddingStore, normalize_rows
+
+# Defaults used when the module is run as a script
+EMBEDDINGS_PATH = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/paper_embeddings.npy"
+PAPERS_PATH = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/papers.csv"
+
+# Rows read from the memory-mapped file per block
+BLOCK_ROWS = 65536
+# Rows kept by reservoir sampling for the similarity distribution
+SAMPLE_ROWS = 2000
+# Cosine similarity at or above which two vectors count as near-duplicates
+DUPLICATE_THRESHOLD = 0.999
+# Example rows / pairs listed in the report
+MAX_EXAMPLES = 20
+HISTOGRAM_BINS = 200
 #embeddings_path = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/paper_embeddings.npy"
 # Path to your original CSV file with the texts
 #df = pd.read_csv("C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/papers.csv")
@@ -17,6 +32,11 @@ def validate_embeddings(embeddings_path, texts_df, n_samples=1000):
         texts_df: DataFrame containing the original texts
         n_samples: Number of random samples to use for analysis
     """
+    # Interactive-only dependencies; the streaming validation below does not need them
+    from sklearn.metrics.pairwise import cosine_similarity
+    from sklearn.manifold import TSNE
+    import matplotlib.pyplot as plt
+
     # Load embeddings
     embeddings = np.load(embeddings_path)
     
@@ -79,15 +99,235 @@ def find_similar_texts(index, indices, similarity_matrix, texts_df, n=5):
         print(f"\nSimilarity Score: {similarities[similar_idx]:.3f}")
         print(f"Text {i+1}: {texts_df.iloc[original_idx]['text'][:200]}...")
 
-# Usage example:
+
+def open_embeddings(path: str) -> np.ndarray:
+    """Memory-map a .npy file or an embedding store (.pemb) without reading it."""
+    if path.endswith(".pemb"):
+        return EmbeddingStore(path).embeddings
+    return np.load(path, mmap_mode="r")
+
+
+def _histogram_stats(counts: np.ndarray, edges: np.ndarray) -> dict:
+    """Approximate percentiles of a distribution from its histogram."""
+    cumulative = np.cumsum(counts) / max(counts.sum(), 1)
+    return {f"p{p}": round(float(edges[1:][np.searchsorted(cumulative, p / 100)]), 4) for p in (1, 5, 50, 95, 99)}
+
+
+def duplicate_scan(embeddings: np.ndarray, threshold: float = DUPLICATE_THRESHOLD, block_rows: int = 4096,
+                   max_examples: int = MAX_EXAMPLES) -> dict:
+    """
+    Count vector pairs with cosine similarity >= threshold, scanning the
+    upper triangle block against block so only one (block x block) score
+    matrix exists at a time. Zero and NaN vectors never match.
+
+    Returns:
+        Dict with the pair count, the number of rows involved and example pairs
+    """
+    num_rows = len(embeddings)
+    pairs, rows, examples = 0, set(), []
+    for a in range(0, num_rows, block_rows):
+        left = normalize_rows(embeddings[a:a + block_rows])
+        for b in range(a, num_rows, block_rows):
+            right = left if b == a else normalize_rows(embeddings[b:b + block_rows])
+            hits = np.argwhere(left @ right.T >= threshold)
+            hits = hits[hits[:, 0] + a < hits[:, 1] + b]  # each pair once, never a row with itself
+            pairs += len(hits)
+            for i, j in hits:
+                rows.update((int(i) + a, int(j) + b))
+                if len(examples) < max_examples:
+                    examples.append([int(i) + a, int(j) + b])
+    return {"threshold": threshold, "pairs": pairs, "rows": len(rows), "examples": examples}
+
+
+def stream_validate(embeddings_path: str, block_rows: int = BLOCK_ROWS, sample_rows: int = SAMPLE_ROWS,
+                    duplicate_threshold: float = DUPLICATE_THRESHOLD, scan_duplicates: bool = False,
+                    seed: int = 0) -> dict:
+    """
+    Validate an embedding file in one streaming pass over a memory map.
+
+    Computes row and NaN/inf/zero-vector counts and running norm statistics
+    block by block, keeps a reservoir sample of valid rows for an
+    approximate pairwise similarity distribution, and optionally runs a
+    blocked near-duplicate scan. Memory use is bounded by the block size,
+    whatever the file size; without the scan, so is the run time per row.
+
+    Args:
+        embeddings_path: .npy file or embedding store (.pemb)
+        block_rows: Rows read per block
+        sample_rows: Reservoir size for the similarity distribution
+        duplicate_threshold: Cosine similarity that counts as a near-duplicate
+        scan_duplicates: Also run the near-duplicate scan, whose cost grows
+            with rows squared (off by default)
+        seed: Seed of the reservoir sampler
+
+    Returns:
+        JSON-serializable report dict
+    """
+    embeddings = open_embeddings(embeddings_path)
+    num_rows, dim = embeddings.shape
+    rng = np.random.default_rng(seed)
+
+    nan_rows = inf_rows = zero_rows = nan_values = 0
+    zero_examples, nan_examples = [], []
+    norm_sum = norm_sq_sum = 0.0
+    norm_min, norm_max = np.inf, -np.inf
+    reservoir = np.empty((sample_rows, dim), dtype=np.float32)
+    seen_valid = 0
+
+    for start in range(0, num_rows, block_rows):
+        block = np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+        nan_mask = np.isnan(block)
+        bad_nan = nan_mask.any(axis=1)
+        bad_inf = np.isinf(block).any(axis=1)
+        zero = ~bad_nan & (block == 0).all(axis=1)
+        nan_values += int(nan_mask.sum())
+        nan_rows += int(bad_nan.sum())
+        inf_rows += int(bad_inf.sum())
+        zero_rows += int(zero.sum())
+        zero_examples += (np.flatnonzero(zero) + start)[:MAX_EXAMPLES - len(zero_examples)].tolist()
+        nan_examples += (np.flatnonzero(bad_nan) + start)[:MAX_EXAMPLES - len(nan_examples)].tolist()
+
+        valid = block[~(bad_nan | bad_inf | zero)]
+        if len(valid):
+            norms = np.linalg.norm(valid.astype(np.float64), axis=1)
+            norm_sum += norms.sum()
+            norm_sq_sum += (norms ** 2).sum()
+            norm_min, norm_max = min(norm_min, norms.min()), max(norm_max, norms.max())
+
+        # Reservoir sampling (Algorithm R), vectorized over the block
+        fill = min(max(sample_rows - seen_valid, 0), len(valid))
+        reservoir[seen_valid:seen_valid + fill] = valid[:fill]
+        if fill < len(valid):
+            slots = rng.integers(0, np.arange(seen_valid + fill, seen_valid + len(valid)) + 1)
+            take = np.flatnonzero(slots < sample_rows)
+            # When several rows draw the same slot the latest one wins, as in the sequential algorithm
+            latest = take[::-1][np.unique(slots[take][::-1], return_index=True)[1]]
+            reservoir[slots[latest]] = valid[fill:][latest]
+        seen_valid += len(valid)
+
+    num_valid = seen_valid
+    mean_norm = norm_sum / num_valid if num_valid else float("nan")
+    report = {
+        "path": embeddings_path,
+        "rows": int(num_rows),
+        "dim": int(dim),
+        "dtype": str(embeddings.dtype),
+        "zero_vectors": zero_rows,
+        "zero_vector_rows": zero_examples,
+        "nan_rows": nan_rows,
+        "nan_values": nan_values,
+        "nan_row_examples": nan_examples,
+        "inf_rows": inf_rows,
+        "norm": {
+            "mean": float(mean_norm),
+            "std": float(np.sqrt(max(norm_sq_sum / num_valid - mean_norm ** 2, 0.0))) if num_valid else float("nan"),
+            "min": float(norm_min) if num_valid else float("nan"),
+            "max": float(norm_max) if num_valid else float("nan"),
+        },
+    }
+
+    # Similarity distribution over every pair of the sample, accumulated into a histogram
+    sample = normalize_rows(reservoir[:min(seen_valid, sample_rows)])
+    edges = np.linspace(-1.0, 1.0, HISTOGRAM_BINS + 1)
+    counts = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    total = total_sq = 0.0
+    n_pairs = 0
+    for a in range(0, len(sample), 1024):
+        sims = sample[a:a + 1024] @ sample.T
+        upper = sims[np.arange(sims.shape[1])[None, :] > np.arange(a, a + len(sims))[:, None]]
+        counts += np.histogram(np.clip(upper, -1.0, 1.0), bins=edges)[0]
+        total += upper.sum(dtype=np.float64)
+        total_sq += (upper.astype(np.float64) ** 2).sum()
+        n_pairs += len(upper)
+    if n_pairs:
+        mean_sim = total / n_pairs
+        report["similarity"] = {"sample_rows": len(sample), "pairs": n_pairs, "mean": float(mean_sim),
+                                "std": float(np.sqrt(max(total_sq / n_pairs - mean_sim ** 2, 0.0))),
+                                **_histogram_stats(counts, edges),
+                                "histogram": {"edges": edges.round(4).tolist(), "counts": counts.tolist()}}
+
+    if scan_duplicates:
+        report["near_duplicates"] = duplicate_scan(embeddings, duplicate_threshold)
+    return report
+
+
+def check_thresholds(report: dict, max_zero_vectors: int = 0, max_nan_rows: int = 0,
+                     max_duplicate_pairs: int = None, max_mean_similarity: float = None,
+                     norm_range=None) -> list:
+    """Return a message for every threshold the report breaks (empty if it passes)."""
+    failures = []
+    if report["zero_vectors"] > max_zero_vectors:
+        failures.append(f"{report['zero_vectors']} zero vectors (max {max_zero_vectors}); "
+                        f"first rows {report['zero_vector_rows'][:10]}")
+    if report["nan_rows"] + report["inf_rows"] > max_nan_rows:
+        failures.append(f"{report['nan_rows']} NaN and {report['inf_rows']} inf rows (max {max_nan_rows})")
+    duplicates = report.get("near_duplicates")
+    if max_duplicate_pairs is not None and duplicates and duplicates["pairs"] > max_duplicate_pairs:
+        failures.append(f"{duplicates['pairs']} near-duplicate pairs (max {max_duplicate_pairs})")
+    similarity = report.get("similarity")
+    if max_mean_similarity is not None and similarity and similarity["mean"] > max_mean_similarity:
+        failures.append(f"mean pairwise similarity {similarity['mean']:.3f} (max {max_mean_similarity})")
+    if norm_range is not None:
+        low, high = norm_range
+        if not (low <= report["norm"]["min"] and report["norm"]["max"] <= high):
+            failures.append(f"norms span [{report['norm']['min']:.4f}, {report['norm']['max']:.4f}] "
+                            f"(allowed [{low}, {high}])")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate an embedding file. By default a headless streaming "
+                                                 "check that writes a JSON report and exits 1 on failures.")
+    parser.add_argument("--embeddings", type=str, default=EMBEDDINGS_PATH, help=".npy file or embedding store.")
+    parser.add_argument("--report", type=str, default=None, help="Write the JSON report here (default stdout).")
+    parser.add_argument("--block_rows", type=int, default=BLOCK_ROWS)
+    parser.add_argument("--sample_rows", type=int, default=SAMPLE_ROWS)
+    parser.add_argument("--duplicate_threshold", type=float, default=DUPLICATE_THRESHOLD)
+    parser.add_argument("--duplicate_scan", action="store_true",
+                        help="Also scan for near-duplicate pairs (its cost grows with rows squared, so it is "
+                             "off by default; implied by --max_duplicate_pairs).")
+    parser.add_argument("--max_zero_vectors", type=int, default=0)
+    parser.add_argument("--max_nan_rows", type=int, default=0)
+    parser.add_argument("--max_duplicate_pairs", type=int, default=None,
+                        help="Fail above this many near-duplicate pairs (runs the duplicate scan).")
+    parser.add_argument("--max_mean_similarity", type=float, default=None)
+    parser.add_argument("--norm_range", type=float, nargs=2, default=None, metavar=("MIN", "MAX"),
+                        help="Allowed range of vector norms (e.g. 0.99 1.01 for unit vectors).")
+    parser.add_argument("--interactive", action="store_true",
+                        help="Run the original sampled analysis with plots instead.")
+    parser.add_argument("--papers", type=str, default=PAPERS_PATH, help="papers.csv, for --interactive.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.embeddings):
+        print(f"Error: embeddings file not found at {args.embeddings}")
+        sys.exit(1)
+
+    if args.interactive:
+        df = pd.read_csv(args.papers)
+        indices, similarity_matrix = validate_embeddings(args.embeddings, df)
+        # Analyze similar texts for a random sample
+        random_sample = np.random.randint(len(indices))
+        find_similar_texts(random_sample, indices, similarity_matrix, df)
+        return
+
+    report = stream_validate(args.embeddings, block_rows=args.block_rows, sample_rows=args.sample_rows,
+                             duplicate_threshold=args.duplicate_threshold,
+                             scan_duplicates=args.duplicate_scan or args.max_duplicate_pairs is not None)
+    report["failures"] = check_thresholds(report, args.max_zero_vectors, args.max_nan_rows,
+                                          args.max_duplicate_pairs, args.max_mean_similarity, args.norm_range)
+    report["passed"] = not report["failures"]
+
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text)
+        print(f"[INFO] Report written to {args.report}", file=sys.stderr)
+    else:
+        print(text)
+    for failure in report["failures"]:
+        print(f"[ERROR] {failure}", file=sys.stderr)
+    sys.exit(0 if report["passed"] else 1)
+
+
 if __name__ == "__main__":
-    # Load your data
-    embeddings_path = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/paper_embeddings.npy"
-    df = pd.read_csv("C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/papers.csv")
-    
-    # Run validation
-    indices, similarity_matrix = validate_embeddings(embeddings_path, df)
-    
-    # Analyze similar texts for a random sample
-    random_sample = np.random.randint(len(indices))
-    find_similar_texts(random_sample, indices, similarity_matrix, df)
\ No newline at end of file
+    main()
@@ -0,0 +1,27 @@
+# gunicorn -c gunicorn.conf.py app:app
+import os
+import multiprocessing
+
+bind = "0.0.0.0:5000"
+workers = multiprocessing.cpu_count()
+# Request threads per worker. With SEARCH_BATCH_WINDOW_MS set, the queries of
+# concurrent requests in one worker are embedded and scored as one batch, so
+# use fewer workers with several threads each (e.g. GUNICORN_THREADS=16).
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+
+# Import app (and load the search service) in the master before forking,
+# so embeddings, metadata and model weights are shared copy-on-write.
+preload_app = True
+# The first warmup query can take a few seconds on a cold machine
+timeout = 120
+
+
+def post_fork(server, worker):
+    # Torch thread pools must not be started before fork, so the warmup
+    # query runs in each worker instead of the master.
+    from app import get_service, reloader
+    if get_service() is not None:
+        get_service().warmup()
+    # Threads do not survive fork: each worker watches for new index snapshots itself
+    if reloader is not None:
+        reloader.start()
@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from metrics import REGISTRY
+from search_service import SearchService
+from snapshot import current_version
+
+# Seconds between checks of the snapshot root for a new version
+POLL_SECONDS = 10
+
+
+class ReloadingSearchService:
+    def __init__(self, root: str, poll_seconds: float = POLL_SECONDS, **service_kwargs):
+        """
+        Serves the current snapshot under root (see snapshot.py) and swaps in
+        newer ones without a restart.
+
+        A watcher thread polls the root's CURRENT file. A new version is
+        loaded and warmed in the background while the old one keeps serving,
+        then installed with a single reference assignment. Requests take the
+        service once via current() and use it until they finish, so in-flight
+        requests complete on the version they started on; the old version's
+        memory maps and connections are released when its last request drops
+        it. The query encoder and its cache carry over between versions.
+
+        Args:
+            root: Snapshot root directory
+            poll_seconds: Seconds between checks for a new version
+            service_kwargs: Passed to every SearchService (encoder settings,
+                nprobe, hybrid_mode, ...)
+        """
+        self.root = root
+        self.poll_seconds = poll_seconds
+        self.service_kwargs = service_kwargs
+        self.service = None
+        self.failed_version = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        REGISTRY.register_gauge("index_reloads", "Index snapshots swapped in since start.", lambda: self.reloads)
+        self.check(warm=False)
+        if self.service is None:
+            raise FileNotFoundError(f"No usable index snapshot in {root}")
+
+    def current(self) -> SearchService:
+        """The service for one request; hold on to it for the whole request."""
+        return self.service
+
+    @property
+    def version(self):
+        return self.service.version if self.service is not None else None
+
+    def check(self, warm: bool = True) -> bool:
+        """
+        Load the version named by CURRENT if it is not the one being served.
+        A version that fails to load is not retried until CURRENT changes.
+
+        Args:
+            warm: Warm the new service before installing it (skipped for the
+                first load under gunicorn, where each worker warms after fork)
+
+        Returns:
+            True if a new version was swapped in
+        """
+        version = current_version(self.root)
+        if version is None or version == self.version or version == self.failed_version:
+            return False
+        with self._load_lock:
+            if version == self.version:
+                return False
+            old = self.service
+            start = time.perf_counter()
+            try:
+                kwargs = dict(self.service_kwargs)
+                if old is not None:
+                    kwargs.update(encoder=old.model, query_cache=old.query_cache)
+                service = SearchService(snapshot=os.path.join(self.root, version), **kwargs)
+                if warm:
+                    service.warmup()
+            except Exception as e:
+                self.failed_version = version
+                REGISTRY.inc("index_reload_failures")
+                print(f"[ERROR] Could not load index snapshot {version}: {e}")
+                return False
+            self.service = service
+            if old is not None:
+                self.reloads += 1
+                print(f"[INFO] Swapped index {old.version} -> {version} (pid {os.getpid()}) "
+                      f"in {time.perf_counter() - start:.1f}s")
+            return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def start(self) -> None:
+        """Start the watcher thread. Call it in each process that serves (after fork)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="snapshot-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
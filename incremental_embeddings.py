@@ -0,0 +1,156 @@
+import os
+import hashlib
+from typing import Callable, List, Sequence
+import numpy as np
+
+# Rows embedded between two checkpoints; a crash loses at most this much work
+CHECKPOINT_ROWS = 5000
+
+HASH_DTYPE = "S32"  # hex blake2b-128
+
+
+def content_hash(text: str, model_name: str) -> bytes:
+    """Hash of a paper's text together with the model that embeds it."""
+    digest = hashlib.blake2b(f"{model_name}\0{text}".encode("utf-8"), digest_size=16)
+    return digest.hexdigest().encode("ascii")
+
+
+def _save_atomic(path: str, array: np.ndarray) -> None:
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class IncrementalEmbeddings:
+    def __init__(self, embeddings_path: str, dim: int, model_name: str):
+        """
+        Checkpointed, incremental embedding output.
+
+        Next to the .npy embeddings it keeps two sidecar files:
+            <name>.ids.npy     paper_id of each row
+            <name>.hashes.npy  content hash of the text each row was embedded
+                               from ("" until the row is committed)
+        The embeddings and hashes files are written through memmaps and
+        committed in chunks (each checkpoint writes only that chunk's hashes),
+        so a rerun resumes where a crash left off and only embeds papers that
+        are new or whose text changed.
+
+        Args:
+            embeddings_path: Output .npy file (also readable with np.load)
+            dim: Embedding dimension
+            model_name: Embedding model; changing it invalidates every row
+        """
+        base = embeddings_path[:-4] if embeddings_path.endswith(".npy") else embeddings_path
+        self.embeddings_path = embeddings_path
+        self.ids_path = base + ".ids.npy"
+        self.hashes_path = base + ".hashes.npy"
+        self.dim = dim
+        self.model_name = model_name
+        self.vectors = None
+        self.committed = None
+        self.hashes = None
+
+    def _load_previous(self):
+        """Return (ids, committed hashes, vectors memmap) of the last run, or None."""
+        paths = (self.embeddings_path, self.ids_path, self.hashes_path)
+        if not all(os.path.exists(p) for p in paths):
+            return None
+        vectors = np.load(self.embeddings_path, mmap_mode="r")
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            print(f"[WARNING] Existing embeddings have shape {vectors.shape}; starting from scratch")
+            return None
+        return np.load(self.ids_path, allow_pickle=True), np.load(self.hashes_path), vectors
+
+    def prepare(self, paper_ids: Sequence, texts: Sequence[str]) -> np.ndarray:
+        """
+        Line the output up with the current corpus and find the rows to embed.
+
+        Rows whose paper_id and text are unchanged keep their vectors (patched
+        into their new position if the corpus was reordered or grew).
+
+        Returns:
+            Row indices that still need embedding
+        """
+        paper_ids = np.asarray(paper_ids)
+        self.hashes = np.array([content_hash(str(t), self.model_name) for t in texts], dtype=HASH_DTYPE)
+        previous = self._load_previous()
+
+        if previous is not None and np.array_equal(previous[0], paper_ids):
+            # Same corpus layout: resume in place
+            del previous
+            self.vectors = np.lib.format.open_memmap(self.embeddings_path, mode="r+")
+            self.committed = np.lib.format.open_memmap(self.hashes_path, mode="r+")
+        else:
+            tmp_path = self.embeddings_path + ".tmp.npy"
+            self.vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                                                     shape=(len(paper_ids), self.dim))
+            self.committed = np.zeros(len(paper_ids), dtype=HASH_DTYPE)
+            if previous is not None:
+                old_ids, old_committed, old_vectors = previous
+                old_row = {pid: row for row, pid in enumerate(old_ids.tolist())}
+                reused = 0
+                for row, pid in enumerate(paper_ids.tolist()):
+                    old = old_row.get(pid)
+                    if old is not None and old_committed[old] == self.hashes[row]:
+                        self.vectors[row] = old_vectors[old]
+                        self.committed[row] = self.hashes[row]
+                        reused += 1
+                print(f"[INFO] Reused {reused} of {len(old_ids)} existing embeddings")
+                del old_vectors, previous
+            self.vectors.flush()
+            # Move the patched file into place before recording its layout. The old
+            # hashes go first so a crash in between can never pair them with new rows.
+            del self.vectors
+            if os.path.exists(self.hashes_path):
+                os.remove(self.hashes_path)
+            os.replace(tmp_path, self.embeddings_path)
+            _save_atomic(self.ids_path, paper_ids)
+            _save_atomic(self.hashes_path, self.committed)
+            self.vectors = np.lib.format.open_memmap(self.embeddings_path, mode="r+")
+            self.committed = np.lib.format.open_memmap(self.hashes_path, mode="r+")
+
+        pending = np.flatnonzero(self.committed != self.hashes)
+        print(f"[INFO] {len(paper_ids) - len(pending)} papers up to date, {len(pending)} to embed")
+        return pending
+
+    def run(self, pending: np.ndarray, embed_rows: Callable[[np.ndarray, np.ndarray], List[int]],
+            chunk_rows: int = CHECKPOINT_ROWS, on_checkpoint: Callable[[], None] = None) -> List[int]:
+        """
+        Embed pending rows chunk by chunk, committing after each chunk.
+
+        Args:
+            pending: Rows returned by prepare()
+            embed_rows: embed_rows(rows, vectors) writes vectors[rows] and
+                returns the rows that failed
+            chunk_rows: Rows per checkpoint
+            on_checkpoint: Called after each chunk's vectors are flushed and
+                before its rows are committed, to persist any other output
+                of the chunk (e.g. passage vectors)
+
+        Returns:
+            Rows that failed (left uncommitted, so the next run retries them)
+        """
+        failed = []
+        for start in range(0, len(pending), chunk_rows):
+            rows = pending[start:start + chunk_rows]
+            chunk_failed = embed_rows(rows, self.vectors) or []
+            done = np.setdiff1d(rows, chunk_failed)
+            # Vectors must hit the disk before their rows are marked committed
+            self.vectors.flush()
+            if on_checkpoint is not None:
+                on_checkpoint()
+            # Only the pages holding this chunk's hashes are written; a row torn
+            # by a crash no longer matches its hash and is simply re-embedded
+            self.committed[done] = self.hashes[done]
+            self.committed.flush()
+            failed.extend(int(row) for row in chunk_failed)
+            print(f"[INFO] Checkpoint: {min(start + chunk_rows, len(pending))}/{len(pending)} rows")
+        return failed
+
+    def close(self) -> None:
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        if self.committed is not None:
+            self.committed.flush()
+            self.committed = None
@@ -0,0 +1,242 @@
+import os
+import re
+import sys
+import json
+import argparse
+from array import array
+from collections import Counter
+import numpy as np
+from embedding_store import EmbeddingStore, normalize_rows
+from search_core import search_top_k, select_top_k
+from ann_index import search_index
+
+# Defaults used when the module is run as a script
+PAPERS_PATH = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/papers.csv"
+LEXICAL_INDEX_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_bm25"
+
+# BM25 parameters
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+# Candidates taken from each ranking before fusion, or from BM25 for the dense prefilter
+DEFAULT_CANDIDATES = 1000
+# Reciprocal-rank fusion constant: score = sum 1 / (RRF_K + rank)
+RRF_K = 60
+HYBRID_MODES = ("rrf", "prefilter")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have in into is it its of on or that the their
+this to was were which with we our these those can using used also than such between both
+""".split())
+
+
+def tokenize(text: str):
+    """Lower-cased alphanumeric terms, without stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B):
+        """
+        Inverted index with BM25 weights precomputed per posting.
+
+        Postings are stored CSR-style: the postings of term t are
+        doc_ids[offsets[t]:offsets[t + 1]] with matching weights, so a query
+        only touches the postings of its own terms and scoring is a sum of
+        stored weights.
+
+        Args:
+            k1: Term-frequency saturation
+            b: Document-length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}        # term -> term id
+        self.offsets = None    # (num_terms + 1,) int64
+        self.doc_ids = None    # (num_postings,) int32, ascending within a term
+        self.weights = None    # (num_postings,) float32 BM25 term weight
+        self.num_docs = 0
+        self.avg_doc_len = 0.0
+
+    def build(self, texts) -> "BM25Index":
+        """Index an iterable of document texts; row i of the corpus is doc id i."""
+        term_ids, doc_ids, freqs = array("i"), array("i"), array("i")
+        doc_lens = array("i")
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                doc_ids.append(doc)
+                freqs.append(tf)
+
+        term_ids = np.frombuffer(term_ids, dtype=np.int32)
+        doc_lens = np.frombuffer(doc_lens, dtype=np.int32).astype(np.float32)
+        self.num_docs = len(doc_lens)
+        self.avg_doc_len = float(doc_lens.mean()) if self.num_docs else 0.0
+
+        # Group postings by term; a stable sort keeps doc ids ascending
+        order = np.argsort(term_ids, kind="stable")
+        self.doc_ids = np.frombuffer(doc_ids, dtype=np.int32)[order]
+        tf = np.frombuffer(freqs, dtype=np.int32)[order].astype(np.float32)
+        doc_freq = np.bincount(term_ids, minlength=len(self.vocab))
+        self.offsets = np.concatenate([[0], np.cumsum(doc_freq)]).astype(np.int64)
+
+        idf = np.log1p((self.num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * doc_lens[self.doc_ids] / max(self.avg_doc_len, 1e-9))
+        self.weights = (np.repeat(idf, doc_freq) * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32)
+        print(f"[INFO] BM25 index: {self.num_docs} docs, {len(self.vocab)} terms, {len(self.doc_ids)} postings")
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets.nbytes + self.doc_ids.nbytes + self.weights.nbytes)
+
+    def score(self, query: str):
+        """
+        BM25 scores of every document that contains a query term.
+
+        Returns:
+            (doc_ids, scores), doc ids ascending
+        """
+        spans = [(self.offsets[t], self.offsets[t + 1])
+                 for t in (self.vocab.get(term) for term in set(tokenize(query))) if t is not None]
+        if not spans:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        docs = np.concatenate([self.doc_ids[start:stop] for start, stop in spans])
+        weights = np.concatenate([self.weights[start:stop] for start, stop in spans])
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        return unique_docs.astype(np.int64), np.bincount(inverse, weights=weights).astype(np.float32)
+
+    def search(self, query: str, k: int = 5):
+        """
+        Top-k documents by BM25 for one query string.
+
+        Returns:
+            (indices, scores), each (1, <= k), best first; documents without
+            any query term are never returned
+        """
+        docs, scores = self.score(query)
+        pick, best = select_top_k(scores.reshape(1, -1), k)
+        return docs[pick], best
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        np.save(os.path.join(path, "doc_ids.npy"), self.doc_ids)
+        np.save(os.path.join(path, "weights.npy"), self.weights)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f)
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({"type": "bm25", "num_docs": self.num_docs, "avg_doc_len": self.avg_doc_len,
+                       "k1": self.k1, "b": self.b}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load a saved index; postings are memory-mapped."""
+        with open(os.path.join(path, "index.json")) as f:
+            info = json.load(f)
+        index = cls(k1=info["k1"], b=info["b"])
+        index.num_docs = info["num_docs"]
+        index.avg_doc_len = info["avg_doc_len"]
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            index.vocab = {term: i for i, term in enumerate(json.load(f))}
+        index.offsets = np.load(os.path.join(path, "offsets.npy"))
+        index.doc_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        index.weights = np.load(os.path.join(path, "weights.npy"), mmap_mode="r")
+        return index
+
+
+def reciprocal_rank_fusion(rankings, k: int = 5, rrf_k: int = RRF_K):
+    """
+    Fuse ranked id lists: each id scores sum(1 / (rrf_k + rank)) over the
+    lists it appears in (rank starting at 1).
+
+    Returns:
+        (ids, fused scores), best first
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking, 1):
+            fused[int(idx)] = fused.get(int(idx), 0.0) + 1.0 / (rrf_k + rank)
+    best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+    return (np.array([idx for idx, _ in best], dtype=np.int64),
+            np.array([score for _, score in best], dtype=np.float32))
+
+
+def hybrid_search(bm25: BM25Index, query: str, query_emb: np.ndarray, doc_embs, k: int = 5,
+                  mode: str = "rrf", n_candidates: int = DEFAULT_CANDIDATES, index=None, nprobe: int = None):
+    """
+    Combine BM25 and dense retrieval for one query.
+
+    Modes:
+        rrf: Take the top n_candidates of each ranking (dense from the index
+            if given, else exact) and fuse them with reciprocal-rank fusion.
+            Scores are fused RRF scores.
+        prefilter: Score only BM25's top n_candidates documents with the
+            dense model, so most of the corpus is never read. Scores are
+            cosine similarities. Falls back to a full dense search when no
+            query term is in the vocabulary.
+
+    Args:
+        bm25: Lexical index over the same rows as doc_embs
+        query: Query text
+        query_emb: (emb_dim,) or (1, emb_dim) query embedding
+        doc_embs: (num_docs, emb_dim) matrix, memmap, or EmbeddingStore
+        k: Number of results
+        mode: "rrf" or "prefilter"
+        n_candidates: Candidates per ranking
+        index: Optional dense index (see ann_index.load_index) for rrf
+        nprobe: IVF lists scanned per query
+
+    Returns:
+        (indices, scores), each (<= k,), best first
+    """
+    if mode not in HYBRID_MODES:
+        raise ValueError(f"Unknown hybrid mode {mode!r}; choose from {HYBRID_MODES}")
+    normalized = isinstance(doc_embs, EmbeddingStore)
+    if normalized:
+        doc_embs = doc_embs.embeddings
+    lexical_ids, _ = bm25.search(query, k=n_candidates)
+
+    if mode == "prefilter" and lexical_ids.shape[1]:
+        candidates = np.sort(lexical_ids[0])  # sequential reads from the memmap
+        rows = np.asarray(doc_embs[candidates], dtype=np.float32)
+        scores = normalize_rows(query_emb) @ (rows if normalized else normalize_rows(rows)).T
+        pick, best = select_top_k(scores, k)
+        return candidates[pick[0]], best[0]
+
+    n_dense = k if mode == "prefilter" else n_candidates
+    if index is not None:
+        dense_ids, dense_scores = search_index(index, query_emb.reshape(1, -1), k=n_dense, nprobe=nprobe)
+    else:
+        dense_ids, dense_scores = search_top_k(query_emb, doc_embs, k=n_dense, normalized=normalized)
+    # An IVF index pads rows with fewer than k candidates with -1
+    found = dense_ids[0] >= 0
+    if mode == "prefilter":
+        return dense_ids[0][found], dense_scores[0][found]
+    return reciprocal_rank_fusion([dense_ids[0][found], lexical_ids[0]], k=k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a BM25 inverted index over the paper text.")
+    parser.add_argument("--papers", type=str, default=PAPERS_PATH, help="papers.csv or papers.parquet.")
+    parser.add_argument("--output", type=str, default=LEXICAL_INDEX_PATH)
+    parser.add_argument("--k1", type=float, default=DEFAULT_K1)
+    parser.add_argument("--b", type=float, default=DEFAULT_B)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.papers):
+        print(f"Error: papers file not found at {args.papers}")
+        sys.exit(1)
+
+    from parse_raw_data import load_papers
+    texts = load_papers(args.papers, columns=["text"])["text"].fillna("").astype(str)
+    index = BM25Index(k1=args.k1, b=args.b).build(texts)
+    index.save(args.output)
+    print(f"[INFO] Postings: {index.nbytes / 2**20:.1f} MB, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import os
+import sys
+import sqlite3
+import argparse
+
+# Defaults used when the module is run as a script
+PAPERS_PATH = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/papers.csv"
+METADATA_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_metadata.sqlite"
+
+# Optional columns copied from the papers file when present
+OPTIONAL_FIELDS = ("title", "author", "year")
+# Rows inserted per transaction while building
+INSERT_BATCH_ROWS = 10000
+
+
+def build_metadata_store(df, out_path: str, aliases: dict = None) -> str:
+    """
+    Write paper metadata to a SQLite store, one row per embedding row.
+
+    Args:
+        df: DataFrame with paper_id and text (title, author and year are kept if present),
+            in the same row order as the embeddings
+        out_path: Destination file
+        aliases: Optional {paper_id: representative paper_id} for papers that
+            were dropped as near-duplicates (see dedup.py); results for a
+            representative list them, and row_of resolves them
+
+    Returns:
+        The path that was written
+    """
+    fields = ["paper_id", "text"] + [f for f in OPTIONAL_FIELDS if f in df.columns]
+    # Build into a temp file and rename so readers never see a half-written store
+    tmp_path = out_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("CREATE TABLE papers (row INTEGER PRIMARY KEY, paper_id INTEGER NOT NULL, "
+                 "title TEXT, author TEXT, year INTEGER, text TEXT)")
+    conn.execute("CREATE TABLE info (key TEXT PRIMARY KEY, value)")
+    sql = f"INSERT INTO papers (row, {', '.join(fields)}) VALUES (?{', ?' * len(fields)})"
+    columns = [df[f].astype(object).where(df[f].notna(), None).tolist() for f in fields]
+    for start in range(0, len(df), INSERT_BATCH_ROWS):
+        stop = min(start + INSERT_BATCH_ROWS, len(df))
+        conn.executemany(sql, zip(range(start, stop), *(c[start:stop] for c in columns)))
+    conn.execute("CREATE INDEX papers_paper_id ON papers (paper_id)")
+    conn.execute("CREATE TABLE aliases (paper_id INTEGER PRIMARY KEY, representative INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO aliases VALUES (?, ?)",
+                     ((int(pid), int(rep)) for pid, rep in (aliases or {}).items()))
+    conn.execute("CREATE INDEX aliases_representative ON aliases (representative)")
+    conn.execute("INSERT INTO info VALUES ('count', ?)", (len(df),))
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _record(paper_id, text, title=None, author=None, year=None, aliases=None) -> dict:
+    return {"paper_id": paper_id, "text": "" if text is None else str(text), "title": title,
+            "author": author, "year": int(year) if year is not None else None, "aliases": aliases or []}
+
+
+class MetadataStore:
+    def __init__(self, path: str):
+        """
+        Read-only paper metadata store written by build_metadata_store.
+        Opening it reads nothing but the row count; records are fetched by
+        row (the embedding row) or paper_id only when a result needs them.
+
+        Args:
+            path: Path to the store file
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Metadata store not found: {path}")
+        self.path = path
+        self._conn = None
+        self._conn_pid = None
+        self.count = self._db().execute("SELECT value FROM info WHERE key = 'count'").fetchone()[0]
+        # Stores built before dedup.py have no alias table
+        self.has_aliases = self._db().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'aliases'").fetchone() is not None
+
+    def _db(self):
+        # SQLite connections must not cross fork, so open one per process
+        if self._conn is None or self._conn_pid != os.getpid():
+            uri = "file:" + os.path.abspath(self.path).replace("\\", "/") + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def __len__(self) -> int:
+        return self.count
+
+    def records(self, rows, snippet_chars: int = None) -> list:
+        """
+        Fetch the records of the given rows, in the order given.
+
+        Args:
+            rows: Embedding row indices
+            snippet_chars: Only read this many characters of each text
+
+        Returns:
+            List of dicts with paper_id, text, title, author, year and aliases
+            (the paper_ids of its dropped near-duplicates)
+        """
+        rows = [int(r) for r in rows]
+        if not rows:
+            return []
+        text = "substr(text, 1, ?)" if snippet_chars else "text"
+        params = ([snippet_chars] if snippet_chars else []) + rows
+        found = {r[0]: r[1:] for r in self._db().execute(
+            f"SELECT row, paper_id, {text}, title, author, year FROM papers "
+            f"WHERE row IN ({', '.join('?' * len(rows))})", params)}
+        aliases = self.aliases_of([found[r][0] for r in rows])
+        return [_record(*found[r], aliases=aliases.get(found[r][0])) for r in rows]
+
+    def aliases_of(self, paper_ids) -> dict:
+        """{representative paper_id: [alias paper_ids]} for those of the given papers that have aliases."""
+        paper_ids = [int(pid) for pid in paper_ids]
+        out = {}
+        if not self.has_aliases or not paper_ids:
+            return out
+        for pid, rep in self._db().execute(
+                f"SELECT paper_id, representative FROM aliases "
+                f"WHERE representative IN ({', '.join('?' * len(paper_ids))}) ORDER BY paper_id", paper_ids):
+            out.setdefault(rep, []).append(pid)
+        return out
+
+    def paper_ids(self, rows) -> list:
+        return [record["paper_id"] for record in self.records(rows, snippet_chars=1)]
+
+    def all_paper_ids(self) -> list:
+        """Paper id of every row, in row order."""
+        return [r[0] for r in self._db().execute("SELECT paper_id FROM papers ORDER BY row")]
+
+    def row_of(self, paper_id):
+        """Embedding row of a paper (of its representative, for a dropped duplicate), or None."""
+        hit = self._db().execute("SELECT row FROM papers WHERE paper_id = ?", (int(paper_id),)).fetchone()
+        if hit is None and self.has_aliases:
+            hit = self._db().execute("SELECT row FROM papers JOIN aliases ON papers.paper_id = aliases.representative "
+                                     "WHERE aliases.paper_id = ?", (int(paper_id),)).fetchone()
+        return hit[0] if hit else None
+
+
+class InMemoryMetadata:
+    def __init__(self, paper_ids, texts, titles=None, authors=None, years=None, aliases: dict = None):
+        """
+        The same interface as MetadataStore over metadata already held in
+        memory (the legacy pickle or a loaded papers DataFrame).
+        """
+        self.columns = {"paper_id": paper_ids, "text": texts, "title": titles, "author": authors, "year": years}
+        self.count = len(paper_ids)
+        self.aliases = aliases or {}  # dropped paper_id -> representative paper_id
+        self.alias_lists = {}
+        for pid, rep in sorted(self.aliases.items()):
+            self.alias_lists.setdefault(rep, []).append(pid)
+
+    @classmethod
+    def from_pickle_dict(cls, meta: dict) -> "InMemoryMetadata":
+        """Wrap the dict create_embeddings.py used to pickle."""
+        return cls(meta["paper_ids"], meta.get("texts") or [""] * len(meta["paper_ids"]),
+                   meta.get("titles"), meta.get("authors"), meta.get("years"))
+
+    @classmethod
+    def from_dataframe(cls, df) -> "InMemoryMetadata":
+        def column(name):
+            return df[name].astype(object).where(df[name].notna(), None).tolist() if name in df.columns else None
+        return cls(df["paper_id"].tolist(), column("text") or [""] * len(df),
+                   column("title"), column("author"), column("year"))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def records(self, rows, snippet_chars: int = None) -> list:
+        out = []
+        for r in (int(r) for r in rows):
+            fields = {name: (values[r] if values is not None else None) for name, values in self.columns.items()}
+            record = _record(**fields, aliases=self.alias_lists.get(fields["paper_id"]))
+            if snippet_chars:
+                record["text"] = record["text"][:snippet_chars]
+            out.append(record)
+        return out
+
+    def paper_ids(self, rows) -> list:
+        return [self.columns["paper_id"][int(r)] for r in rows]
+
+    def all_paper_ids(self) -> list:
+        return list(self.columns["paper_id"])
+
+    def row_of(self, paper_id):
+        try:
+            return self.columns["paper_id"].index(self.aliases.get(paper_id, paper_id))
+        except ValueError:
+            return None
+
+
+def open_metadata(path: str):
+    """Open a metadata store (.sqlite) or, for a papers CSV/Parquet file, load it into memory."""
+    if path.endswith((".sqlite", ".db")):
+        return MetadataStore(path)
+    from parse_raw_data import load_papers
+    return InMemoryMetadata.from_dataframe(load_papers(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the SQLite paper metadata store.")
+    parser.add_argument("--papers", type=str, default=PAPERS_PATH, help="papers.csv or papers.parquet.")
+    parser.add_argument("--output", type=str, default=METADATA_PATH)
+    parser.add_argument("--aliases", type=str, default=None,
+                        help="Alias map written by dedup.py, if the papers file was deduplicated.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.papers):
+        print(f"Error: papers file not found at {args.papers}")
+        sys.exit(1)
+
+    from parse_raw_data import load_papers
+    df = load_papers(args.papers)
+    aliases = None
+    if args.aliases:
+        from dedup import load_aliases
+        aliases = load_aliases(args.aliases)
+    build_metadata_store(df, args.output, aliases)
+    print(f"[INFO] Metadata for {len(df)} papers saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import time
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Cumulative-bucket histogram in the Prometheus style."""
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "search"):
+        """
+        Per-process stage timings, call and error counters, and gauges.
+
+        Each gunicorn worker keeps its own registry, so /metrics reports the
+        worker that answered the scrape.
+
+        Args:
+            prefix: Prefix of every exported metric name
+        """
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.durations = defaultdict(Histogram)  # stage -> Histogram
+        self.errors = defaultdict(int)           # stage -> exceptions raised
+        self.counters = defaultdict(int)         # name -> value
+        self.gauges = {}                         # name -> (help, fn)
+
+    @contextmanager
+    def stage(self, name: str, trace: dict = None):
+        """
+        Time a block as one stage of the hot path.
+
+        Exceptions are counted against the stage and re-raised. If a trace dict
+        is given, the stage's duration in ms (and any error) is recorded in it.
+        """
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception as e:
+            failed = True
+            if trace is not None:
+                trace[f"{name}_error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.durations[name].observe(elapsed)
+                if failed:
+                    self.errors[name] += 1
+            if trace is not None:
+                trace[f"{name}_ms"] = round(elapsed * 1000, 3)
+
+    def record_error(self, name: str, trace: dict = None, message: str = "error") -> None:
+        """Count a failure a stage reported without raising (e.g. a None result)."""
+        with self.lock:
+            self.errors[name] += 1
+        if trace is not None:
+            trace[f"{name}_error"] = message
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += amount
+
+    def register_gauge(self, name: str, help_text: str, fn) -> None:
+        """Export fn() as a gauge, read at scrape time."""
+        self.gauges[name] = (help_text, fn)
+
+    def render(self) -> str:
+        """Render everything in the Prometheus text exposition format."""
+        p = self.prefix
+        lines = []
+        with self.lock:
+            lines += [f"# HELP {p}_stage_duration_seconds Time spent in each search stage.",
+                      f"# TYPE {p}_stage_duration_seconds histogram"]
+            for stage, hist in sorted(self.durations.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets_of(hist), hist.counts):
+                    cumulative += count
+                    lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{p}_stage_duration_seconds_sum{{stage="{stage}"}} {hist.total}')
+                lines.append(f'{p}_stage_duration_seconds_count{{stage="{stage}"}} {hist.count}')
+
+            lines += [f"# HELP {p}_stage_errors_total Exceptions raised in each search stage.",
+                      f"# TYPE {p}_stage_errors_total counter"]
+            for stage in sorted(set(self.durations) | set(self.errors)):
+                lines.append(f'{p}_stage_errors_total{{stage="{stage}"}} {self.errors[stage]}')
+
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# TYPE {p}_{name}_total counter", f"{p}_{name}_total {value}"]
+
+        for name, (help_text, fn) in sorted(self.gauges.items()):
+            lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} gauge", f"{p}_{name} {fn()}"]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def buckets_of(hist: Histogram):
+        return [str(b) for b in hist.buckets] + ["+Inf"]
+
+
+# Shared by every component in the process
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,98 @@
+import os
+import time
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+from metrics import REGISTRY
+
+# How long the first query of a batch waits for others to join it
+DEFAULT_WINDOW_MS = 2.0
+# Queries embedded and scored together at most
+DEFAULT_MAX_BATCH = 32
+
+# One waiting request
+_Pending = namedtuple("_Pending", "service query k trace future queued")
+
+
+class QueryBatcher:
+    def __init__(self, window_ms: float = DEFAULT_WINDOW_MS, max_batch: int = DEFAULT_MAX_BATCH):
+        """
+        Coalesces concurrent single-query searches into micro-batches.
+
+        Request threads call search() and block. A background thread takes
+        the oldest waiting query, gathers whatever else arrives within
+        window_ms of it (up to max_batch), answers them all with one
+        SearchService.search_many call (one encoder call, one corpus scan)
+        and hands each request its own results. A lone query waits at most
+        window_ms longer than it would unbatched; with window_ms=0 only
+        queries that are already queued are batched.
+
+        Args:
+            window_ms: Longest a query waits for others to join its batch
+            max_batch: Largest batch; a full batch is dispatched at once
+        """
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def _ensure_worker(self) -> queue.Queue:
+        # Threads do not survive fork: each gunicorn worker starts its own on first use
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name="query-batcher", daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def search(self, service, query: str, k: int = 5, trace: dict = None) -> list:
+        """
+        Drop-in for service.search(query, k, trace) that is batched with
+        other requests to the same service. Any trace also receives
+        queue_ms (time spent waiting for the batch to start).
+        """
+        future = Future()
+        self._ensure_worker().put(_Pending(service, query, k, trace, future, time.perf_counter()))
+        return future.result()
+
+    def _collect(self, pending: queue.Queue) -> list:
+        """Block for one query, then gather others until the window closes or the batch is full."""
+        batch = [pending.get()]
+        deadline = batch[0].queued + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending: queue.Queue) -> None:
+        while True:
+            batch = self._collect(pending)
+            start = time.perf_counter()
+            REGISTRY.inc("coalesced_batches")
+            REGISTRY.inc("coalesced_queries", len(batch))
+            # A hot reload can put requests for two index versions in one window
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item.service), []).append(item)
+            for items in groups.values():
+                for item in items:
+                    if item.trace is not None:
+                        item.trace["queue_ms"] = round((start - item.queued) * 1000, 3)
+                try:
+                    results = items[0].service.search_many([item.query for item in items],
+                                                           [item.k for item in items],
+                                                           [item.trace for item in items])
+                except Exception as e:
+                    for item in items:
+                        item.future.set_exception(e)
+                    continue
+                for item, result in zip(items, results):
+                    item.future.set_result(result)
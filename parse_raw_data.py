@@ -1,15 +1,20 @@
 import os
+import argparse
 import pandas as pd
 
 RAW_DATA_FILE = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/rawtext.dat"
 OUTPUT_CSV = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/papers.csv"
+OUTPUT_PARQUET = "C:/Users/rishi/OneDrive/Desktop/citeulike-t-master/citeulike-t-master/papers.parquet"
 
-def parse_raw_text(filepath):
+# Records per Parquet row group; also the unit downstream readers can skip by
+ROW_GROUP_SIZE = 50000
+
+def iter_raw_records(filepath):
     """
-    Parse the raw data file where paper abstracts are separated by lines like '##0', '##1', etc.
-    Returns a list of dicts, each with {'paper_id': str, 'text': str}.
+    Stream (paper_id, text) pairs from the raw data file, where paper abstracts
+    are separated by lines like '##0', '##1', etc. Only one record is held in
+    memory at a time.
     """
-    papers = []
     current_id = None
     current_text_lines = []
 
@@ -19,12 +24,9 @@ def parse_raw_text(filepath):
 
             # Detect a new paper ID line (e.g., "##0", "##1", etc.)
             if line.startswith('##'):
-                # If we already have an active paper, save it before starting a new one
+                # If we already have an active paper, emit it before starting a new one
                 if current_id is not None:
-                    papers.append({
-                        'paper_id': current_id,
-                        'text': "\n".join(current_text_lines)
-                    })
+                    yield current_id, "\n".join(current_text_lines)
 
                 # Extract numeric ID after "##"
                 current_id = line.replace('##', '').strip()
@@ -33,20 +35,89 @@ def parse_raw_text(filepath):
                 # Accumulate text lines for the current paper
                 current_text_lines.append(line)
 
-        # At EOF, save the last paper if it exists
+        # At EOF, emit the last paper if it exists
         if current_id is not None:
-            papers.append({
-                'paper_id': current_id,
-                'text': "\n".join(current_text_lines)
-            })
+            yield current_id, "\n".join(current_text_lines)
+
+
+def parse_raw_text(filepath):
+    """
+    Parse the raw data file where paper abstracts are separated by lines like '##0', '##1', etc.
+    Returns a list of dicts, each with {'paper_id': str, 'text': str}.
+    """
+    return [{'paper_id': paper_id, 'text': text} for paper_id, text in iter_raw_records(filepath)]
+
+
+def write_parquet(records, out_path, row_group_size=ROW_GROUP_SIZE):
+    """
+    Write (paper_id, text) records to Parquet one row group at a time, so memory
+    stays bounded by row_group_size regardless of corpus size.
+
+    Args:
+        records: Iterable of (paper_id, text); paper_id must be an integer string
+        out_path: Destination .parquet file
+        row_group_size: Records per row group
+
+    Returns:
+        Number of records written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([('paper_id', pa.int64()), ('text', pa.string())])
+    count = 0
+    ids, texts = [], []
+    with pq.ParquetWriter(out_path, schema, compression='zstd') as writer:
+        for paper_id, text in records:
+            ids.append(int(paper_id))
+            texts.append(text)
+            if len(ids) >= row_group_size:
+                writer.write_table(pa.table({'paper_id': ids, 'text': texts}, schema=schema))
+                count += len(ids)
+                ids, texts = [], []
+        if ids:
+            writer.write_table(pa.table({'paper_id': ids, 'text': texts}, schema=schema))
+            count += len(ids)
+    return count
 
-    return papers
+
+def load_papers(path, columns=None, filters=None):
+    """
+    Load the parsed corpus as a DataFrame, reading only what is needed.
+
+    Args:
+        path: papers.parquet or papers.csv
+        columns: Columns to read (default: all)
+        filters: Parquet row filters, e.g. [('paper_id', '<', 1000)]; row groups
+            outside the range are skipped without being decoded. Not supported
+            for CSV.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+    if filters is not None:
+        raise ValueError("Row filters are only supported for Parquet input")
+    return pd.read_csv(path, usecols=columns)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Parse rawtext.dat into a structured paper table.")
+    parser.add_argument("--input", type=str, default=RAW_DATA_FILE)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="Output format; parquet is streamed in row groups with integer paper_ids.")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Output path (default depends on --format).")
+    args = parser.parse_args()
+
+    print(f"[INFO] Parsing raw data from {args.input}")
+    if args.format == "parquet":
+        output = args.output or OUTPUT_PARQUET
+        count = write_parquet(iter_raw_records(args.input), output)
+        print(f"[INFO] Saved structured data to {output} (found {count} records)")
+        return
+
     # 1. Parse the raw data
-    print(f"[INFO] Parsing raw data from {RAW_DATA_FILE}")
-    papers_list = parse_raw_text(RAW_DATA_FILE)
+    papers_list = parse_raw_text(args.input)
 
     # 2. Convert to DataFrame
     df = pd.DataFrame(papers_list, columns=['paper_id', 'text'])
@@ -59,8 +130,9 @@ def main():
         pass
 
     # 3. Save to CSV
-    print(f"[INFO] Saving structured data to {OUTPUT_CSV} (found {len(df)} records)")
-    df.to_csv(OUTPUT_CSV, index=False)
+    output = args.output or OUTPUT_CSV
+    print(f"[INFO] Saving structured data to {output} (found {len(df)} records)")
+    df.to_csv(output, index=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+from search_core import search_top_k
+
+
+class PassageIndex:
+    def __init__(self, dim: int):
+        """
+        Per-chunk vectors of the papers that were too long to embed in one
+        request, kept for passage-level retrieval. Each paper's chunks are
+        stored in order with their token counts.
+
+        Args:
+            dim: Embedding dimension
+        """
+        self.dim = dim
+        self.passages = {}  # paper_id -> (chunk vectors (n, dim), chunk token counts (n,))
+
+    def __len__(self) -> int:
+        return sum(len(tokens) for _, tokens in self.passages.values())
+
+    def update(self, paper_id, vectors: np.ndarray, token_counts) -> None:
+        """Replace the passages of one paper."""
+        self.passages[paper_id] = (np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim),
+                                   np.asarray(token_counts, dtype=np.int32))
+
+    def arrays(self):
+        """Flattened (vectors, paper_ids, chunk_nos, token_counts)."""
+        if not self.passages:
+            return (np.zeros((0, self.dim), np.float32), np.zeros(0, np.int64),
+                    np.zeros(0, np.int32), np.zeros(0, np.int32))
+        paper_ids = sorted(self.passages)
+        vectors = np.concatenate([self.passages[pid][0] for pid in paper_ids])
+        tokens = np.concatenate([self.passages[pid][1] for pid in paper_ids])
+        owners = np.repeat(paper_ids, [len(self.passages[pid][1]) for pid in paper_ids])
+        chunk_nos = np.concatenate([np.arange(len(self.passages[pid][1]), dtype=np.int32) for pid in paper_ids])
+        return vectors, owners, chunk_nos, tokens
+
+    def save(self, path: str) -> None:
+        vectors, paper_ids, chunk_nos, tokens = self.arrays()
+        # Write to a temp file and rename so readers never see a half-written file
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, vectors=vectors, paper_ids=paper_ids, chunk_nos=chunk_nos, token_counts=tokens)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, dim: int = None) -> "PassageIndex":
+        """Load a saved index; a missing file gives an empty index of the given dim."""
+        if not os.path.exists(path):
+            if dim is None:
+                raise FileNotFoundError(path)
+            return cls(dim)
+        data = np.load(path)
+        index = cls(data["vectors"].shape[1])
+        paper_ids = data["paper_ids"]
+        if len(paper_ids) == 0:
+            return index
+        starts = np.flatnonzero(np.r_[True, paper_ids[1:] != paper_ids[:-1]])
+        for start, stop in zip(starts, np.r_[starts[1:], len(paper_ids)]):
+            index.passages[paper_ids[start].item()] = (data["vectors"][start:stop], data["token_counts"][start:stop])
+        return index
+
+    def search(self, query_emb: np.ndarray, k: int = 5):
+        """
+        Top-k passages by cosine similarity.
+
+        Returns:
+            List of (paper_id, chunk_no, score), best first
+        """
+        vectors, paper_ids, chunk_nos, _ = self.arrays()
+        indices, scores = search_top_k(query_emb, vectors, k=k)
+        return [(paper_ids[i].item(), int(chunk_nos[i]), float(s)) for i, s in zip(indices[0], scores[0])]
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from embedding_store import EmbeddingStore, normalize_rows
+from search_core import select_top_k, merge_top_k
+
+# Defaults used when the module is run as a script
+STORE_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.pemb"
+QUANTIZED_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_index_int8"
+
+# Candidates scored on compressed codes before the exact rerank
+DEFAULT_SHORTLIST = 100
+# Rows of codes decoded per scoring chunk
+CHUNK_ROWS = 65536
+# int8 codes widened to float32 at a time while scoring; small enough to stay in cache
+SCORE_BLOCK_BYTES = 512 * 2**10
+
+
+def _kmeans(data: np.ndarray, n_clusters: int, n_iter: int, rng) -> np.ndarray:
+    """Plain Euclidean k-means; returns the centroids."""
+    centroids = data[rng.choice(len(data), n_clusters, replace=len(data) < n_clusters)].copy()
+    for _ in range(n_iter):
+        # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+        assignments = np.argmax(data @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class ScalarQuantizer:
+    """Symmetric per-dimension int8 quantization: x ~= code * scale."""
+    kind = "int8"
+
+    def __init__(self):
+        self.scale = None
+
+    def train(self, sample: np.ndarray) -> None:
+        scale = np.abs(sample).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        self.scale = scale.astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Fold the scale into the query so the codes are used as-is. The codes
+        # are widened to float32 (for BLAS) a few rows at a time into one
+        # reused buffer, never as a whole float copy of the chunk.
+        scaled = (queries * self.scale).astype(np.float32)
+        rows = max(1, SCORE_BLOCK_BYTES // (4 * codes.shape[1]))
+        buffer = np.empty((min(rows, len(codes)), codes.shape[1]), dtype=np.float32)
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), rows):
+            block = buffer[:len(codes[start:start + rows])]
+            block[...] = codes[start:start + rows]
+            scores[:, start:start + len(block)] = scaled @ block.T
+        return scores
+
+    def params(self) -> dict:
+        return {"scale": self.scale}
+
+    def load_params(self, params) -> None:
+        self.scale = params["scale"]
+
+
+class ProductQuantizer:
+    """Split vectors into m sub-vectors, each coded as one of 256 k-means centroids."""
+    kind = "pq"
+
+    def __init__(self, m: int = 96, n_iter: int = 15, seed: int = 42):
+        self.m = m
+        self.n_iter = n_iter
+        self.seed = seed
+        self.codebooks = None  # (m, 256, sub_dim)
+
+    def train(self, sample: np.ndarray) -> None:
+        dim = sample.shape[1]
+        if dim % self.m:
+            raise ValueError(f"Embedding dim {dim} is not divisible by m={self.m}")
+        sub_dim = dim // self.m
+        rng = np.random.default_rng(self.seed)
+        self.codebooks = np.stack([
+            _kmeans(sample[:, i * sub_dim:(i + 1) * sub_dim], 256, self.n_iter, rng)
+            for i in range(self.m)
+        ]).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        sub_dim = self.codebooks.shape[2]
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for i, book in enumerate(self.codebooks):
+            sub = vectors[:, i * sub_dim:(i + 1) * sub_dim]
+            codes[:, i] = np.argmax(sub @ book.T - 0.5 * (book ** 2).sum(axis=1), axis=1)
+        return codes
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Asymmetric distance: per-query lookup table of sub-vector inner products
+        sub_dim = self.codebooks.shape[2]
+        sub_queries = queries.reshape(len(queries), self.m, sub_dim)
+        tables = np.einsum("qms,mcs->qmc", sub_queries, self.codebooks)  # (Q, m, 256)
+        scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for i in range(self.m):
+            scores += tables[:, i, codes[:, i]]
+        return scores
+
+    def params(self) -> dict:
+        return {"codebooks": self.codebooks, "m": np.array(self.m)}
+
+    def load_params(self, params) -> None:
+        self.codebooks = params["codebooks"]
+        self.m = int(params["m"])
+
+
+QUANTIZERS = {"int8": ScalarQuantizer, "pq": ProductQuantizer}
+
+
+class QuantizedIndex:
+    def __init__(self, quantizer, embeddings: np.ndarray = None, shortlist: int = DEFAULT_SHORTLIST):
+        """
+        Compressed-code search with an exact rerank.
+
+        Every document is scored on its compressed code; the best `shortlist`
+        candidates are then rescored against the full-precision vectors,
+        which can stay memory-mapped since only a few rows are read.
+
+        Args:
+            quantizer: ScalarQuantizer or ProductQuantizer
+            embeddings: Full-precision embeddings for the rerank, or None to
+                return compressed-code scores only
+            shortlist: Candidates reranked per query
+        """
+        self.quantizer = quantizer
+        self.embeddings = embeddings
+        self.shortlist = shortlist
+        self.codes = None
+
+    def build(self, embeddings: np.ndarray, train_size: int = 100000, seed: int = 42) -> "QuantizedIndex":
+        rng = np.random.default_rng(seed)
+        sample_ids = np.sort(rng.choice(len(embeddings), min(len(embeddings), train_size), replace=False))
+        print(f"[INFO] Training {self.quantizer.kind} quantizer on {len(sample_ids)} vectors")
+        self.quantizer.train(normalize_rows(embeddings[sample_ids]))
+        self.codes = np.concatenate([
+            self.quantizer.encode(normalize_rows(embeddings[start:start + CHUNK_ROWS]))
+            for start in range(0, len(embeddings), CHUNK_ROWS)
+        ])
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+
+    def search(self, query_embs: np.ndarray, k: int = 5, rerank: bool = True):
+        """
+        Top-k search on the codes, optionally reranked on full-precision vectors.
+
+        Returns:
+            (indices, scores), each (num_queries, k), best first
+        """
+        queries = normalize_rows(query_embs)
+        rerank = rerank and self.embeddings is not None
+        n_candidates = min(max(k, self.shortlist) if rerank else k, len(self.codes))
+
+        run_ids = np.empty((len(queries), 0), dtype=np.int64)
+        run_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.codes), CHUNK_ROWS):
+            chunk_ids, chunk_scores = select_top_k(
+                self.quantizer.score(queries, self.codes[start:start + CHUNK_ROWS]), n_candidates)
+            run_ids, run_scores = merge_top_k(run_ids, run_scores, chunk_ids + start, chunk_scores, n_candidates)
+        if not rerank:
+            return run_ids, run_scores
+
+        out_ids = np.empty((len(queries), min(k, n_candidates)), dtype=np.int64)
+        out_scores = np.empty(out_ids.shape, dtype=np.float32)
+        for qi, candidates in enumerate(run_ids):
+            candidates = np.sort(candidates)  # sequential reads from the memmap
+            exact = normalize_rows(self.embeddings[candidates]) @ queries[qi]
+            pick, out_scores[qi] = select_top_k(exact.reshape(1, -1), k)
+            out_ids[qi] = candidates[pick[0]]
+        return out_ids, out_scores
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "codes.npy"), self.codes)
+        np.savez(os.path.join(path, "quantizer.npz"), **self.quantizer.params())
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({"type": self.quantizer.kind, "count": int(len(self.codes)),
+                       "shortlist": self.shortlist}, f)
+
+    @classmethod
+    def load(cls, path: str, embeddings: np.ndarray = None) -> "QuantizedIndex":
+        """Load a saved index; codes are memory-mapped. Pass embeddings to enable the rerank."""
+        with open(os.path.join(path, "index.json")) as f:
+            info = json.load(f)
+        quantizer = QUANTIZERS[info["type"]]()
+        quantizer.load_params(np.load(os.path.join(path, "quantizer.npz")))
+        index = cls(quantizer, embeddings, shortlist=info["shortlist"])
+        index.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+        return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a quantized (int8 or PQ) embedding index.")
+    parser.add_argument("--store", type=str, default=STORE_PATH, help="Embedding store built with embedding_store.py.")
+    parser.add_argument("--kind", choices=sorted(QUANTIZERS), default="int8")
+    parser.add_argument("--pq_m", type=int, default=96, help="Number of PQ sub-vectors (must divide the dim).")
+    parser.add_argument("--shortlist", type=int, default=DEFAULT_SHORTLIST)
+    parser.add_argument("--output", type=str, default=QUANTIZED_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.store):
+        print(f"Error: embedding store not found at {args.store}")
+        sys.exit(1)
+
+    store = EmbeddingStore(args.store)
+    quantizer = ProductQuantizer(m=args.pq_m) if args.kind == "pq" else ScalarQuantizer()
+    index = QuantizedIndex(quantizer, shortlist=args.shortlist).build(store.embeddings)
+    index.save(args.output)
+    print(f"[INFO] {args.kind} codes: {index.nbytes / 2**20:.1f} MB "
+          f"(float32: {store.embeddings.nbytes / 2**20:.1f} MB), saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
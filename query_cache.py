@@ -0,0 +1,203 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Default on-disk cache location, next to the embeddings
+CACHE_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/query_cache.sqlite"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Completed LLM analyses kept in memory
+DEFAULT_MAX_ANALYSES = 1024
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace so trivially different spellings of a query share an entry."""
+    return " ".join(text.split())
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """Open the cache database, creating its tables on first use."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS query_embeddings ("
+        "model TEXT NOT NULL, query TEXT NOT NULL, vector BLOB NOT NULL, "
+        "PRIMARY KEY (model, query))")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS analyses ("
+        "key TEXT PRIMARY KEY, model TEXT NOT NULL, query TEXT NOT NULL, "
+        "paper_ids TEXT NOT NULL, analysis TEXT NOT NULL)")
+    return conn
+
+
+class QueryEmbeddingCache:
+    def __init__(self, db_path: str = CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Two-tier cache of query embeddings keyed on (model name, normalized query).
+
+        Args:
+            db_path: SQLite file for the persistent tier, or None for memory only
+            max_bytes: Size bound of the in-memory LRU tier (vector bytes)
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self):
+        # SQLite connections must not cross fork, so open one per process
+        if self.db_path is None:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = _connect(self.db_path)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _remember(self, key, vector: np.ndarray) -> None:
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key).nbytes
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def get(self, query: str, model_name: str):
+        """Return the cached float32 vector for a query, or None."""
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            db = self._db()
+            row = None
+            if db is not None:
+                row = db.execute("SELECT vector FROM query_embeddings WHERE model = ? AND query = ?",
+                                 key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            vector = np.frombuffer(row[0], dtype=np.float32)
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+    def put(self, query: str, model_name: str, vector: np.ndarray) -> None:
+        """Store a query vector in both tiers."""
+        key = (model_name, normalize_query(query))
+        vector = np.ascontiguousarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self._remember(key, vector)
+            db = self._db()
+            if db is not None:
+                db.execute("INSERT OR REPLACE INTO query_embeddings (model, query, vector) VALUES (?, ?, ?)",
+                           (key[0], key[1], vector.tobytes()))
+                db.commit()
+
+    def get_or_compute(self, query: str, model_name: str, embed_fn) -> np.ndarray:
+        """
+        Return the cached vector, calling embed_fn(query) only on a miss.
+        embed_fn may return a (emb_dim,) or (1, emb_dim) array, or None on failure
+        (failures are not cached).
+        """
+        vector = self.get(query, model_name)
+        if vector is None:
+            vector = embed_fn(query)
+            if vector is None:
+                return None
+            self.put(query, model_name, vector)
+            vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+
+class AnalysisCache:
+    def __init__(self, db_path: str = CACHE_PATH, max_entries: int = DEFAULT_MAX_ANALYSES):
+        """
+        Two-tier cache of completed LLM analyses keyed on (model, normalized
+        query, retrieved paper ids). The analysis prompt is fully determined by
+        these, so a hit can be replayed instead of regenerated.
+
+        Args:
+            db_path: SQLite file for the persistent tier, or None for memory only
+            max_entries: Size bound of the in-memory LRU tier
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self.hits = 0
+        self.misses = 0
+
+    def _db(self):
+        if self.db_path is None:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = _connect(self.db_path)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _key(query: str, paper_ids, model_name: str) -> str:
+        ids = [str(pid) for pid in paper_ids]
+        return hashlib.sha256(json.dumps([model_name, normalize_query(query), ids]).encode("utf-8")).hexdigest()
+
+    def get(self, query: str, paper_ids, model_name: str):
+        """Return the cached analysis text, or None."""
+        key = self._key(query, paper_ids, model_name)
+        with self._lock:
+            analysis = self._memory.get(key)
+            if analysis is None:
+                db = self._db()
+                row = db.execute("SELECT analysis FROM analyses WHERE key = ?", (key,)).fetchone() if db else None
+                if row is None:
+                    self.misses += 1
+                    return None
+                analysis = row[0]
+            self._remember(key, analysis)
+            self.hits += 1
+            return analysis
+
+    def put(self, query: str, paper_ids, model_name: str, analysis: str) -> None:
+        """Store a completed analysis in both tiers."""
+        key = self._key(query, paper_ids, model_name)
+        with self._lock:
+            self._remember(key, analysis)
+            db = self._db()
+            if db is not None:
+                db.execute("INSERT OR REPLACE INTO analyses (key, model, query, paper_ids, analysis) "
+                           "VALUES (?, ?, ?, ?, ?)",
+                           (key, model_name, normalize_query(query),
+                            json.dumps([str(pid) for pid in paper_ids]), analysis))
+                db.commit()
+
+    def _remember(self, key: str, analysis: str) -> None:
+        self._memory[key] = analysis
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
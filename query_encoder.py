@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import argparse
+# numpy is imported where it is used: the semantic_search thin client reads
+# the constants below without loading it
+from functools import lru_cache
+
+LOCAL_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+BACKENDS = ("torch", "quantized", "onnx")
+DEFAULT_BACKEND = "torch"
+# Queries are short; padding/attention beyond this is wasted work
+MAX_QUERY_TOKENS = 64
+DEFAULT_THREADS = os.cpu_count() or 1
+PARITY_TOLERANCE = 0.99  # minimum cosine similarity to the reference model
+
+
+def encoder_cache_key(model_name: str, backend: str = DEFAULT_BACKEND) -> str:
+    """Cache key of a model/backend pair; fp32 torch shares the plain model name."""
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+
+class QueryEncoder:
+    def __init__(self, model_name: str = LOCAL_MODEL_NAME, backend: str = DEFAULT_BACKEND,
+                 num_threads: int = DEFAULT_THREADS, max_seq_length: int = MAX_QUERY_TOKENS):
+        """
+        CPU query encoder around a SentenceTransformer model.
+
+        Args:
+            model_name: SentenceTransformer model
+            backend: "torch" (fp32), "quantized" (dynamic int8 Linear layers)
+                or "onnx" (ONNX Runtime export, needs optimum[onnxruntime])
+            num_threads: Intra-op threads used for inference
+            max_seq_length: Token limit queries are truncated to
+        """
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; choose from {BACKENDS}")
+        torch.set_num_threads(num_threads)
+
+        if backend == "onnx":
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = num_threads
+            model = SentenceTransformer(model_name, device="cpu", backend="onnx",
+                                        model_kwargs={"provider": "CPUExecutionProvider",
+                                                      "session_options": options})
+        else:
+            model = SentenceTransformer(model_name, device="cpu")
+            if backend == "quantized":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.max_seq_length = max_seq_length
+        model.eval()
+
+        self.model = model
+        self.model_name = model_name
+        self.backend = backend
+        self.num_threads = num_threads
+        self.max_seq_length = max_seq_length
+        self._inference_mode = torch.inference_mode
+
+    @property
+    def cache_key(self) -> str:
+        """Identifies the embedding space, for keying query-embedding caches."""
+        return encoder_cache_key(self.model_name, self.backend)
+
+    def encode(self, queries, batch_size: int = 32, **kwargs) -> "np.ndarray":
+        """Same call shape as SentenceTransformer.encode; returns float32."""
+        import numpy as np
+
+        with self._inference_mode():
+            embeddings = self.model.encode(queries, batch_size=batch_size, convert_to_numpy=True, **kwargs)
+        return embeddings.astype(np.float32, copy=False)
+
+
+@lru_cache(maxsize=None)
+def get_query_encoder(model_name: str = LOCAL_MODEL_NAME, backend: str = DEFAULT_BACKEND,
+                      num_threads: int = DEFAULT_THREADS,
+                      max_seq_length: int = MAX_QUERY_TOKENS) -> QueryEncoder:
+    """Build each encoder configuration once per process and reuse it."""
+    return QueryEncoder(model_name, backend, num_threads, max_seq_length)
+
+
+def check_parity(encoder: QueryEncoder, reference, queries, tolerance: float = PARITY_TOLERANCE) -> dict:
+    """
+    Compare an encoder against a reference model on the same queries.
+
+    Args:
+        encoder: Encoder under test
+        reference: Full-precision SentenceTransformer (no truncation)
+        queries: List of query strings
+        tolerance: Minimum acceptable cosine similarity per query
+
+    Returns:
+        Dict with min/mean cosine and whether every query passed
+    """
+    import numpy as np
+
+    ours = encoder.encode(queries)
+    theirs = np.asarray(reference.encode(queries), dtype=np.float32)
+    cosines = (ours * theirs).sum(axis=1) / (np.linalg.norm(ours, axis=1) * np.linalg.norm(theirs, axis=1))
+    return {"min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean()),
+            "passed": bool((cosines >= tolerance).all())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity and latency check for the CPU query encoders.")
+    parser.add_argument("--queries", type=str, default="Queries.txt", help="Queries.txt-format file.")
+    parser.add_argument("--backends", type=str, default=",".join(BACKENDS))
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    parser.add_argument("--max_seq_length", type=int, default=MAX_QUERY_TOKENS)
+    parser.add_argument("--tolerance", type=float, default=PARITY_TOLERANCE)
+    parser.add_argument("--repeats", type=int, default=5, help="Timed passes over the query set.")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    from bench_retrieval import parse_queries_file
+
+    queries = [q for _, q in parse_queries_file(args.queries)]
+    reference = SentenceTransformer(LOCAL_MODEL_NAME, device="cpu")
+    failed = False
+
+    print(f"{'backend':<11}{'min cos':>9}{'mean cos':>10}{'ms/query':>10}  parity")
+    for backend in args.backends.split(","):
+        encoder = get_query_encoder(LOCAL_MODEL_NAME, backend, args.threads, args.max_seq_length)
+        parity = check_parity(encoder, reference, queries, args.tolerance)
+        encoder.encode(queries[:1])  # warm up
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            for query in queries:
+                encoder.encode([query])
+        ms = (time.perf_counter() - start) * 1000 / (args.repeats * len(queries))
+        print(f"{backend:<11}{parity['min_cosine']:>9.4f}{parity['mean_cosine']:>10.4f}{ms:>10.2f}  "
+              f"{'ok' if parity['passed'] else 'FAIL'}")
+        failed = failed or not parity["passed"]
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
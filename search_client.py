@@ -0,0 +1,56 @@
+import os
+import json
+import socket
+import tempfile
+
+# Unix socket the search daemon listens on
+SOCKET_PATH = os.environ.get("SEMANTIC_SEARCH_SOCKET",
+                             os.path.join(tempfile.gettempdir(), "semantic_search.sock"))
+# Seconds to wait for the daemon's answer once connected
+TIMEOUT = 30.0
+
+
+def send_request(request: dict, socket_path: str = SOCKET_PATH, timeout: float = TIMEOUT):
+    """
+    Send one newline-delimited JSON request to the daemon and return its reply.
+
+    Returns:
+        The decoded reply dict, or None if no daemon is listening
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            # Stale socket file left by a daemon that is no longer running
+            return None
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reply:
+            line = reply.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def query_daemon(query: str, k: int = 5, socket_path: str = SOCKET_PATH, timeout: float = TIMEOUT):
+    """
+    Run a search on the warm daemon.
+
+    Args:
+        query: Search query
+        k: Number of results
+        socket_path: Daemon socket
+        timeout: Seconds to wait for the results
+
+    Returns:
+        List of result dicts (see SearchService.paper_record), or None if no
+        daemon is running
+    """
+    reply = send_request({"query": query, "k": k}, socket_path, timeout)
+    if reply is None:
+        return None
+    if "error" in reply:
+        raise RuntimeError(f"Search daemon error: {reply['error']}")
+    return reply["results"]
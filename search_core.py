@@ -0,0 +1,88 @@
+import numpy as np
+from embedding_store import EmbeddingStore, normalize_rows
+
+# Upper bound on the size of one (queries x corpus-chunk) float32 score block
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def select_top_k(scores: np.ndarray, k: int):
+    """
+    Pick the k largest scores in each row with argpartition, then sort only those k.
+
+    Args:
+        scores: (num_queries, num_candidates) score matrix
+        k: Number of results per row
+
+    Returns:
+        (indices, scores), each (num_queries, min(k, num_candidates)), best first
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def merge_top_k(run_ids: np.ndarray, run_scores: np.ndarray, new_ids: np.ndarray,
+                new_scores: np.ndarray, k: int):
+    """Merge a running (Q, k) top-k with a new block of candidates, keeping the best k."""
+    merged_ids = np.concatenate([run_ids, new_ids], axis=1)
+    merged_scores = np.concatenate([run_scores, new_scores], axis=1)
+    pick, best_scores = select_top_k(merged_scores, k)
+    return np.take_along_axis(merged_ids, pick, axis=1), best_scores
+
+
+def search_top_k(query_embs: np.ndarray, doc_embs, k: int = 5, normalized: bool = False,
+                 block_bytes: int = DEFAULT_BLOCK_BYTES):
+    """
+    Exact cosine top-k for a block of queries against the whole corpus.
+
+    The corpus is scored in chunks sized so that one (Q x chunk) score block
+    stays under block_bytes; each chunk's top-k is merged into a running top-k,
+    so the full (Q x N) score matrix is never materialized.
+
+    Args:
+        query_embs: (num_queries, emb_dim) or (emb_dim,) query vector(s)
+        doc_embs: (num_docs, emb_dim) matrix, memmap, or EmbeddingStore
+        k: Number of results per query
+        normalized: True if doc_embs rows are already L2-normalized
+            (always the case for an EmbeddingStore)
+        block_bytes: Memory budget for a single score block
+
+    Returns:
+        (indices, scores), each (num_queries, min(k, num_docs)), best first
+    """
+    if isinstance(doc_embs, EmbeddingStore):
+        doc_embs, normalized = doc_embs.embeddings, True
+    queries = normalize_rows(query_embs)
+    num_queries, num_docs = len(queries), len(doc_embs)
+    k = min(k, num_docs)
+
+    # Large query batches are split too, so a chunk is never smaller than k rows
+    query_block = max(1, min(num_queries, block_bytes // (4 * max(k, 1024))))
+    best_ids = np.empty((num_queries, k), dtype=np.int64)
+    best_scores = np.empty((num_queries, k), dtype=np.float32)
+
+    for q_start in range(0, num_queries, query_block):
+        q = queries[q_start:q_start + query_block]
+        chunk_size = max(k, block_bytes // (4 * len(q)))
+        run_ids = np.empty((len(q), 0), dtype=np.int64)
+        run_scores = np.empty((len(q), 0), dtype=np.float32)
+
+        for start in range(0, num_docs, chunk_size):
+            chunk = np.asarray(doc_embs[start:start + chunk_size], dtype=np.float32)
+            if not normalized:
+                chunk = normalize_rows(chunk)
+            chunk_ids, chunk_scores = select_top_k(q @ chunk.T, k)
+            # Merge this chunk's winners with the running top-k
+            run_ids, run_scores = merge_top_k(run_ids, run_scores, chunk_ids + start, chunk_scores, k)
+
+        best_ids[q_start:q_start + len(q)] = run_ids
+        best_scores[q_start:q_start + len(q)] = run_scores
+    return best_ids, best_scores
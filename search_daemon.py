@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import argparse
+import socketserver
+from search_client import SOCKET_PATH
+from search_service import SearchService
+from lexical_index import HYBRID_MODES
+from query_encoder import BACKENDS, DEFAULT_BACKEND, DEFAULT_THREADS
+
+
+class SearchRequestHandler(socketserver.StreamRequestHandler):
+    """One newline-delimited JSON request per line: {"query": ..., "k": ...} or {"ping": true}."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("ping"):
+                    reply = {"ready": self.server.service.ready}
+                else:
+                    query = (request.get("query") or "").strip()
+                    if not query:
+                        raise ValueError("Query cannot be empty")
+                    reply = {"results": self.server.service.search(query, k=int(request.get("k", 5)))}
+            except Exception as e:
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply, default=str).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class SearchDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: SearchService):
+        """
+        Serves searches from a warm SearchService over a Unix socket, so each
+        CLI query skips the imports, model load and corpus load.
+
+        Args:
+            socket_path: Path of the Unix socket to listen on
+            service: Loaded search service
+        """
+        # A socket file left by a crashed daemon would make bind() fail
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.service = service
+        super().__init__(socket_path, SearchRequestHandler)
+        self.socket_path = socket_path
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the search model and corpus warm behind a Unix socket.")
+    parser.add_argument("--socket", type=str, default=SOCKET_PATH, help="Unix socket to listen on.")
+    parser.add_argument("--index_path", type=str, default=None,
+                        help="Optional IVF or quantized index directory to search.")
+    parser.add_argument("--encoder_backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for sharded exact search when no index is used.")
+    parser.add_argument("--bm25_path", type=str, default=None,
+                        help="BM25 index directory; enables hybrid search.")
+    parser.add_argument("--hybrid", choices=HYBRID_MODES, default="rrf")
+    args = parser.parse_args()
+
+    if not hasattr(socketserver, "UnixStreamServer"):
+        print("Error: Unix sockets are not available on this platform.")
+        sys.exit(1)
+
+    service = SearchService(index_path=args.index_path, encoder_backend=args.encoder_backend,
+                            num_threads=args.threads, num_workers=args.workers,
+                            bm25_path=args.bm25_path, hybrid_mode=args.hybrid)
+    service.warmup()
+    with SearchDaemon(args.socket, service) as daemon:
+        print(f"[INFO] Search daemon listening on {args.socket}")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            print("[INFO] Shutting down")
+
+
+if __name__ == "__main__":
+    main()
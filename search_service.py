@@ -0,0 +1,222 @@
+import os
+import time
+import numpy as np
+from semantic_search import load_embeddings_and_metadata, embed_query_local, get_top_k, LOCAL_MODEL_NAME
+from embedding_store import EmbeddingStore
+from ann_index import load_index, search_index, DEFAULT_NPROBE
+from search_core import search_top_k
+from query_cache import QueryEmbeddingCache, CACHE_PATH
+from metrics import REGISTRY
+from sharded_search import ShardedSearcher
+from lexical_index import BM25Index, hybrid_search
+from query_encoder import get_query_encoder, DEFAULT_BACKEND, DEFAULT_THREADS
+
+SNIPPET_CHARS = 500
+# Queries embedded and scored together in batch mode
+BATCH_SIZE = 256
+
+
+class SearchService:
+    def __init__(self, model_name: str = LOCAL_MODEL_NAME, index_path: str = None,
+                 nprobe: int = DEFAULT_NPROBE, cache_path: str = CACHE_PATH,
+                 encoder_backend: str = DEFAULT_BACKEND, num_threads: int = DEFAULT_THREADS,
+                 num_workers: int = 1, bm25_path: str = None, hybrid_mode: str = "rrf",
+                 snapshot: str = None, encoder=None, query_cache: QueryEmbeddingCache = None):
+        """
+        Holds everything a search needs (embeddings, metadata, query model) so it
+        is loaded once per process. Create it before forking workers so they
+        share the memory copy-on-write.
+
+        Args:
+            model_name: SentenceTransformer model used to embed queries
+            index_path: Optional IVF or quantized index directory to search
+            nprobe: Number of IVF lists scanned per query
+            cache_path: Persistent query-embedding cache, or None for memory only
+            encoder_backend: Query encoder backend (see query_encoder.BACKENDS)
+            num_threads: Intra-op threads per process for the query encoder
+            num_workers: With no index, score the corpus in this many worker
+                processes. Only for single-process servers (search_daemon.py):
+                a pool created before gunicorn forks cannot be shared.
+            bm25_path: Optional BM25 index from lexical_index.py for hybrid search
+            hybrid_mode: "rrf" or "prefilter" (see lexical_index.hybrid_search)
+            snapshot: Load a versioned snapshot directory (see snapshot.py)
+                instead of the configured paths; its own ANN and BM25 indexes
+                replace index_path and bm25_path
+            encoder: Query encoder to reuse instead of loading model_name
+            query_cache: Query-embedding cache to reuse
+        """
+        start = time.perf_counter()
+        self.version = None
+        if snapshot:
+            from snapshot import load_manifest
+            from metadata_store import MetadataStore
+            manifest = load_manifest(snapshot)
+            self.version = manifest["version"]
+            self.doc_embs = EmbeddingStore(manifest["files"]["embeddings"])
+            self.paper_metadata = MetadataStore(manifest["files"]["metadata"])
+            index_path = manifest["files"].get("index")
+            bm25_path = manifest["files"].get("bm25")
+        else:
+            self.doc_embs, self.paper_metadata = load_embeddings_and_metadata()
+        self.index = None
+        if index_path:
+            embs = self.doc_embs.embeddings if isinstance(self.doc_embs, EmbeddingStore) else self.doc_embs
+            self.index = load_index(index_path, embeddings=embs)
+        elif num_workers > 1:
+            self.index = ShardedSearcher(self.doc_embs, num_workers=num_workers)
+        self.nprobe = nprobe
+        self.bm25 = BM25Index.load(bm25_path) if bm25_path else None
+        self.hybrid_mode = hybrid_mode
+        # Always CPU: CUDA cannot be initialized before fork
+        self.model = encoder or get_query_encoder(model_name, encoder_backend, num_threads)
+        self.model_name = self.model.cache_key
+        self.query_cache = query_cache or QueryEmbeddingCache(cache_path)
+        REGISTRY.register_gauge("query_cache_hits", "Query-embedding cache hits (memory and disk).",
+                                lambda: self.query_cache.memory_hits + self.query_cache.disk_hits)
+        REGISTRY.register_gauge("query_cache_misses", "Query-embedding cache misses.",
+                                lambda: self.query_cache.misses)
+        self.ready = False
+        version = f" (snapshot {self.version})" if self.version else ""
+        print(f"[INFO] Search service loaded {self.doc_embs.shape[0]} papers{version} "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    def warmup(self) -> None:
+        """
+        Run one throwaway query and fault in the embedding pages so the first
+        real request does not pay model initialization or disk reads.
+        """
+        start = time.perf_counter()
+        if isinstance(self.doc_embs, EmbeddingStore):
+            self.doc_embs.warmup()
+        # Bypass the query cache so the model really runs
+        query_emb = embed_query_local("warmup query", self.model)
+        get_top_k(query_emb, self.doc_embs, k=1, index=self.index, nprobe=self.nprobe)
+        self.ready = True
+        print(f"[INFO] Search service warm (pid {os.getpid()}) in {time.perf_counter() - start:.1f}s")
+
+    def embed(self, query: str) -> np.ndarray:
+        """Embed a query (cached by text and model); returns shape (1, emb_dim)."""
+        vector = self.query_cache.get_or_compute(query, self.model_name,
+                                                 lambda q: embed_query_local(q, self.model))
+        return vector.reshape(1, -1)
+
+    def paper_records(self, indices, scores) -> list:
+        """Build the response fields for the results, fetching only their snippets."""
+        records = self.paper_metadata.records(indices, snippet_chars=SNIPPET_CHARS)
+        return [{
+            "paper_id": record["paper_id"],
+            # citeulike-t only stores the text; fall back to its first line as the title
+            "title": record["title"] or record["text"].split("\n", 1)[0][:200],
+            "author": record["author"],
+            "year": record["year"],
+            "abstract": record["text"],
+            "relevance": round(float(score), 4),
+            # Near-duplicates dropped before embedding (dedup.py) that this paper stands for
+            "aliases": record["aliases"],
+        } for record, score in zip(records, scores)]
+
+    def paper_record(self, idx: int, score: float) -> dict:
+        """Build the response fields for one result from the stored metadata."""
+        return self.paper_records([idx], [score])[0]
+
+    def search(self, query: str, k: int = 5, trace: dict = None) -> list:
+        """
+        Return the top-k papers for a query as response-ready dicts.
+        Stages are timed in metrics.REGISTRY; pass a dict as trace to also get
+        this request's per-stage timings written into it.
+        """
+        with REGISTRY.stage("embed", trace):
+            query_emb = self.embed(query)
+        with REGISTRY.stage("search", trace):
+            if self.bm25 is not None:
+                indices, scores = hybrid_search(self.bm25, query, query_emb, self.doc_embs, k=k,
+                                                mode=self.hybrid_mode, index=self.index, nprobe=self.nprobe)
+            else:
+                indices, scores = get_top_k(query_emb, self.doc_embs, k=k, index=self.index, nprobe=self.nprobe)
+        with REGISTRY.stage("format", trace):
+            return self.paper_records(indices, scores)
+
+    def embed_many(self, queries) -> np.ndarray:
+        """
+        Embed several queries, running the model once for all the ones that
+        are not in the query cache.
+
+        Returns:
+            (len(queries), emb_dim) float32
+        """
+        vectors = [self.query_cache.get(query, self.model_name) for query in queries]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = np.asarray(self.model.encode([queries[i] for i in missing], batch_size=min(len(missing), 64)),
+                                  dtype=np.float32)
+            for i, vector in zip(missing, computed):
+                self.query_cache.put(queries[i], self.model_name, vector)
+                vectors[i] = vector
+        return np.stack([np.asarray(v, dtype=np.float32).reshape(-1) for v in vectors])
+
+    def score_batch(self, queries, query_embs: np.ndarray, k: int = 5) -> list:
+        """
+        Top-k of a block of embedded queries, scored together with one
+        (Q, d) x (d, N) pass over the corpus (or the index). With a BM25
+        index, hybrid search runs per query.
+
+        Returns:
+            One (ids, scores) pair per query
+        """
+        if self.bm25 is not None:
+            hits = [hybrid_search(self.bm25, query, emb, self.doc_embs, k=k, mode=self.hybrid_mode,
+                                  index=self.index, nprobe=self.nprobe)
+                    for query, emb in zip(queries, query_embs)]
+        elif self.index is not None:
+            hits = zip(*search_index(self.index, query_embs, k=k, nprobe=self.nprobe))
+        else:
+            hits = zip(*search_top_k(query_embs, self.doc_embs, k=k))
+        return [(ids[ids >= 0], scores[ids >= 0]) for ids, scores in hits]
+
+    def search_many(self, queries, ks, traces=None) -> list:
+        """
+        Answer concurrent requests together: one encoder call for the
+        uncached queries and one scoring pass, then each request's top k.
+        Used by micro_batch.QueryBatcher.
+
+        Args:
+            queries: Query strings
+            ks: Number of results for each query
+            traces: Optional trace dict (or None) per query; each receives the
+                shared batch_embed_ms and batch_search_ms and the batch_size
+
+        Returns:
+            Each query's results, as search() returns them
+        """
+        shared = {"batch_size": len(queries)}
+        with REGISTRY.stage("batch_embed", shared):
+            query_embs = self.embed_many(queries)
+        with REGISTRY.stage("batch_search", shared):
+            hits = self.score_batch(queries, query_embs, k=max(ks))
+        results = []
+        for (ids, scores), k, trace in zip(hits, ks, traces or [None] * len(queries)):
+            if trace is not None:
+                trace.update(shared)
+            with REGISTRY.stage("format", trace):
+                results.append(self.paper_records(ids[:k], scores[:k]))
+        return results
+
+    def search_batch(self, queries, k: int = 5, batch_size: int = BATCH_SIZE):
+        """
+        Search many queries at once, yielding each query's results (as search()
+        returns them) in input order.
+
+        Queries are embedded batch_size at a time in one encoder call and
+        scored together with blocked matrix multiplies; the query cache is
+        bypassed. With a BM25 index, hybrid search still runs per query.
+        """
+        for start in range(0, len(queries), batch_size):
+            block = list(queries[start:start + batch_size])
+            with REGISTRY.stage("batch_embed"):
+                query_embs = np.asarray(self.model.encode(block, batch_size=min(batch_size, 64)), dtype=np.float32)
+            with REGISTRY.stage("batch_search"):
+                hits = self.score_batch(block, query_embs, k=k)
+            for ids, scores in hits:
+                with REGISTRY.stage("format"):
+                    results = self.paper_records(ids, scores)
+                yield results
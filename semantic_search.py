@@ -1,12 +1,12 @@
 import os
 import sys
 import argparse
-import numpy as np
-import pickle
+# Only lightweight imports at module level: when a search daemon is running the
+# CLI is a thin client, and numpy/torch/sentence_transformers are never loaded.
+# The in-process path imports them inside the functions that need them.
 #import openai
-import torch
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from search_client import query_daemon, SOCKET_PATH
+from query_encoder import BACKENDS, DEFAULT_BACKEND, DEFAULT_THREADS
 
 #client = OpenAI(
 #    api_key=os.environ.get("OPENAI_API_KEY"),  # This is the default and can be omitted
@@ -27,6 +27,14 @@ from sklearn.metrics.pairwise import cosine_similarity
 # -------------
 EMB_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.npy"
 META_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_metadata.pkl"
+# Indexed metadata store built by create_embeddings.py (used instead of the pickle when present)
+METADATA_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_metadata.sqlite"
+# Pre-normalized, memory-mapped store built with embedding_store.py (used when present)
+STORE_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.pemb"
+# Approximate index (IVF from ann_index.py, or int8/PQ from quantization.py) used with --use_index
+INDEX_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_index_ivf"
+# BM25 inverted index from lexical_index.py, used with --hybrid
+BM25_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_bm25"
 
 # Change this if you want a different local model
 LOCAL_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
@@ -40,20 +48,39 @@ OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
 def load_embeddings_and_metadata():
     """
     Load locally stored embeddings and metadata (paper IDs, text, etc.).
+    If a pre-normalized embedding store exists it is memory-mapped instead of
+    reading the whole .npy file into RAM. Likewise the SQLite metadata store
+    is opened without reading any records; the pickle is the fallback.
+
+    Returns:
+        (doc_embs, metadata) where metadata has records(rows) (see metadata_store.py)
     """
-    if not os.path.exists(EMB_PATH) or not os.path.exists(META_PATH):
+    has_metadata = os.path.exists(METADATA_PATH) or os.path.exists(META_PATH)
+    if not has_metadata or not (os.path.exists(STORE_PATH) or os.path.exists(EMB_PATH)):
         raise FileNotFoundError("Embeddings or metadata file not found. "
                                 "Make sure you have run create_embeddings.py or have them in place.")
 
-    doc_embs = np.load(EMB_PATH)  # shape: (num_docs, emb_dim)
+    import pickle
+    import numpy as np
+    from embedding_store import EmbeddingStore
+    from metadata_store import MetadataStore, InMemoryMetadata
+
+    if os.path.exists(STORE_PATH):
+        doc_embs = EmbeddingStore(STORE_PATH)  # memory-mapped, shape: (num_docs, emb_dim)
+    else:
+        doc_embs = np.load(EMB_PATH)  # shape: (num_docs, emb_dim)
+    if os.path.exists(METADATA_PATH):
+        return doc_embs, MetadataStore(METADATA_PATH)
     with open(META_PATH, "rb") as f:
         paper_metadata = pickle.load(f)
-    return doc_embs, paper_metadata
+    return doc_embs, InMemoryMetadata.from_pickle_dict(paper_metadata)
 
 def embed_query_local(query, model):
     """
     Embed the query text using a local SentenceTransformer model.
     """
+    import numpy as np
+
     # Return shape: (1, emb_dim)
     emb = model.encode([query])
     return np.array(emb)
@@ -63,26 +90,47 @@ def embed_query_openai(query, model_name=OPENAI_EMBEDDING_MODEL):
     Embed the query text using the OpenAI API (text-embedding-ada-002, etc.).
     Requires openai.api_key to be set.
     """
+    import numpy as np
+
     response = openai.Embedding.create(model=model_name, input=query)
     # Extract the vector from the response
     vector = response["data"][0]["embedding"]  # list of floats
     return np.array([vector])  # shape: (1, emb_dim)
 
-def get_top_k(query_emb, doc_embs, k=5):
+def get_top_k(query_emb, doc_embs, k=5, index=None, nprobe=None):
     """
     Compute the cosine similarity between the query embedding and all doc embeddings,
     then return the indices + similarity scores of the top-k documents.
+    doc_embs may be a raw matrix or an EmbeddingStore (already normalized).
+    If an index from ann_index.load_index is given it is searched instead: an IVF
+    index scans only its nprobe closest lists, a quantized index scores compressed
+    codes and reranks a shortlist on the full-precision vectors.
+    query_emb may hold several rows; only the first query's results are returned.
     """
-    sims = cosine_similarity(query_emb, doc_embs)[0]  # shape: (num_docs,)
-    top_k_indices = np.argsort(sims)[::-1][:k]        # descending sort
-    top_k_scores = sims[top_k_indices]
-    return top_k_indices, top_k_scores
+    from search_core import search_top_k
+    from ann_index import search_index
+
+    if index is not None:
+        top_k_indices, top_k_scores = search_index(index, query_emb, k=k, nprobe=nprobe)
+        valid = top_k_indices[0] >= 0
+        return top_k_indices[0][valid], top_k_scores[0][valid]
+
+    # Chunked scan with argpartition; never sorts (or holds) the full score vector
+    top_k_indices, top_k_scores = search_top_k(query_emb, doc_embs, k=k)
+    return top_k_indices[0], top_k_scores[0]
 
 # -------------
 # Main
 # -------------
 def main():
-    parser = argparse.ArgumentParser(description="Semantic search for academic papers.")
+    # `semantic_search.py batch queries|neighbours ...` runs the batch mode (see batch_search.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from batch_search import main as batch_main
+        batch_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="Semantic search for academic papers.",
+                                     epilog="For many queries at once: semantic_search.py batch --help")
     parser.add_argument("query", type=str, help="Your search query.")
     parser.add_argument("--use_openai", action="store_true",
                         help="Use OpenAI embeddings instead of local model.")
@@ -90,14 +138,84 @@ def main():
                         help="OpenAI API key (optional, can also be set as env var).")
     parser.add_argument("--k", type=int, default=5,
                         help="Number of top results to retrieve.")
+    parser.add_argument("--use_index", action="store_true",
+                        help="Search an approximate or quantized index instead of scanning every document.")
+    parser.add_argument("--index_path", type=str, default=INDEX_PATH,
+                        help="Index directory to use with --use_index.")
+    parser.add_argument("--nprobe", type=int, default=None,
+                        help="Number of IVF lists to scan per query (with --use_index; default 8).")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Do not read or write the persistent query-embedding cache.")
+    parser.add_argument("--encoder_backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="CPU backend for the local query encoder (torch, quantized int8, onnx).")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS,
+                        help="Intra-op threads for the local query encoder.")
+    parser.add_argument("--hybrid", choices=["rrf", "prefilter"], default=None,
+                        help="Combine with BM25: fuse both rankings (rrf) or only score BM25 candidates (prefilter).")
+    parser.add_argument("--bm25_path", type=str, default=BM25_PATH,
+                        help="BM25 index directory to use with --hybrid.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for sharded exact search when no index is used (in-process mode).")
+    parser.add_argument("--socket", type=str, default=SOCKET_PATH,
+                        help="Unix socket of a running search_daemon.py.")
+    parser.add_argument("--no_daemon", action="store_true",
+                        help="Always search in-process, even if a daemon is running.")
     args = parser.parse_args()
 
+    # The daemon serves the local model over the default corpus, index and encoder
+    # settings; anything else (or no daemon) runs in this process.
+    custom_encoder = any(getattr(args, name) != parser.get_default(name)
+                         for name in ("encoder_backend", "threads", "workers", "no_cache"))
+    if not (args.no_daemon or args.use_openai or args.use_index or args.hybrid or custom_encoder):
+        results = query_daemon(args.query, k=args.k, socket_path=args.socket)
+        if results is not None:
+            print_results(args.query, args.k,
+                          [(r["paper_id"], r["relevance"], r["abstract"]) for r in results])
+            return
+        print("[INFO] No search daemon running; searching in-process.")
+
+    run_in_process(args)
+
+
+def print_results(query, k, hits):
+    """Print (paper_id, score, text) hits in rank order."""
+    print(f"\n[INFO] Top {k} relevant papers for query='{query}':\n")
+    for rank, (paper_id, score, paper_text) in enumerate(hits, 1):
+        # Truncate the text for display
+        snippet = paper_text[:200].replace("\n", " ") + "..."
+        print(f"Rank {rank}: (Paper ID: {paper_id})  Score: {score:.4f}")
+        print(f"Snippet: {snippet}")
+        print("-" * 60)
+
+
+def run_in_process(args):
+    """Load the corpus and model in this process and answer a single query."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from embedding_store import EmbeddingStore
+    from ann_index import load_index
+    from query_cache import QueryEmbeddingCache, CACHE_PATH
+    from query_encoder import get_query_encoder, encoder_cache_key
+
     # 1. Load doc embeddings + metadata
     doc_embs, paper_metadata = load_embeddings_and_metadata()
     print(f"[INFO] Loaded {doc_embs.shape[0]} document embeddings.")
+    index = None
+    if args.use_index:
+        embs = doc_embs.embeddings if isinstance(doc_embs, EmbeddingStore) else doc_embs
+        index = load_index(args.index_path, embeddings=embs)
+        print(f"[INFO] Loaded {type(index).__name__} from {args.index_path}.")
 
-    # 2. Prepare query embedding
-    if args.use_openai:
+    # 2. Prepare query embedding (repeat queries come straight from the cache)
+    query_cache = None if args.no_cache else QueryEmbeddingCache(CACHE_PATH)
+    model_name = OPENAI_EMBEDDING_MODEL if args.use_openai else encoder_cache_key(LOCAL_MODEL_NAME, args.encoder_backend)
+    cached_emb = query_cache.get(args.query, model_name) if query_cache else None
+
+    if cached_emb is not None:
+        print("[INFO] Query embedding found in cache for model:", model_name)
+        query_emb = cached_emb.reshape(1, -1)
+
+    elif args.use_openai:
         # Optionally set the API key
         if args.openai_api_key:
             openai.api_key = args.openai_api_key
@@ -114,28 +232,35 @@ def main():
         # Use local model
         print("[INFO] Embedding query with local model:", LOCAL_MODEL_NAME)
 
-        # Make sure device is set to GPU if available
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        local_model = SentenceTransformer(LOCAL_MODEL_NAME, device=device)
+        # Make sure device is set to GPU if available; otherwise use the optimized CPU encoder
+        if torch.cuda.is_available():
+            local_model = SentenceTransformer(LOCAL_MODEL_NAME, device="cuda")
+        else:
+            local_model = get_query_encoder(LOCAL_MODEL_NAME, args.encoder_backend, args.threads)
 
         query_emb = embed_query_local(args.query, local_model)
 
+    if cached_emb is None and query_cache is not None:
+        query_cache.put(args.query, model_name, query_emb)
+
     # 3. Compute top-K
-    top_k_indices, top_k_scores = get_top_k(query_emb, doc_embs, k=args.k)
+    if args.hybrid:
+        from lexical_index import BM25Index, hybrid_search
+        bm25 = BM25Index.load(args.bm25_path)
+        top_k_indices, top_k_scores = hybrid_search(bm25, args.query, query_emb, doc_embs, k=args.k,
+                                                    mode=args.hybrid, index=index, nprobe=args.nprobe)
+    elif index is None and args.workers > 1:
+        from sharded_search import ShardedSearcher
+        with ShardedSearcher(doc_embs, num_workers=args.workers) as searcher:
+            top_k_indices, top_k_scores = get_top_k(query_emb, doc_embs, k=args.k, index=searcher)
+    else:
+        top_k_indices, top_k_scores = get_top_k(query_emb, doc_embs, k=args.k, index=index, nprobe=args.nprobe)
 
     # 4. Display results
-    # paper_metadata structure could vary; we assume keys like "paper_ids" and "texts".
-    print(f"\n[INFO] Top {args.k} relevant papers for query='{args.query}':\n")
-    for rank, (idx, score) in enumerate(zip(top_k_indices, top_k_scores), 1):
-        paper_id = paper_metadata["paper_ids"][idx]
-        # If you have a 'titles' or 'texts' key, adjust accordingly
-        paper_text = paper_metadata.get("texts", [""])[idx]
-
-        # Truncate the text for display
-        snippet = paper_text[:200].replace("\n", " ") + "..."
-        print(f"Rank {rank}: (Paper ID: {paper_id})  Score: {score:.4f}")
-        print(f"Snippet: {snippet}")
-        print("-" * 60)
+    # Only the top-k records are read, and only as much text as the snippet shows
+    records = paper_metadata.records(top_k_indices, snippet_chars=200)
+    print_results(args.query, args.k, [(record["paper_id"], score, record["text"])
+                                       for record, score in zip(records, top_k_scores)])
 
 if __name__ == "__main__":
     main()
@@ -1,20 +1,45 @@
 import numpy as np
 from openai import OpenAI
-import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
 import tiktoken
 import sys
 from typing import List, Tuple
 import time
+from embedding_store import EmbeddingStore
+from ann_index import load_index, search_index, DEFAULT_NPROBE
+from search_core import search_top_k
+from query_cache import QueryEmbeddingCache, AnalysisCache, CACHE_PATH
+from metadata_store import open_metadata
+from metrics import REGISTRY
+from sharded_search import ShardedSearcher
+from analysis import AnalysisStreamer
+from lexical_index import BM25Index, hybrid_search
 
 class AcademicSearchEngine:
-    def __init__(self, embeddings_path: str, papers_path: str):
+    def __init__(self, embeddings_path: str, papers_path: str, index_path: str = None,
+                 nprobe: int = DEFAULT_NPROBE, query_cache: QueryEmbeddingCache = None,
+                 num_workers: int = 1, bm25_path: str = None, hybrid_mode: str = "rrf",
+                 analysis_cache: AnalysisCache = None):
         """
         Initialize the academic search engine.
         
         Args:
-            embeddings_path: Path to the numpy file containing paper embeddings
-            papers_path: Path to the CSV file containing paper information
+            embeddings_path: Path to the numpy file containing paper embeddings,
+                or to a pre-normalized store (.pemb) built with embedding_store.py
+            papers_path: Path to the metadata store (.sqlite, see metadata_store.py),
+                or to a CSV or Parquet file of paper information (loaded into memory)
+            index_path: Optional index directory built with ann_index.py (IVF;
+                searches scan only the nprobe closest lists) or quantization.py
+                (int8/PQ codes with a full-precision rerank)
+            nprobe: Number of IVF lists scanned per query
+            query_cache: Optional QueryEmbeddingCache; repeat queries then skip the API call
+            num_workers: With no index, score the corpus in this many worker
+                processes (sharded exact search); 1 searches in-process
+            bm25_path: Optional BM25 index built with lexical_index.py; queries
+                then combine lexical and dense retrieval
+            hybrid_mode: "rrf" (reciprocal-rank fusion) or "prefilter" (dense
+                scoring of BM25 candidates only)
+            analysis_cache: Optional AnalysisCache; identical requests (same
+                query and retrieved papers) then replay the stored analysis
         """
         self.client = OpenAI(api_key= '')
         self.model = "gpt-4o"
@@ -22,14 +47,34 @@ class AcademicSearchEngine:
         
         # Load data
         print("Loading embeddings and papers...")
-        self.embeddings = np.load(embeddings_path)
-        self.papers_df = pd.read_csv(papers_path)
+        if embeddings_path.endswith(".pemb"):
+            # Memory-mapped and already L2-normalized; shared via the page cache
+            self.store = EmbeddingStore(embeddings_path)
+            self.embeddings = self.store.embeddings
+        else:
+            self.store = None
+            self.embeddings = np.load(embeddings_path)
+        self.papers = open_metadata(papers_path)
+        self.ann_index = load_index(index_path, self.embeddings) if index_path else None
+        if self.ann_index is None and num_workers > 1:
+            self.ann_index = ShardedSearcher(self.store or self.embeddings, num_workers=num_workers)
+        self.nprobe = nprobe
+        self.bm25 = BM25Index.load(bm25_path) if bm25_path else None
+        self.hybrid_mode = hybrid_mode
+        self.query_cache = query_cache
         
         # System prompt for academic focus
         self.system_prompt = """You are an academic research assistant. Your role is to help users find relevant academic papers 
         and research materials."""
+        self.analyzer = AnalysisStreamer(self.client, self.model, analysis_cache, self.system_prompt)
 
     def get_embedding(self, text: str) -> np.ndarray:
+        """Get embedding for a text, from the query cache if possible."""
+        if self.query_cache is None:
+            return self.request_embedding(text)
+        return self.query_cache.get_or_compute(text, self.embedding_model, self.request_embedding)
+
+    def request_embedding(self, text: str) -> np.ndarray:
         """Get embedding for a text using OpenAI's API."""
         try:
             response = self.client.embeddings.create(
@@ -41,70 +86,107 @@ class AcademicSearchEngine:
             print(f"Error getting embedding: {e}")
             return None
 
-    def find_similar_papers(self, query_embedding: np.ndarray, top_k: int = 1) -> List[Tuple[int, float]]:
-        """Find most similar papers using cosine similarity."""
-        similarities = cosine_similarity(query_embedding.reshape(1, -1), self.embeddings)[0]
-        top_indices = similarities.argsort()[-top_k:][::-1]
-        return [(idx, similarities[idx]) for idx in top_indices]
+    def find_similar_papers(self, query_embedding: np.ndarray, top_k: int = 1,
+                            query_text: str = None) -> List[Tuple[int, float]]:
+        """Find most similar papers using cosine similarity (fused with BM25 if given query_text)."""
+        if self.bm25 is not None and query_text:
+            indices, scores = hybrid_search(self.bm25, query_text, query_embedding,
+                                            self.store or self.embeddings, k=top_k, mode=self.hybrid_mode,
+                                            index=self.ann_index, nprobe=self.nprobe)
+            return list(zip(indices, scores))
+        if self.ann_index is not None:
+            indices, scores = search_index(self.ann_index, query_embedding, k=top_k, nprobe=self.nprobe)
+            return [(idx, score) for idx, score in zip(indices[0], scores[0]) if idx >= 0]
+        indices, scores = search_top_k(query_embedding.reshape(1, -1), self.embeddings, k=top_k,
+                                       normalized=self.store is not None)
+        return list(zip(indices[0], scores[0]))
 
     def format_results(self, similar_papers: List[Tuple[int, float]]) -> str:
         """Format search results into a readable string."""
         results = []
-        for idx, similarity in similar_papers:
-            paper = self.papers_df.iloc[idx]
+        papers = self.papers.records([idx for idx, _ in similar_papers], snippet_chars=300)
+        for paper, (_, similarity) in zip(papers, similar_papers):
             result = f"\nSimilarity Score: {similarity:.3f}\n"
-            result += f"Title: {paper.get('title', 'N/A')}\n"
-            result += f"Abstract: {paper.get('text', 'N/A')[:300]}...\n"
+            result += f"Title: {paper['title'] or 'N/A'}\n"
+            result += f"Abstract: {paper['text'] or 'N/A'}...\n"
             result += "-" * 80
             results.append(result)
         return "\n".join(results)
 
-    def process_query(self, user_query: str) -> str:
-        """Process user query and return response using GPT-4."""
-        try:
-            # First, check if query is academic-related using GPT-4
-            # Get embedding for the query
-            query_embedding = self.get_embedding(user_query)
-            if query_embedding is None:
-                return "Sorry, there was an error processing your query. Please try again."
+    def process_query(self, user_query: str, trace: dict = None) -> str:
+        """
+        Process user query and return response using GPT-4.
 
-            # Find similar papers
-            similar_papers = self.find_similar_papers(query_embedding)
-            results = self.format_results(similar_papers)
+        Each step is timed in metrics.REGISTRY (stages embed, search, format,
+        llm). Pass a dict as trace to also get this request's per-stage
+        timings and errors written into it.
 
-            # Generate response using GPT-4
-            chat_response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": f"""Based on the following query and search results, provide a scholarly analysis 
-                    of how these papers relate to the query. Be specific about why each paper is relevant.
-                    
-                    Query: {user_query}
-                    
-                    Search Results: {results}"""}
-                ]
-            )
+        See stream_query to receive the results before the analysis.
+        """
+        try:
+            with REGISTRY.stage("process_query", trace):
+                return self._process_query(user_query, trace)
+        except Exception as e:
+            return f"An error occurred: {str(e)}"
 
-            final_response = f"""Search Results Analysis:
-            {chat_response.choices[0].message.content}
+    def _process_query(self, user_query: str, trace: dict = None) -> str:
+        results, analysis = None, []
+        for event, data in self.stream_query(user_query, trace):
+            if event == "error":
+                return data
+            if event == "results":
+                results = data
+            else:
+                analysis.append(data)
+
+        final_response = f"""Search Results Analysis:
+            {"".join(analysis)}
             
             Detailed Results:
             {results}"""
 
-            return final_response
+        return final_response
 
-        except Exception as e:
-            return f"An error occurred: {str(e)}"
+    def stream_query(self, user_query: str, trace: dict = None):
+        """
+        Generator version of process_query.
+
+        Yields (event, data) pairs: ("results", formatted search results) as
+        soon as retrieval is done, then ("analysis", text) for each piece of
+        the GPT-4 analysis as it arrives. A failed embedding yields a single
+        ("error", message) instead.
+        """
+        # Get embedding for the query
+        with REGISTRY.stage("embed", trace):
+            query_embedding = self.get_embedding(user_query)
+        if query_embedding is None:
+            REGISTRY.record_error("embed", trace, "embedding request failed")
+            yield "error", "Sorry, there was an error processing your query. Please try again."
+            return
+
+        # Find similar papers
+        with REGISTRY.stage("search", trace):
+            similar_papers = self.find_similar_papers(query_embedding, query_text=user_query)
+        with REGISTRY.stage("format", trace):
+            results = self.format_results(similar_papers)
+        yield "results", results
+
+        # Stream the GPT-4 analysis (replayed from the cache for a repeat request)
+        paper_ids = self.papers.paper_ids([idx for idx, _ in similar_papers])
+        for text in self.analyzer.stream(user_query, paper_ids, results, trace):
+            yield "analysis", text
 
 def main():
     # Initialize paths
     EMBEDDINGS_PATH = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/paper_embeddings.npy"
-    PAPERS_PATH = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/papers.csv"
+    # SQLite store built from papers.csv with metadata_store.py, so startup never loads the papers
+    PAPERS_PATH = "C:/Users/rishi/OneDrive/Desktop/ELEC498 Project FIles/citeulike-t-master/citeulike-t-master/paper_metadata.sqlite"
     
     try:
         # Initialize search engine
-        search_engine = AcademicSearchEngine(EMBEDDINGS_PATH, PAPERS_PATH)
+        search_engine = AcademicSearchEngine(EMBEDDINGS_PATH, PAPERS_PATH,
+                                             query_cache=QueryEmbeddingCache(CACHE_PATH),
+                                             analysis_cache=AnalysisCache(CACHE_PATH))
         print("Academic Search Engine initialized. Type 'quit' to exit.")
         
         while True:
@@ -119,8 +201,16 @@ def main():
             # Process query and display results
             if user_query:
                 print("\nProcessing your query...\n")
-                response = search_engine.process_query(user_query)
-                print(response)
+                # Results print as soon as retrieval finishes; the analysis streams in after
+                try:
+                    for event, data in search_engine.stream_query(user_query):
+                        if event == "results":
+                            print(f"Detailed Results:\n{data}\n\nSearch Results Analysis:")
+                        else:
+                            print(data, end="", flush=True)
+                    print()
+                except Exception as e:
+                    print(f"\nAn error occurred: {str(e)}")
             
             # Add a small delay for readability
             time.sleep(1)
@@ -0,0 +1,120 @@
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from embedding_store import EmbeddingStore, normalize_rows
+from search_core import search_top_k, merge_top_k, DEFAULT_BLOCK_BYTES
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Rows normalized and copied into shared memory at a time
+COPY_BLOCK_ROWS = 65536
+# Each worker scores with a single BLAS thread; parallelism comes from the shards
+WORKER_ENV = {"OMP_NUM_THREADS": "1", "OPENBLAS_NUM_THREADS": "1", "MKL_NUM_THREADS": "1"}
+
+# Per-worker state, set by _init_worker
+_worker_matrix = None
+_worker_shm = None
+
+
+def _init_worker(store_path, shm_name, shape):
+    """Attach the worker to the corpus without copying it."""
+    global _worker_matrix, _worker_shm
+    if store_path is not None:
+        _worker_matrix = EmbeddingStore(store_path).embeddings
+    else:
+        _worker_shm = shared_memory.SharedMemory(name=shm_name)
+        _worker_matrix = np.ndarray(shape, dtype=np.float32, buffer=_worker_shm.buf)
+
+
+def _score_shard(queries: np.ndarray, start: int, stop: int, k: int, block_bytes: int):
+    """Local top-k of one shard, with ids in corpus coordinates."""
+    ids, scores = search_top_k(queries, _worker_matrix[start:stop], k=k, normalized=True,
+                               block_bytes=block_bytes)
+    return ids + start, scores
+
+
+class ShardedSearcher:
+    def __init__(self, doc_embs, num_workers: int = DEFAULT_WORKERS, normalized: bool = False,
+                 block_bytes: int = DEFAULT_BLOCK_BYTES):
+        """
+        Exact cosine search split across a pool of worker processes.
+
+        The corpus is cut into one contiguous shard per worker. An
+        EmbeddingStore is shared by having every worker memory-map the same
+        file; any other matrix is normalized once into a shared_memory block.
+        Each worker returns its shard's top-k and the parent merges them.
+        Has the same search() signature as the indexes, so it can be passed
+        wherever an index is accepted (get_top_k, search_index).
+
+        Args:
+            doc_embs: (num_docs, emb_dim) matrix, memmap, or EmbeddingStore
+            num_workers: Worker processes (and shards)
+            normalized: True if doc_embs rows are already L2-normalized
+            block_bytes: Score-block memory budget per worker
+        """
+        self.block_bytes = block_bytes
+        self.shm = None
+        store_path = None
+        if isinstance(doc_embs, EmbeddingStore):
+            store_path = doc_embs.path
+            self.shape = doc_embs.shape
+        else:
+            self.shape = doc_embs.shape
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(self.shape)) * 4))
+            matrix = np.ndarray(self.shape, dtype=np.float32, buffer=self.shm.buf)
+            for start in range(0, self.shape[0], COPY_BLOCK_ROWS):
+                block = doc_embs[start:start + COPY_BLOCK_ROWS]
+                matrix[start:start + COPY_BLOCK_ROWS] = block if normalized else normalize_rows(block)
+            del matrix  # the parent only needs the block to stay alive
+
+        num_docs = self.shape[0]
+        self.num_workers = max(1, min(num_workers, num_docs))
+        bounds = np.linspace(0, num_docs, self.num_workers + 1).astype(int)
+        self.shards = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+        # spawn works the same on Windows and POSIX and never forks a process
+        # that may already hold BLAS or CUDA threads
+        saved_env = {name: os.environ.get(name) for name in WORKER_ENV}
+        os.environ.update(WORKER_ENV)
+        try:
+            self.pool = multiprocessing.get_context("spawn").Pool(
+                self.num_workers, initializer=_init_worker,
+                initargs=(store_path, self.shm.name if self.shm else None, self.shape))
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def search(self, query_embs: np.ndarray, k: int = 5):
+        """
+        Exact top-k for one query or a batch, scored on every shard in parallel.
+
+        Returns:
+            (indices, scores), each (num_queries, min(k, num_docs)), best first
+        """
+        queries = normalize_rows(query_embs)
+        k = min(k, self.shape[0])
+        results = self.pool.starmap(_score_shard, [(queries, start, stop, k, self.block_bytes)
+                                                   for start, stop in self.shards])
+        run_ids = np.empty((len(queries), 0), dtype=np.int64)
+        run_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for ids, scores in results:
+            run_ids, run_scores = merge_top_k(run_ids, run_scores, ids, scores, k)
+        return run_ids, run_scores
+
+    def close(self) -> None:
+        """Stop the workers and free the shared memory block."""
+        self.pool.terminate()
+        self.pool.join()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from datetime import datetime, timezone
+
+# Defaults used when the module is run as a script
+SNAPSHOT_ROOT = "C:/Users/rishi/OneDrive/Desktop/embeddings/snapshots"
+STORE_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_embeddings.pemb"
+METADATA_PATH = "C:/Users/rishi/OneDrive/Desktop/embeddings/paper_metadata.sqlite"
+
+MANIFEST_NAME = "manifest.json"
+# Text file in the snapshot root naming the version servers should load
+CURRENT_NAME = "CURRENT"
+# File names inside a snapshot directory
+EMBEDDINGS_NAME = "embeddings.pemb"
+METADATA_NAME = "metadata.sqlite"
+INDEX_NAME = "index"
+BM25_NAME = "bm25"
+# Published snapshots kept on disk (the current one is never removed)
+KEEP_SNAPSHOTS = 3
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """
+    Hard-link a file into the snapshot, copying when linking is not possible.
+    Only safe for files whose builder replaces them (temp file + os.replace)
+    rather than rewriting them in place.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def new_version() -> str:
+    """A version name that sorts by publication time."""
+    return datetime.now(timezone.utc).strftime("v%Y%m%dT%H%M%S%fZ")
+
+
+def publish_snapshot(root: str, embeddings: str, metadata: str, index: str = None, bm25: str = None,
+                     version: str = None, aliases: str = None) -> str:
+    """
+    Write a new immutable snapshot and make it current.
+
+    Everything is assembled in a hidden temp directory and renamed into
+    place; only then is CURRENT repointed, so a server polling the root
+    never sees a partial snapshot.
+
+    Args:
+        root: Snapshot root directory
+        embeddings: Embedding store (.pemb) to link in, or a .npy matrix to
+            normalize into one
+        metadata: Metadata store (.sqlite) to link in, or a papers CSV/Parquet
+            file to build one from (row order must match the embeddings)
+        index: Optional IVF or quantized index directory, copied in (never
+            linked, so rebuilding the source cannot change the snapshot)
+        bm25: Optional BM25 index directory, copied in
+        version: Version name (default: UTC timestamp)
+        aliases: Alias map from dedup.py, used when building the metadata store
+
+    Returns:
+        The version that was published
+    """
+    from embedding_store import EmbeddingStore, build_embedding_store
+    from metadata_store import MetadataStore, build_metadata_store
+
+    version = version or new_version()
+    final_dir = os.path.join(root, version)
+    if os.path.exists(final_dir):
+        raise FileExistsError(f"Snapshot {version} already exists in {root}")
+    tmp_dir = os.path.join(root, f".{version}.tmp")
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    store_path = os.path.join(tmp_dir, EMBEDDINGS_NAME)
+    if embeddings.endswith(".npy"):
+        import numpy as np
+        from embedding_store import DEFAULT_MODEL_NAME
+        build_embedding_store(np.load(embeddings, mmap_mode="r"), store_path, DEFAULT_MODEL_NAME)
+    else:
+        _link_or_copy(embeddings, store_path)
+    metadata_path = os.path.join(tmp_dir, METADATA_NAME)
+    if metadata.endswith((".sqlite", ".db")):
+        _link_or_copy(metadata, metadata_path)
+    else:
+        from parse_raw_data import load_papers
+        alias_map = None
+        if aliases:
+            from dedup import load_aliases
+            alias_map = load_aliases(aliases)
+        build_metadata_store(load_papers(metadata), metadata_path, alias_map)
+
+    store = EmbeddingStore(store_path)
+    count = len(MetadataStore(metadata_path))
+    if count != store.count:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise ValueError(f"Metadata has {count} rows but the embedding store has {store.count}")
+
+    files = {"embeddings": EMBEDDINGS_NAME, "metadata": METADATA_NAME}
+    # Index builders rewrite their .npy files in place (np.save, open_memmap), which
+    # would change a hard-linked snapshot under a server that has them mapped: copy
+    for key, name, src in (("index", INDEX_NAME, index), ("bm25", BM25_NAME, bm25)):
+        if src:
+            shutil.copytree(src, os.path.join(tmp_dir, name))
+            files[key] = name
+    manifest = {"version": version, "created": time.time(), "count": store.count, "dim": store.dim,
+                "model_name": store.model_name, "files": files}
+    del store
+    _write_atomic(os.path.join(tmp_dir, MANIFEST_NAME), json.dumps(manifest, indent=2))
+
+    os.replace(tmp_dir, final_dir)
+    _write_atomic(os.path.join(root, CURRENT_NAME), version + "\n")
+    return version
+
+
+def current_version(root: str):
+    """The version named by CURRENT, or None if nothing has been published."""
+    try:
+        with open(os.path.join(root, CURRENT_NAME), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest(snapshot_dir: str) -> dict:
+    """
+    Read a snapshot's manifest, with the paths under "files" made absolute.
+    """
+    with open(os.path.join(snapshot_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["files"] = {key: os.path.join(snapshot_dir, name) for key, name in manifest["files"].items()}
+    return manifest
+
+
+def list_versions(root: str) -> list:
+    """Published versions, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if os.path.exists(os.path.join(root, name, MANIFEST_NAME)))
+
+
+def prune_snapshots(root: str, keep: int = KEEP_SNAPSHOTS) -> list:
+    """
+    Delete all but the newest keep snapshots, never the current one.
+    Snapshots still open elsewhere (memory-mapped files on Windows) are
+    skipped and removed by a later prune.
+
+    Returns:
+        The versions that were removed
+    """
+    current = current_version(root)
+    removed = []
+    for version in list_versions(root)[:-keep or None]:
+        if version == current:
+            continue
+        try:
+            shutil.rmtree(os.path.join(root, version))
+            removed.append(version)
+        except OSError as e:
+            print(f"[WARNING] Could not remove snapshot {version}: {e}")
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish and manage versioned search index snapshots.")
+    parser.add_argument("--root", type=str, default=SNAPSHOT_ROOT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser("publish", help="Publish a new snapshot and make it current.")
+    publish.add_argument("--embeddings", type=str, default=STORE_PATH, help="Embedding store (.pemb) or .npy.")
+    publish.add_argument("--metadata", type=str, default=METADATA_PATH,
+                         help="Metadata store (.sqlite) or papers CSV/Parquet.")
+    publish.add_argument("--aliases", type=str, default=None, help="Alias map from dedup.py.")
+    publish.add_argument("--index_path", type=str, default=None, help="IVF or quantized index directory.")
+    publish.add_argument("--bm25_path", type=str, default=None, help="BM25 index directory.")
+    publish.add_argument("--version", type=str, default=None)
+    publish.add_argument("--keep", type=int, default=KEEP_SNAPSHOTS, help="Snapshots kept after publishing.")
+
+    commands.add_parser("list", help="List published snapshots.")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = current_version(args.root)
+        for version in list_versions(args.root):
+            manifest = load_manifest(os.path.join(args.root, version))
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}  {manifest['count']} papers  {', '.join(sorted(manifest['files']))}")
+        return
+
+    for path in (args.embeddings, args.metadata):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found")
+            sys.exit(1)
+    os.makedirs(args.root, exist_ok=True)
+    version = publish_snapshot(args.root, args.embeddings, args.metadata, args.index_path, args.bm25_path,
+                               args.version, args.aliases)
+    print(f"[INFO] Published snapshot {version} to {args.root}")
+    removed = prune_snapshots(args.root, args.keep)
+    if removed:
+        print(f"[INFO] Removed old snapshots: {', '.join(removed)}")
+
+
+if __name__ == "__main__":
+    main()
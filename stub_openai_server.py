@@ -0,0 +1,178 @@
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+# Local stand-in for the OpenAI embeddings and chat-completions endpoints, for
+# exercising the pipeline and the streamed analysis without API spend. Point a
+# client at it with
+#   OpenAI(api_key="stub", base_url="http://127.0.0.1:<port>/v1", max_retries=0)
+
+DEFAULT_DIM = 1536
+# Words in each stub chat reply
+DEFAULT_REPLY_WORDS = 60
+
+
+def stub_vector(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Deterministic unit vector derived from the text."""
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def stub_reply(messages: list, words: int = DEFAULT_REPLY_WORDS) -> list:
+    """Deterministic chat reply for a conversation, as a list of word tokens."""
+    text = json.dumps(messages, sort_keys=True)
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    vocab = ["paper", "method", "results", "relevant", "query", "model", "analysis", "data", "approach", "study"]
+    return [rng.choice(vocab) + " " for _ in range(words)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Set on the server object: dim, latency_ms, error_rate, reply_words, token_ms, stats, lock
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with server.lock:
+            server.stats["requests"] += 1
+
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000.0)
+        if random.random() < server.error_rate:
+            with server.lock:
+                server.stats["rate_limited"] += 1
+            self._send_json(429, {"error": {"message": "Rate limit reached (stub)", "type": "requests"}},
+                            headers={"retry-after": str(server.retry_after)})
+            return
+
+        if self.path.rstrip("/").endswith("/embeddings"):
+            self._embeddings(payload)
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat(payload)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _embeddings(self, payload: dict) -> None:
+        inputs = payload.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        use_base64 = payload.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vector = stub_vector(str(text), self.server.dim)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if use_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        with self.server.lock:
+            self.server.stats["inputs"] += len(inputs)
+        tokens = sum(len(str(t).split()) for t in inputs)
+        self._send_json(200, {"object": "list", "data": data, "model": payload.get("model", "stub"),
+                              "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    def _chat(self, payload: dict) -> None:
+        server = self.server
+        model = payload.get("model", "stub")
+        tokens = stub_reply(payload.get("messages", []), server.reply_words)
+        with server.lock:
+            server.stats["chat"] += 1
+        if not payload.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+            return
+
+        # Server-sent events, one chunk per token, closed by the connection ending
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model}
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": t} for t in tokens]
+        for i, delta in enumerate(deltas):
+            if i and server.token_ms:
+                time.sleep(server.token_ms / 1000.0)
+            event = dict(chunk, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+            self.wfile.write(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+        event = dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        self.wfile.write(b"data: " + json.dumps(event).encode("utf-8") + b"\n\ndata: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_stub_server(port: int = 0, dim: int = DEFAULT_DIM, latency_ms: float = 0.0,
+                      error_rate: float = 0.0, retry_after: float = 0.1,
+                      reply_words: int = DEFAULT_REPLY_WORDS, token_ms: float = 0.0):
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        port: Port to bind on 127.0.0.1 (0 picks a free one)
+        dim: Embedding dimension returned
+        latency_ms: Artificial delay added to every request
+        error_rate: Probability of answering a request with 429
+        retry_after: Value of the Retry-After header on 429s (seconds)
+        reply_words: Length of chat replies, in tokens
+        token_ms: Delay between streamed chat tokens
+
+    Returns:
+        (server, base_url); call server.shutdown() when done
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.dim = dim
+    server.latency_ms = latency_ms
+    server.error_rate = error_rate
+    server.retry_after = retry_after
+    server.reply_words = reply_words
+    server.token_ms = token_ms
+    server.lock = threading.Lock()
+    server.stats = {"requests": 0, "rate_limited": 0, "inputs": 0, "chat": 0}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub of the OpenAI API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--latency_ms", type=float, default=50.0, help="Delay added to each request.")
+    parser.add_argument("--error_rate", type=float, default=0.1, help="Fraction of requests answered with 429.")
+    parser.add_argument("--reply_words", type=int, default=DEFAULT_REPLY_WORDS, help="Tokens per chat reply.")
+    parser.add_argument("--token_ms", type=float, default=20.0, help="Delay between streamed chat tokens.")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.dim, args.latency_ms, args.error_rate,
+                                         reply_words=args.reply_words, token_ms=args.token_ms)
+    print(f"[INFO] Stub OpenAI server listening at {base_url}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"[INFO] {server.stats}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
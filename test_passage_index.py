@@ -0,0 +1,23 @@
+import numpy as np
+from passage_index import PassageIndex
+
+
+def test_empty_index_round_trips(tmp_path):
+    path = str(tmp_path / "passages.npz")
+    PassageIndex(8).save(path)
+    index = PassageIndex.load(path, 8)
+    assert len(index) == 0
+    assert index.dim == 8
+
+
+def test_passages_round_trip(tmp_path):
+    path = str(tmp_path / "passages.npz")
+    index = PassageIndex(4)
+    index.update(7, np.ones((3, 4)), [100, 100, 20])
+    index.update(2, np.zeros((2, 4)), [50, 10])
+    index.save(path)
+
+    loaded = PassageIndex.load(path)
+    assert sorted(loaded.passages) == [2, 7]
+    np.testing.assert_array_equal(loaded.passages[7][1], [100, 100, 20])
+    np.testing.assert_array_equal(loaded.passages[2][0], np.zeros((2, 4)))
@@ -0,0 +1,40 @@
+import os
+import numpy as np
+import pandas as pd
+from ann_index import IVFIndex
+from embedding_store import build_embedding_store
+from lexical_index import BM25Index
+from metadata_store import build_metadata_store
+from snapshot import publish_snapshot, BM25_NAME, INDEX_NAME
+
+
+def _read_tree(path: str) -> dict:
+    contents = {}
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), "rb") as f:
+            contents[name] = f.read()
+    return contents
+
+
+def test_rebuilding_sources_leaves_snapshot_unchanged(tmp_path):
+    rng = np.random.default_rng(0)
+    texts = ["sparse retrieval with bm25", "dense vectors for papers", "inverted file index",
+             "product quantization codes", "hot reload of snapshots", "near duplicate papers"]
+    embeddings = rng.standard_normal((len(texts), 8)).astype(np.float32)
+    store, metadata = str(tmp_path / "embeddings.pemb"), str(tmp_path / "metadata.sqlite")
+    index_dir, bm25_dir = str(tmp_path / "ivf"), str(tmp_path / "bm25")
+    build_embedding_store(embeddings, store, "test-model")
+    build_metadata_store(pd.DataFrame({"paper_id": np.arange(len(texts)), "text": texts}), metadata)
+    IVFIndex(n_lists=2).build(embeddings, path=index_dir).save(index_dir)
+    BM25Index().build(texts).save(bm25_dir)
+
+    root = str(tmp_path / "snapshots")
+    version = publish_snapshot(root, store, metadata, index=index_dir, bm25=bm25_dir, version="v1")
+    published = {name: _read_tree(os.path.join(root, version, name)) for name in (INDEX_NAME, BM25_NAME)}
+
+    # Rebuild both sources in place over a different corpus
+    IVFIndex(n_lists=2).build(embeddings[:3], path=index_dir).save(index_dir)
+    BM25Index().build(texts[:2]).save(bm25_dir)
+
+    for name, contents in published.items():
+        assert _read_tree(os.path.join(root, version, name)) == contents
@@ -3,17 +3,12 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 from sklearn.preprocessing import normalize
 from tqdm import tqdm
-import re
+from search_core import search_top_k
+from parse_raw_data import iter_raw_records
 
-# Function to parse the raw text file efficiently
+# Function to parse the raw text file efficiently (streamed, one record at a time)
 def parse_rawtext_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        data = file.read()
-
-    entries = re.split(r"##", data)[1:]  # Skip the first empty split
-    records = [{"id": entry.split("\n", 1)[0].strip(), 
-                "abstract": entry.split("\n", 1)[1].strip()} for entry in entries if "\n" in entry]
-
+    records = [{"id": paper_id, "abstract": text.strip()} for paper_id, text in iter_raw_records(file_path)]
     return pd.DataFrame(records)
 
 # Function to generate embeddings in batches
@@ -27,10 +22,9 @@ def generate_embeddings(df, model, batch_size=64):
 
 # Function for semantic search
 def semantic_search(query, model, normalized_embeddings, df, top_k=5):
-    query_embedding = normalize(model.encode(query).reshape(1, -1))
-    similarities = np.dot(normalized_embeddings, query_embedding.T).flatten()
-    top_indices = np.argsort(similarities)[-top_k:][::-1]
-    return df.iloc[top_indices]
+    query_embedding = model.encode(query).reshape(1, -1)
+    top_indices, _ = search_top_k(query_embedding, normalized_embeddings, k=top_k, normalized=True)
+    return df.iloc[top_indices[0]]
 
 # Main program
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+import os
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import tiktoken
+from incremental_embeddings import content_hash, HASH_DTYPE
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+MAX_TOKENS = 8191
+NUM_THREADS = 8
+BATCH_SIZE = 2000
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: str = EMBEDDING_MODEL) -> tiktoken.Encoding:
+    """Load the tokenizer for a model once per process."""
+    return tiktoken.encoding_for_model(model)
+
+
+class TokenizedCorpus:
+    def __init__(self, counts: np.ndarray, long_tokens: Dict[int, np.ndarray], model: str, max_tokens: int):
+        """
+        Result of the tokenization stage.
+
+        Args:
+            counts: Token count of every text
+            long_tokens: Token ids of the texts over max_tokens, keyed by
+                position, so chunking them never re-encodes
+            model: Model whose tokenizer produced the counts
+            max_tokens: Per-input token limit of the model
+        """
+        self.counts = counts
+        self.long_tokens = long_tokens
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def is_long(self, pos: int) -> bool:
+        return self.counts[pos] > self.max_tokens
+
+    def chunks(self, pos: int, chunk_tokens: int = None) -> List[Tuple[str, int]]:
+        """
+        Split an over-limit text at token boundaries.
+
+        Returns:
+            List of (chunk_text, chunk_token_count)
+        """
+        chunk_tokens = chunk_tokens or self.max_tokens
+        tokens = self.long_tokens[pos]
+        pieces = [tokens[i:i + chunk_tokens] for i in range(0, len(tokens), chunk_tokens)]
+        texts = get_encoder(self.model).decode_batch([p.tolist() for p in pieces])
+        return list(zip(texts, (len(p) for p in pieces)))
+
+    def truncated(self, pos: int, text: str) -> Tuple[str, int]:
+        """Return the text cut to max_tokens and its token count."""
+        if not self.is_long(pos):
+            return text, int(self.counts[pos])
+        head = self.long_tokens[pos][:self.max_tokens].tolist()
+        return get_encoder(self.model).decode(head), len(head)
+
+
+def _load_cache(cache_path: str):
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    cached = np.load(cache_path)
+    return dict(zip(cached["hashes"].tolist(), cached["counts"].tolist()))
+
+
+def tokenize_corpus(texts: Sequence[str], model: str = EMBEDDING_MODEL, max_tokens: int = MAX_TOKENS,
+                    num_threads: int = NUM_THREADS, batch_size: int = BATCH_SIZE,
+                    cache_path: str = None, rows: Sequence[int] = None,
+                    hashes: np.ndarray = None) -> TokenizedCorpus:
+    """
+    Tokenize a corpus once with encode_batch across threads.
+
+    Token counts are cached by content hash in cache_path (an .npz next to the
+    paper metadata), so a rerun only tokenizes texts that are new or changed,
+    plus the over-limit texts whose token ids are needed for chunking.
+
+    Args:
+        texts: Texts to tokenize
+        model: Model whose tokenizer to use
+        max_tokens: Per-input limit; token ids are kept only for longer texts
+        num_threads: Threads used by tiktoken's encode_batch
+        batch_size: Texts per encode_batch call (bounds memory for token lists)
+        cache_path: Optional .npz token-count cache
+        rows: Only tokenize these positions (e.g. the rows still to embed);
+            the others keep a count of -1. The cache then keeps its other
+            entries instead of being rewritten for the whole corpus.
+        hashes: content_hash(text, model) of every text, if already computed
+            (IncrementalEmbeddings.hashes for the same model)
+
+    Returns:
+        TokenizedCorpus, indexed by position in texts
+    """
+    encoder = get_encoder(model)
+    subset = rows is not None
+    rows = np.asarray(rows, dtype=np.int64) if subset else np.arange(len(texts))
+    if hashes is None:
+        row_hashes = np.array([content_hash(texts[p], model) for p in rows.tolist()], dtype=HASH_DTYPE)
+    else:
+        row_hashes = np.asarray(hashes)[rows]
+    cached = _load_cache(cache_path)
+
+    counts = np.full(len(texts), -1, dtype=np.int64)
+    counts[rows] = [cached.get(h, -1) for h in row_hashes.tolist()]
+    # Uncached texts, and long texts (their token ids are needed for chunking)
+    todo = rows[(counts[rows] < 0) | (counts[rows] > max_tokens)]
+    print(f"[INFO] Tokenizing {len(todo)} of {len(rows)} texts ({len(rows) - len(todo)} cached)")
+
+    long_tokens = {}
+    for start in range(0, len(todo), batch_size):
+        positions = todo[start:start + batch_size]
+        encoded = encoder.encode_batch([texts[p] for p in positions], num_threads=num_threads,
+                                       disallowed_special=())
+        for pos, tokens in zip(positions.tolist(), encoded):
+            counts[pos] = len(tokens)
+            if len(tokens) > max_tokens:
+                long_tokens[pos] = np.asarray(tokens, dtype=np.int32)
+
+    if cache_path is not None:
+        cache_hashes, cache_counts = row_hashes, counts[rows]
+        if subset:
+            cached.update(zip(row_hashes.tolist(), cache_counts.tolist()))
+            cache_hashes = np.array(list(cached), dtype=HASH_DTYPE)
+            cache_counts = np.array(list(cached.values()), dtype=np.int64)
+        tmp_path = cache_path + ".tmp.npz"
+        np.savez(tmp_path, hashes=cache_hashes, counts=cache_counts)
+        os.replace(tmp_path, cache_path)
+    return TokenizedCorpus(counts, long_tokens, model, max_tokens)